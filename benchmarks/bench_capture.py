@@ -0,0 +1,100 @@
+"""
+截图后端基准测试
+在同一台机器上依次测试各截图后端，统计不同区域大小下每次截图的耗时与帧率
+
+用法：
+    python benchmarks/bench_capture.py [--backends xshm,mss,imagegrab] [-n 50] [--reuse] [--json]
+
+区域从 100x100 到 4K，超出屏幕的尺寸会被跳过；--reuse 时传入复用的图片缓冲区
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from core.screenshot import CAPTURE_BACKENDS
+from utils.metrics import percentile
+
+REGION_SIZES = [
+    (100, 100),
+    (640, 480),
+    (1280, 720),
+    (1920, 1080),
+    (2560, 1440),
+    (3840, 2160),
+]
+
+
+def bench_region(backend, bbox, iterations, reuse):
+    """对同一区域连续截图，返回耗时统计"""
+    size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+    out = Image.new('RGB', size) if reuse else None
+    # 预热一次，排除首次建立连接和分配缓冲区的开销
+    backend.grab(bbox, out=out)
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        grab_start = time.perf_counter()
+        backend.grab(bbox, out=out)
+        samples.append((time.perf_counter() - grab_start) * 1000)
+    elapsed = time.perf_counter() - start
+    samples.sort()
+    return {
+        'size': f'{size[0]}x{size[1]}',
+        'fps': round(iterations / elapsed, 1),
+        'mean_ms': round(sum(samples) / len(samples), 2),
+        'p50_ms': round(percentile(samples, 0.50), 2),
+        'p95_ms': round(percentile(samples, 0.95), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图后端基准测试")
+    parser.add_argument('--backends', default=','.join(CAPTURE_BACKENDS),
+                        help="要测试的后端，逗号分隔")
+    parser.add_argument('-n', '--iterations', type=int, default=50, help="每个区域的截图次数")
+    parser.add_argument('--reuse', action='store_true', help="复用图片缓冲区")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.backends.split(','):
+        name = name.strip()
+        try:
+            backend = CAPTURE_BACKENDS[name]()
+        except (KeyError, ImportError, OSError) as e:
+            print(f"跳过后端 {name}: {e}", file=sys.stderr)
+            continue
+        try:
+            left, top, right, bottom = backend.monitors()[0]
+            rows = []
+            for width, height in REGION_SIZES:
+                if width > right - left or height > bottom - top:
+                    print(f"{name}: {width}x{height} 超出屏幕，跳过", file=sys.stderr)
+                    continue
+                bbox = (left, top, left + width, top + height)
+                rows.append(bench_region(backend, bbox, args.iterations, args.reuse))
+            results[name] = rows
+        except OSError as e:
+            print(f"后端 {name} 截图失败: {e}", file=sys.stderr)
+        finally:
+            backend.close()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"{'后端':<12}{'区域':>12}{'帧率':>8}{'平均ms':>10}{'p50ms':>10}{'p95ms':>10}")
+    for name, rows in results.items():
+        for row in rows:
+            print(f"{name:<14}{row['size']:>12}{row['fps']:>10}{row['mean_ms']:>10}"
+                  f"{row['p50_ms']:>10}{row['p95_ms']:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+识别历史基准测试
+向临时数据库写入大量合成记录，统计入队耗时、后台写入吞吐量以及各类查询的耗时
+
+用法：
+    python benchmarks/bench_history.py [-n 100000] [--queries 200] [--db history_bench.db] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.history import HistoryStore
+from utils.metrics import percentile
+
+LATIN_WORDS = [
+    'error', 'warning', 'request', 'timeout', 'connection', 'database', 'server', 'client',
+    'invoice', 'total', 'amount', 'customer', 'order', 'status', 'pending', 'completed',
+    'python', 'screen', 'capture', 'recognition', 'latency', 'memory', 'thread', 'queue'
+]
+CJK_TEXT = '的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难近矿千周委素技备半办青省列习响约支般史感劳便团往酸历市克何除消构府称太准精值号率族维划选标写存候毛亲快效斯院查江型眼王按格养易置派层片始却专状育厂京识适属圆包火住调满县局照参红细引听该铁价严'
+QUERIES = [
+    ('term', 'timeout'),
+    ('two_terms', 'server error'),
+    ('prefix', 'conn*'),
+    ('phrase', '"request timeout"'),
+    ('cjk', '识别'),
+    ('cjk_phrase', '"数据 处理"'),
+    ('rare', 'recognition latency memory'),
+]
+
+
+def synthetic_text(rng):
+    """生成中英文混合的多行文字"""
+    lines = []
+    for _ in range(rng.randint(1, 6)):
+        if rng.random() < 0.5:
+            lines.append(' '.join(rng.choice(LATIN_WORDS) for _ in range(rng.randint(3, 10))))
+        else:
+            lines.append(''.join(rng.choice(CJK_TEXT) for _ in range(rng.randint(6, 24))))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="识别历史基准测试")
+    parser.add_argument('-n', '--entries', type=int, default=100000, help="写入的记录数")
+    parser.add_argument('--queries', type=int, default=200, help="每种查询的执行次数")
+    parser.add_argument('--db', help="数据库路径，默认使用临时文件")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='history_bench_'), 'history.db')
+    rng = random.Random(42)
+    texts = [synthetic_text(rng) for _ in range(args.entries)]
+
+    history = HistoryStore(path, queue_size=args.entries + 1)
+    add_times = []
+    start = time.perf_counter()
+    for lines in texts:
+        add_start = time.perf_counter()
+        history.add(lines, region=(0, 0, 800, 600), confidences=[0.9] * len(lines))
+        add_times.append((time.perf_counter() - add_start) * 1000)
+    enqueued = time.perf_counter()
+    history.flush()
+    written = time.perf_counter()
+    add_times.sort()
+
+    results = {
+        'entries': history.count(),
+        'add_p50_us': round(percentile(add_times, 0.50) * 1000, 1),
+        'add_p99_us': round(percentile(add_times, 0.99) * 1000, 1),
+        'enqueue_s': round(enqueued - start, 2),
+        'write_rate': round(args.entries / (written - start), 1),
+        'queries': {}
+    }
+    for name, query in QUERIES:
+        samples = []
+        hits = 0
+        for _ in range(args.queries):
+            query_start = time.perf_counter()
+            hits = len(history.search(query, limit=20))
+            samples.append((time.perf_counter() - query_start) * 1000)
+        samples.sort()
+        results['queries'][name] = {
+            'query': query,
+            'hits': hits,
+            'p50_ms': round(percentile(samples, 0.50), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3)
+        }
+    history.close()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    print(f"记录数 {results['entries']}，入队 p50 {results['add_p50_us']} us / p99 {results['add_p99_us']} us，"
+          f"写入速度 {results['write_rate']} 条/秒")
+    print(f"{'查询':<12}{'语句':<32}{'结果':>6}{'p50ms':>10}{'p95ms':>10}")
+    for name, row in results['queries'].items():
+        print(f"{name:<12}{row['query']:<32}{row['hits']:>6}{row['p50_ms']:>10}{row['p95_ms']:>10}")
+    print(f"数据库: {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
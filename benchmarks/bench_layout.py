@@ -0,0 +1,118 @@
+"""
+版面重排基准测试
+生成带坐标的合成识别结果（通栏标题、双栏正文、中英文折行），统计转换为 OCRResult
+和按版面输出剪贴板文字的耗时，并与逐行拼接的旧实现对比
+
+用法：
+    python benchmarks/bench_layout.py [-n 500] [--repeat 200] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.layout import OCRResult, format_layout, reading_order
+from utils.metrics import percentile
+
+LATIN_WORDS = ['layout', 'column', 'paragraph', 'capture', 'screen', 'text', 'result', 'merge', 'line', 'wrap']
+CJK_TEXT = '屏幕文字识别结果按照版面重新排列段落与分栏顺序中文折行直接连接'
+LINE_HEIGHT = 20
+COLUMN_WIDTH = 380
+GUTTER = 40
+
+
+def synthetic_result(lines, rng):
+    """
+    生成识别结果字典：每40行一个通栏标题，其余为左右两栏的段落，
+    段落最后一行较短，一半段落为中文
+    """
+    words_result = []
+    top = 0
+    while len(words_result) < lines:
+        words_result.append(_item(f"Section {len(words_result)}", 0, top, COLUMN_WIDTH * 2 + GUTTER))
+        top += LINE_HEIGHT * 2
+        rows = min(19, (lines - len(words_result) + 1) // 2)
+        for left in (0, COLUMN_WIDTH + GUTTER):
+            for row in range(rows):
+                last = row % 5 == 4 or row == rows - 1
+                width = COLUMN_WIDTH // 2 if last else COLUMN_WIDTH
+                if (row // 5) % 2:
+                    text = ''.join(rng.choice(CJK_TEXT) for _ in range(width // LINE_HEIGHT))
+                else:
+                    text = ' '.join(rng.choice(LATIN_WORDS) for _ in range(width // 60 + 1))
+                # 段落之间空出一行
+                words_result.append(_item(text, left, top + row * (LINE_HEIGHT + 4) + (row // 5) * LINE_HEIGHT,
+                                          width))
+        top += rows * (LINE_HEIGHT + 4) + rows // 5 * LINE_HEIGHT + LINE_HEIGHT * 2
+    # 识别结果的行顺序不可靠，打乱后由版面分析恢复
+    words_result = words_result[:lines]
+    rng.shuffle(words_result)
+    return {'words_result': words_result, 'words_result_num': len(words_result)}
+
+
+def _item(text, left, top, width):
+    return {
+        'words': text,
+        'location': {'left': left, 'top': top, 'width': width, 'height': LINE_HEIGHT},
+        'probability': {'average': 0.95, 'min': 0.9, 'variance': 0.001}
+    }
+
+
+def legacy(result):
+    """旧实现：提取文字列表后逐行拼接"""
+    texts = [item['words'] for item in result.get('words_result', [])]
+    return '\n'.join(texts)
+
+
+def timed(func, arg, repeat):
+    samples = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="版面重排基准测试")
+    parser.add_argument('-n', '--lines', type=int, default=500, help="识别结果的行数")
+    parser.add_argument('--repeat', type=int, default=200, help="重复次数")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    args = parser.parse_args()
+
+    result = synthetic_result(args.lines, random.Random(42))
+    parse_samples, parsed = timed(OCRResult.from_api, result, args.repeat)
+    layout_samples, text = timed(format_layout, parsed, args.repeat)
+    legacy_samples, _ = timed(legacy, result, args.repeat)
+
+    results = {
+        'lines': len(parsed),
+        'paragraphs': len(reading_order(parsed)),
+        'output_chars': len(text)
+    }
+    for name, samples in (('parse', parse_samples), ('layout', layout_samples), ('legacy', legacy_samples)):
+        results[name] = {
+            'p50_ms': round(percentile(samples, 0.50), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3),
+            'per_line_us': round(percentile(samples, 0.50) * 1000 / max(1, len(parsed)), 2)
+        }
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    print(f"{results['lines']} 行，{results['paragraphs']} 个段落，输出 {results['output_chars']} 个字符")
+    print(f"{'阶段':<10}{'p50ms':>10}{'p95ms':>10}{'每行us':>10}")
+    for name in ('parse', 'layout', 'legacy'):
+        row = results[name]
+        print(f"{name:<12}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['per_line_us']:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,455 @@
+"""
+截图识别流水线基准测试
+生成不同尺寸、文字（西文、中文、混排）和DPI缩放的合成文字图片，在本地模拟OCR服务上统计：
+- 各编码格式的耗时和上传体积
+- 识别结果处理（process_result、版面重排）的耗时
+- OCRManager 端到端耗时及各阶段（encode、token、http、json_parse 等）的分位数
+- 不同并发数下的吞吐量
+- 常驻内存峰值
+结果以JSON输出，可保存为基线，之后与基线比较，耗时、体积或内存变差超过容差时以非零状态退出
+
+用法：
+    python benchmarks/bench_pipeline.py [--repeat 5] [--latency 0.05] [--concurrency 1,2,4,8]
+                                        [--sizes small,medium] [--scripts latin,cjk] [--dpi 1,2]
+                                        [--fixtures-dir fixtures] [--output result.json]
+                                        [--baseline baseline.json] [--tolerance 0.2] [--json]
+
+合成图片不依赖系统字体：每个字符绘制为确定的伪字形，同一随机种子在任何机器上生成相同的图片
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PIL
+from PIL import Image, ImageDraw
+from core.backends.mock_server import MockBaiduServer
+from utils.metrics import metrics, percentile, resident_memory
+
+SIZES = {'small': (480, 120), 'medium': (1280, 720), 'large': (3840, 2160)}
+SCRIPTS = ('latin', 'cjk', 'mixed')
+DPI_SCALES = (1.0, 1.5, 2.0)
+ENCODE_FORMATS = ('png', 'palette', 'jpeg')
+# 96 DPI 下的字号（像素）
+BASE_GLYPH = 14
+LATIN_WORDS = ['capture', 'screen', 'text', 'layout', 'result', 'pipeline', 'encode', 'latency', 'buffer', 'line']
+CJK_TEXT = '屏幕文字识别结果截图编码上传延迟吞吐内存版面段落分栏缓存队列'
+# 用于吞吐量测试的图片（尺寸、文字类型、DPI缩放）
+THROUGHPUT_FIXTURE = ('medium', 'mixed', 1.0)
+# 与基线比较时忽略小于该值的耗时（毫秒），避免计时噪声
+MIN_COMPARE_MS = 1.0
+# 与基线比较的指标：越小越好的耗时中位数、体积和内存峰值，越大越好的吞吐量；
+# p95 在重复次数较少时波动很大，只输出不比较
+LOWER_IS_BETTER = ('p50_ms', 'bytes', 'rss_growth_mb', 'python_peak_mb')
+HIGHER_IS_BETTER = ('rps',)
+
+
+class Fixture:
+    """合成文字图片及其文字行和各行位置"""
+
+    def __init__(self, name, image, lines, boxes):
+        self.name = name
+        self.image = image
+        self.lines = lines
+        self.boxes = boxes
+
+    def api_result(self):
+        """与图片内容一致的识别结果字典"""
+        return {
+            'words_result': [
+                {
+                    'words': text,
+                    'location': {'left': left, 'top': top, 'width': width, 'height': height},
+                    'probability': {'average': 0.98, 'min': 0.9, 'variance': 0.001}
+                }
+                for text, (left, top, width, height) in zip(self.lines, self.boxes)
+            ],
+            'words_result_num': len(self.lines)
+        }
+
+
+def _draw_glyph(draw, rng, x, y, glyph, cjk):
+    """绘制一个伪字形：中文为方块内的横竖笔画，西文为较窄的竖笔和弧"""
+    stroke = max(1, glyph // 10)
+    if cjk:
+        for _ in range(rng.randint(3, 6)):
+            if rng.random() < 0.5:
+                offset = rng.randint(1, glyph - 2)
+                draw.rectangle((x + 1, y + offset, x + glyph - 2, y + offset + stroke - 1), fill='black')
+            else:
+                offset = rng.randint(1, glyph - 2)
+                draw.rectangle((x + offset, y + 1, x + offset + stroke - 1, y + glyph - 2), fill='black')
+        return glyph
+    width = max(3, glyph * 11 // 20)
+    top = y + (0 if rng.random() < 0.3 else glyph // 3)
+    draw.rectangle((x, top, x + stroke - 1, y + glyph - 1), fill='black')
+    draw.arc((x, y + glyph // 3, x + width - 1, y + glyph - 1), 0, 360, fill='black', width=stroke)
+    return width
+
+
+def _line_text(rng, script):
+    if script == 'cjk' or (script == 'mixed' and rng.random() < 0.5):
+        return ''.join(rng.choice(CJK_TEXT) for _ in range(rng.randint(8, 30)))
+    return ' '.join(rng.choice(LATIN_WORDS) for _ in range(rng.randint(2, 8)))
+
+
+def make_fixture(size_name, script, dpi_scale, seed=0):
+    """
+    生成合成文字图片
+    文字行高随DPI缩放，每5行之间空出一行作为段落间隔，行宽超出图片时截断
+    """
+    width, height = SIZES[size_name]
+    rng = random.Random(f"{seed}-{size_name}-{script}-{dpi_scale}")
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    glyph = max(6, round(BASE_GLYPH * dpi_scale))
+    line_height = round(glyph * 1.6)
+    margin = round(16 * dpi_scale)
+    lines = []
+    boxes = []
+    y = margin
+    while y + glyph <= height - margin:
+        text = _line_text(rng, script)
+        x = margin
+        drawn = []
+        for char in text:
+            advance = glyph // 2 if char == ' ' else 0
+            if not advance:
+                cjk = '一' <= char <= '鿿'
+                if x + glyph > width - margin:
+                    break
+                advance = _draw_glyph(draw, rng, x, y, glyph, cjk) + max(1, glyph // 8)
+            drawn.append(char)
+            x += advance
+        text = ''.join(drawn).strip()
+        if text:
+            lines.append(text)
+            boxes.append((margin, y, x - margin, glyph))
+        y += line_height
+        if len(lines) % 5 == 0:
+            y += line_height
+    name = f"{size_name}-{script}-{dpi_scale:g}x"
+    return Fixture(name, image, lines, boxes)
+
+
+def make_fixtures(sizes, scripts, dpi_scales, seed=0):
+    """逐个生成图片，测量完一张再生成下一张，内存峰值不包括尚未使用的图片"""
+    for size in sizes:
+        for script in scripts:
+            for dpi in dpi_scales:
+                yield make_fixture(size, script, dpi, seed)
+
+
+def save_fixture(fixture, fixture_dir):
+    """保存图片和对应的文字，文字文件可作为 bench_preprocess.py 的标准答案"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    fixture.image.save(os.path.join(fixture_dir, f"{fixture.name}.png"))
+    with open(os.path.join(fixture_dir, f"{fixture.name}.txt"), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(fixture.lines))
+
+
+class PeakMemory:
+    """在后台按固定间隔采样常驻内存，记录峰值；同时用 tracemalloc 统计Python对象的峰值"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self.python_peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = resident_memory()
+        if rss is not None:
+            self.peak_mb = max(self.peak_mb, rss / (1024 * 1024))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        rss = resident_memory()
+        self.start_mb = self.peak_mb = rss / (1024 * 1024) if rss is not None else 0.0
+        tracemalloc.start()
+        self._thread = threading.Thread(target=self._run, name='memory-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        self.python_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+        return False
+
+    def result(self):
+        return {
+            'rss_start_mb': round(self.start_mb, 1),
+            'rss_peak_mb': round(self.peak_mb, 1),
+            'rss_growth_mb': round(self.peak_mb - self.start_mb, 1),
+            'python_peak_mb': round(self.python_peak_mb, 1)
+        }
+
+
+def timed(func, repeat):
+    """重复执行 func，返回耗时分位数和最后一次的返回值"""
+    samples = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {'p50_ms': round(percentile(samples, 0.50), 3), 'p95_ms': round(percentile(samples, 0.95), 3)}, output
+
+
+@contextlib.contextmanager
+def quiet():
+    """识别流程会输出每次请求的日志，测量时丢弃"""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def configure_environment(server_url, temp_dir, qps):
+    """让 OCRManager 连接本地模拟服务，关闭结果缓存，使每次识别都经过完整流程"""
+    os.environ.update({
+        'OCR_API_BASE': server_url,
+        'OCR_BACKEND': 'baidu',
+        'OCR_CACHE_SIZE': '0',
+        'OCR_QPS': str(qps),
+        'BAIDU_API_KEY': 'benchmark',
+        'BAIDU_SECRET_KEY': 'benchmark',
+        'TEMP_DIR': temp_dir,
+        'DEBUG_DUMP_DIR': ''
+    })
+
+
+def bench_encoders(fixture, settings, repeat):
+    """各编码格式（以及配置中的候选格式）的耗时和上传体积"""
+    from core.preprocess import ImagePreprocessor, base64_size
+    default = ImagePreprocessor.from_settings(settings)
+    encoders = {'auto': default}
+    for fmt in ENCODE_FORMATS:
+        encoders[fmt] = ImagePreprocessor(
+            grayscale=default.grayscale, binarize=default.binarize, crop=default.crop,
+            target_text_height=default.target_text_height, formats=(fmt,), jpeg_quality=default.jpeg_quality
+        )
+    results = {}
+    for name, preprocessor in encoders.items():
+        timing, (data, info) = timed(lambda: preprocessor.process_with_info(fixture.image), repeat)
+        results[name] = dict(timing, bytes=len(data), base64_bytes=base64_size(len(data)), format=info['format'])
+    return results
+
+
+def bench_process(fixture, ocr_manager, repeat):
+    """识别结果处理：旧的 process_result 与 OCRResult 解析加版面重排"""
+    result = fixture.api_result()
+    with quiet():
+        legacy, _ = timed(lambda: ocr_manager.process_result(result), repeat)
+        parsed_timing, parsed = timed(lambda: ocr_manager.parse_result(result), repeat)
+        layout, text = timed(lambda: ocr_manager.format_text(parsed), repeat)
+    return {'process_result': legacy, 'parse_result': parsed_timing, 'format_text': layout, 'chars': len(text)}
+
+
+def bench_end_to_end(fixture, ocr_manager, server, repeat):
+    """OCRManager 端到端（编码、请求、解析、版面重排），以及各阶段的分位数"""
+    server.lines = fixture.lines or ['']
+
+    def run():
+        result = ocr_manager.recognize(fixture.image)
+        return ocr_manager.format_text(ocr_manager.parse_result(result))
+
+    with quiet():
+        run()
+        metrics.reset()
+        timing, _ = timed(run, repeat)
+    stages = {stage: {'p50_ms': item['p50'], 'p95_ms': item['p95']}
+              for stage, item in metrics.summary().items()}
+    return dict(timing, stages=stages)
+
+
+def bench_throughput(fixture, ocr_manager, server, levels, requests_per_worker):
+    """不同并发数下的吞吐量和单次耗时"""
+    server.lines = fixture.lines or ['']
+    results = {}
+    for workers in levels:
+        samples = []
+        lock = threading.Lock()
+
+        def run(_):
+            start = time.perf_counter()
+            ocr_manager.recognize(fixture.image)
+            with lock:
+                samples.append((time.perf_counter() - start) * 1000)
+
+        total = workers * requests_per_worker
+        with quiet(), ThreadPoolExecutor(max_workers=workers) as executor:
+            start = time.perf_counter()
+            list(executor.map(run, range(total)))
+            elapsed = time.perf_counter() - start
+        samples.sort()
+        results[str(workers)] = {
+            'requests': total,
+            'rps': round(total / elapsed, 2),
+            'p50_ms': round(percentile(samples, 0.50), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3)
+        }
+    return results
+
+
+def flatten(results, prefix=''):
+    """把嵌套结果展开为 {路径: 数值}"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线比较，只比较两次都测量过的项目
+    :return: 变差超过容差的项目说明列表
+    """
+    current = flatten(results)
+    regressions = []
+    for path, before in flatten(baseline).items():
+        after = current.get(path)
+        if after is None or path.startswith('meta.'):
+            continue
+        if path.endswith(HIGHER_IS_BETTER):
+            if after < before * (1 - tolerance):
+                regressions.append(f"{path}: {before} -> {after}")
+        elif path.endswith(LOWER_IS_BETTER):
+            if path.endswith('_ms') and max(before, after) < MIN_COMPARE_MS:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append(f"{path}: {before} -> {after}")
+    return regressions
+
+
+def _names(value, choices):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in choices]
+    if unknown:
+        raise SystemExit(f"未知的选项: {', '.join(unknown)}（可选 {', '.join(choices)}）")
+    return names
+
+
+def print_report(results):
+    print(f"{'图片':<22}{'行数':>4}{'编码ms':>9}{'体积KB':>9}{'格式':>9}{'处理ms':>9}{'端到端ms':>10}")
+    for name, row in results['fixtures'].items():
+        encode = row['encode']['auto']
+        print(f"{name:<24}{row['lines']:>4}{encode['p50_ms']:>9.2f}{encode['bytes'] / 1024:>9.1f}"
+              f"{encode['format']:>9}{row['process']['format_text']['p50_ms']:>9.2f}"
+              f"{row['end_to_end']['p50_ms']:>10.2f}")
+    print(f"\n吞吐量（{'-'.join(str(value) for value in THROUGHPUT_FIXTURE)}，模拟服务延迟 {results['meta']['mock_latency_s']} 秒）")
+    print(f"{'并发':<6}{'请求/秒':>10}{'p50ms':>10}{'p95ms':>10}")
+    for workers, row in results['throughput'].items():
+        print(f"{workers:<8}{row['rps']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}")
+    memory = results['memory']
+    print(f"\n常驻内存 {memory['rss_start_mb']} MB -> 峰值 {memory['rss_peak_mb']} MB，"
+          f"Python对象峰值 {memory['python_peak_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图识别流水线基准测试")
+    parser.add_argument('--repeat', type=int, default=5, help="每项测量的重复次数")
+    parser.add_argument('--latency', type=float, default=0.05, help="模拟服务的固定延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="模拟服务的随机附加延迟上限（秒）")
+    parser.add_argument('--concurrency', default='1,2,4,8', help="吞吐量测试的并发数，逗号分隔")
+    parser.add_argument('--requests', type=int, default=8, help="吞吐量测试中每个并发的请求数")
+    parser.add_argument('--qps', type=float, default=0, help="请求调度的QPS限制，0表示不限速")
+    parser.add_argument('--sizes', default=','.join(SIZES), help="图片尺寸")
+    parser.add_argument('--scripts', default=','.join(SCRIPTS), help="文字类型")
+    parser.add_argument('--dpi', default=','.join(f"{scale:g}" for scale in DPI_SCALES), help="DPI缩放比例")
+    parser.add_argument('--seed', type=int, default=0, help="生成图片的随机种子")
+    parser.add_argument('--fixtures-dir', help="把生成的图片和对应文字保存到该目录")
+    parser.add_argument('--output', help="把结果保存为JSON文件（可作为基线）")
+    parser.add_argument('--baseline', help="基线结果JSON文件，用于比较")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许比基线变差的比例")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    args = parser.parse_args()
+
+    sizes = _names(args.sizes, list(SIZES))
+    scripts = _names(args.scripts, SCRIPTS)
+    dpi_scales = [float(value) for value in args.dpi.split(',') if value.strip()]
+    levels = [int(value) for value in args.concurrency.split(',') if value.strip()]
+
+    server = MockBaiduServer(latency=args.latency, jitter=args.jitter).start()
+    temp_dir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    configure_environment(server.url, temp_dir, args.qps)
+
+    from config.settings import get_settings
+    from core.ocr import OCRManager
+    settings = get_settings()
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'mock_latency_s': args.latency,
+            'repeat': args.repeat,
+            'seed': args.seed
+        },
+        'fixtures': {},
+        'throughput': {}
+    }
+    with quiet():
+        ocr_manager = OCRManager()
+    try:
+        with PeakMemory() as memory:
+            for fixture in make_fixtures(sizes, scripts, dpi_scales, args.seed):
+                if args.fixtures_dir:
+                    save_fixture(fixture, args.fixtures_dir)
+                results['fixtures'][fixture.name] = {
+                    'size': list(fixture.image.size),
+                    'lines': len(fixture.lines),
+                    'encode': bench_encoders(fixture, settings, args.repeat),
+                    'process': bench_process(fixture, ocr_manager, args.repeat),
+                    'end_to_end': bench_end_to_end(fixture, ocr_manager, server, args.repeat)
+                }
+            results['throughput'] = bench_throughput(make_fixture(*THROUGHPUT_FIXTURE, seed=args.seed),
+                                                     ocr_manager, server, levels, args.requests)
+        results['memory'] = memory.result()
+        results['mock_server'] = {'requests': server.request_count, 'image_bytes': server.image_bytes}
+    finally:
+        ocr_manager.close()
+        server.stop()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    results['regressions'] = regressions
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_report(results)
+    for regression in regressions:
+        print(f"比基线变差超过 {args.tolerance:.0%}: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
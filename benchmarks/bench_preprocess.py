@@ -0,0 +1,105 @@
+"""
+图片预处理基准测试
+统计每张图片预处理前后的上传体积，可选地对比两者的OCR准确率
+
+用法：
+    python benchmarks/bench_preprocess.py <图片目录> [--ocr]
+
+图片目录中的每张图片可以附带同名的 .txt 文件作为标准答案，
+指定 --ocr 时会分别识别原图和预处理后的图片，并与标准答案比较字符相似度
+"""
+import argparse
+import difflib
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from config.settings import get_settings
+from core.preprocess import ImagePreprocessor
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def load_fixtures(fixture_dir):
+    """读取目录中的图片及其标准答案"""
+    fixtures = []
+    for name in sorted(os.listdir(fixture_dir)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        path = os.path.join(fixture_dir, name)
+        truth_path = os.path.splitext(path)[0] + '.txt'
+        truth = None
+        if os.path.exists(truth_path):
+            with open(truth_path, 'r', encoding='utf-8') as f:
+                truth = f.read().strip()
+        fixtures.append((path, truth))
+    return fixtures
+
+
+def similarity(text, truth):
+    """忽略空白后的字符相似度"""
+    a = ''.join(text.split())
+    b = ''.join(truth.split())
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片预处理基准测试")
+    parser.add_argument('fixture_dir', help="图片目录")
+    parser.add_argument('--ocr', action='store_true', help="调用OCR比较识别准确率（消耗API额度）")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixture_dir)
+    if not fixtures:
+        print("目录中没有图片")
+        return 1
+
+    preprocessor = ImagePreprocessor.from_settings(get_settings())
+    ocr_manager = None
+    if args.ocr:
+        # 关闭结果缓存，保证每次都真实请求
+        os.environ['OCR_CACHE_SIZE'] = '0'
+        from core.ocr import OCRManager
+        ocr_manager = OCRManager()
+
+    total_before = 0
+    total_after = 0
+    accuracy_before = []
+    accuracy_after = []
+    print(f"{'图片':<32}{'原始字节':>12}{'处理后':>12}{'节省':>8}{'格式':>9}{'耗时ms':>9}")
+    for path, truth in fixtures:
+        image = Image.open(path)
+        image.load()
+        buffer = BytesIO()
+        image.save(buffer, 'PNG')
+        original = buffer.getvalue()
+
+        start = time.perf_counter()
+        processed, info = preprocessor.process_with_info(image)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        total_before += len(original)
+        total_after += len(processed)
+        saved = 1 - len(processed) / len(original)
+        print(f"{os.path.basename(path):<32}{len(original):>12}{len(processed):>12}"
+              f"{saved:>8.1%}{info['format']:>9}{elapsed:>9.1f}")
+
+        if ocr_manager and truth is not None:
+            before = '\n'.join(ocr_manager.recognize_text(original))
+            after = '\n'.join(ocr_manager.recognize_text(processed))
+            accuracy_before.append(similarity(before, truth))
+            accuracy_after.append(similarity(after, truth))
+
+    print(f"\n合计: {total_before} -> {total_after} 字节，节省 {1 - total_after / total_before:.1%}")
+    if accuracy_before:
+        print(f"平均准确率: 原图 {sum(accuracy_before) / len(accuracy_before):.3f}，"
+              f"预处理后 {sum(accuracy_after) / len(accuracy_after):.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+截图预览基准测试
+对不同分辨率的合成截图，比较旧实现（整图缩放到窗口大小）与金字塔预览（最近邻草图 + 后台 reduce）
+生成首屏画面的耗时，以及后台生成清晰层和放大后渲染可见部分的耗时；
+--window 时在真实窗口中测量打开预览的完整耗时。首屏超过阈值时以非零状态退出
+
+用法：
+    python benchmarks/bench_preview.py [--repeat 20] [--max-open-ms 50] [--window] [--json]
+
+--window 需要图形界面环境
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from ui.preview import ImagePyramid
+from utils.metrics import percentile
+
+RESOLUTIONS = {'1080p': (1920, 1080), '4k': (3840, 2160), '8k': (7680, 4320)}
+# 预览窗口的最大尺寸（1920x1080 屏幕的75%）
+VIEW_SIZE = (1440, 810)
+
+
+def synthetic_capture(size):
+    """带噪声的合成截图，避免纯色图片被优化"""
+    return Image.effect_noise(size, 40).convert('RGB')
+
+
+def fit_scale(size):
+    return min(1.0, VIEW_SIZE[0] / size[0], VIEW_SIZE[1] / size[1])
+
+
+def legacy(image):
+    """旧实现：用默认滤镜把整张截图缩放到窗口大小"""
+    scale = fit_scale(image.size)
+    return image.resize((int(image.width * scale), int(image.height * scale)))
+
+
+def first_frame(image):
+    """金字塔预览的首屏：从原图最近邻采样"""
+    scale = fit_scale(image.size)
+    size = (round(image.width * scale), round(image.height * scale))
+    return ImagePyramid(image).render(scale, (0, 0) + image.size, size, draft=True)[0]
+
+
+def refined(image):
+    """后台生成清晰层后的渲染"""
+    pyramid = ImagePyramid(image)
+    scale = fit_scale(image.size)
+    pyramid.level(ImagePyramid.factor_for(scale))
+    size = (round(image.width * scale), round(image.height * scale))
+    return pyramid.render(scale, (0, 0) + image.size, size)[0]
+
+
+def zoomed(pyramid):
+    """放大到原图100%后只渲染窗口可见的部分"""
+    width, height = min(VIEW_SIZE[0], pyramid.image.width), min(VIEW_SIZE[1], pyramid.image.height)
+    left = min(pyramid.image.width // 3, pyramid.image.width - width)
+    top = min(pyramid.image.height // 3, pyramid.image.height - height)
+    return pyramid.render(1.0, (left, top, left + width, top + height), (width, height))[0]
+
+
+def timed(func, arg, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {'p50_ms': round(percentile(samples, 0.50), 2), 'p95_ms': round(percentile(samples, 0.95), 2)}
+
+
+def measure_window(image, repeat):
+    """在真实窗口中打开并关闭预览，统计打开的耗时（包括等待Tk线程）"""
+    from ui.preview import PreviewWindow
+    from ui.tk_thread import TkThread
+    tk_thread = TkThread().start()
+    preview = PreviewWindow(tk_thread)
+    samples = []
+    try:
+        # 第一次打开包括创建窗口，不计入统计
+        for index in range(repeat + 1):
+            start = time.perf_counter()
+            tk_thread.call_sync(preview._show, image)
+            if index:
+                samples.append((time.perf_counter() - start) * 1000)
+            tk_thread.call_sync(preview._close)
+    finally:
+        tk_thread.stop()
+    samples.sort()
+    return {'p50_ms': round(percentile(samples, 0.50), 2), 'p95_ms': round(percentile(samples, 0.95), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图预览基准测试")
+    parser.add_argument('--repeat', type=int, default=20, help="重复次数")
+    parser.add_argument('--max-open-ms', type=float, default=50.0, help="首屏耗时阈值，0表示不检查")
+    parser.add_argument('--window', action='store_true', help="在真实窗口中测量打开预览的耗时")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    args = parser.parse_args()
+
+    results = {}
+    for name, size in RESOLUTIONS.items():
+        image = synthetic_capture(size)
+        pyramid = ImagePyramid(image)
+        results[name] = {
+            'legacy': timed(legacy, image, args.repeat),
+            'first_frame': timed(first_frame, image, args.repeat),
+            'refine': timed(refined, image, max(1, args.repeat // 4)),
+            'zoom_100': timed(zoomed, pyramid, args.repeat)
+        }
+        if args.window:
+            results[name]['window_open'] = measure_window(image, args.repeat)
+
+    failures = []
+    for name, row in results.items():
+        key = 'window_open' if args.window else 'first_frame'
+        if args.max_open_ms and row[key]['p95_ms'] > args.max_open_ms:
+            failures.append(f"{name} 打开预览 p95 {row[key]['p95_ms']} ms 超过阈值 {args.max_open_ms} ms")
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        stages = ['legacy', 'first_frame', 'refine', 'zoom_100'] + (['window_open'] if args.window else [])
+        print(f"{'分辨率':<8}" + ''.join(f"{stage:>16}" for stage in stages) + "    (p50/p95 ms)")
+        for name, row in results.items():
+            print(f"{name:<10}" + ''.join(
+                f"{row[stage]['p50_ms']:>9}/{row[stage]['p95_ms']:<6}" for stage in stages
+            ))
+    for failure in failures:
+        print(f"未通过: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
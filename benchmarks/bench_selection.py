@@ -0,0 +1,145 @@
+"""
+框选拖动渲染基准测试
+在真实的遮罩窗口上按指定频率回放合成的鼠标拖动事件，
+对比逐事件重绘（旧实现）与按帧合并重绘的事件处理耗时、重绘次数和Tk线程占用时间
+
+用法：
+    python benchmarks/bench_selection.py [-n 2000] [--rate 1000] [--json]
+
+需要图形界面环境；背景使用与屏幕同尺寸的合成图片，模拟定格截图时的遮罩
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tkinter as tk
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from ui.selection import MIN_SELECTION_SIZE, SelectionOverlay
+from ui.tk_thread import TkThread
+from utils.metrics import percentile
+
+
+def legacy_drag(overlay, event):
+    """旧的拖动处理：每个事件都输出调试信息、重建尺寸文本、移动工具栏并设置按钮状态"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        print(f"Mouse drag to: ({event.x}, {event.y})")
+    overlay.canvas.coords(overlay.current_rect, overlay.start_x, overlay.start_y, event.x, event.y)
+    width = abs(event.x - overlay.start_x)
+    height = abs(event.y - overlay.start_y)
+    if overlay.size_text_id is not None:
+        overlay.canvas.delete(overlay.size_text_id)
+    overlay.size_text_id = overlay.canvas.create_text(
+        min(overlay.start_x, event.x) + width / 2,
+        min(overlay.start_y, event.y) - 10,
+        text=f'{width} x {height}',
+        fill='white'
+    )
+    overlay.toolbar.geometry(f'+{event.x_root}+{event.y_root - 40}')
+    overlay.toolbar.deiconify()
+    if width > MIN_SELECTION_SIZE and height > MIN_SELECTION_SIZE:
+        overlay.confirm_btn.config(state=tk.NORMAL)
+    else:
+        overlay.confirm_btn.config(state=tk.DISABLED)
+
+
+def synthetic_events(count, width, height):
+    """从左上角向右下角拖动的轨迹，带有小幅抖动"""
+    events = []
+    for i in range(count):
+        x = 50 + (width - 100) * i // count + (i % 3)
+        y = 50 + (height - 100) * i // count + (i % 2)
+        events.append(SimpleNamespace(x=x, y=y, x_root=x, y_root=y))
+    return events
+
+
+def replay(tk_thread, overlay, events, rate, handler, coalesced):
+    """按频率把事件投递到Tk线程，返回各项耗时"""
+    handler_times = []
+    render_times = []
+    original_render = overlay._render
+
+    def timed_render():
+        start = time.perf_counter()
+        original_render()
+        render_times.append((time.perf_counter() - start) * 1000)
+
+    # 计时包装需要在调度前替换，overlay.after 引用的是实例属性
+    overlay._render = timed_render
+
+    def timed_handler(event):
+        start = time.perf_counter()
+        handler(event)
+        handler_times.append((time.perf_counter() - start) * 1000)
+
+    tk_thread.call_sync(overlay._on_mouse_down, events[0])
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    for index, event in enumerate(events):
+        tk_thread.call(timed_handler, event)
+        # 忙等待，保证投递频率接近高回报率鼠标
+        deadline = start + (index + 1) * interval
+        while time.perf_counter() < deadline:
+            pass
+    posted = time.perf_counter()
+    # 等待Tk线程处理完所有事件和最后一帧重绘
+    tk_thread.call_sync(lambda: None)
+    time.sleep(0.05)
+    tk_thread.call_sync(lambda: None)
+    lag_ms = (time.perf_counter() - posted) * 1000 - 50
+
+    del overlay._render
+    tk_thread.call_sync(overlay._reset_canvas)
+    handler_times.sort()
+    return {
+        'events': len(handler_times),
+        'handler_mean_us': round(sum(handler_times) / len(handler_times) * 1000, 1),
+        'handler_p95_us': round(percentile(handler_times, 0.95) * 1000, 1),
+        # 旧实现在每个事件中直接重绘
+        'renders': len(render_times) if coalesced else len(handler_times),
+        'tk_busy_ms': round(sum(handler_times) + sum(render_times), 1),
+        'drain_lag_ms': round(max(lag_ms, 0), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="框选拖动渲染基准测试")
+    parser.add_argument('-n', '--events', type=int, default=2000, help="回放的鼠标移动事件数")
+    parser.add_argument('--rate', type=int, default=1000, help="事件频率（次/秒），高回报率鼠标约为1000")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    args = parser.parse_args()
+
+    tk_thread = TkThread().start()
+    overlay = SelectionOverlay(tk_thread, lambda *region: None)
+    tk_thread.call_sync(overlay.build)
+    width, height = tk_thread.call_sync(overlay.screen_size)
+    background = Image.new('RGB', (width, height), (90, 90, 90))
+    tk_thread.call_sync(overlay._show, threading.Event(), background)
+
+    events = synthetic_events(args.events, width, height)
+    results = {
+        'legacy': replay(tk_thread, overlay, events, args.rate, lambda e: legacy_drag(overlay, e), False),
+        'coalesced': replay(tk_thread, overlay, events, args.rate, overlay._on_mouse_drag, True)
+    }
+    tk_thread.call_sync(overlay._cancel_selection)
+    tk_thread.stop()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    print(f"屏幕 {width}x{height}，{args.events} 个事件，{args.rate} 次/秒")
+    print(f"{'实现':<12}{'处理均值us':>12}{'处理p95us':>12}{'重绘次数':>10}{'Tk占用ms':>12}{'积压ms':>10}")
+    for name, row in results.items():
+        print(f"{name:<14}{row['handler_mean_us']:>12}{row['handler_p95_us']:>12}{row['renders']:>12}"
+              f"{row['tk_busy_ms']:>12}{row['drain_lag_ms']:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+启动耗时基准测试
+在独立进程中多次导入 main 模块，统计导入耗时，并检查重量级模块没有在启动时被导入；
+可选地启动完整程序，从输出中读取快捷键就绪耗时。超过阈值或比基线慢时以非零状态退出
+
+用法：
+    python benchmarks/bench_startup.py [-n 10] [--ready] [--max-import-ms 150] [--max-ready-ms 500]
+                                       [--baseline startup.json] [--tolerance 0.2] [--json]
+
+--ready 需要图形界面环境和可用的快捷键监听
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 这些模块应在首次使用或后台预热时才导入
+DEFERRED_MODULES = ['requests', 'urllib3', 'PIL.ImageTk', 'PIL.ImageGrab', 'tkinter', 'pynput', 'pystray',
+                    'dotenv', 'core.ocr', 'core.screenshot', 'core.history']
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({'import_ms': elapsed, 'modules': [m for m in %r if m in sys.modules]}))
+"""
+READY_PATTERN = re.compile(r'快捷键就绪，启动耗时 (\d+) ms')
+
+
+def child_env():
+    return dict(os.environ, PYTHONIOENCODING='utf-8', PYTHONUNBUFFERED='1')
+
+
+def measure_import(runs):
+    """多次在新进程中导入 main，返回各次耗时和启动时被导入的重量级模块"""
+    samples = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_PROBE % DEFERRED_MODULES],
+            cwd=ROOT, env=child_env(), capture_output=True, text=True, encoding='utf-8', check=True
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        samples.append(probe['import_ms'])
+        loaded.update(probe['modules'])
+    return samples, sorted(loaded)
+
+
+def measure_ready(runs, timeout):
+    """启动完整程序，读取快捷键就绪耗时后结束进程，无法启动时返回空列表"""
+    samples = []
+    for _ in range(runs):
+        process = subprocess.Popen(
+            [sys.executable, 'main.py'], cwd=ROOT, env=child_env(),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8'
+        )
+        # 在线程中读取输出，程序卡住不输出时也能按时结束等待
+        lines = queue.Queue()
+        reader = threading.Thread(target=_read_lines, args=(process.stdout, lines), daemon=True)
+        reader.start()
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    line = lines.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if line is None:
+                    break
+                match = READY_PATTERN.search(line)
+                if match:
+                    samples.append(float(match.group(1)))
+                    break
+        finally:
+            process.kill()
+            process.wait()
+            reader.join(timeout=1)
+    return samples
+
+
+def _read_lines(stream, lines):
+    """逐行读取子进程输出放入队列，结束时放入None"""
+    try:
+        for line in stream:
+            lines.put(line)
+    finally:
+        lines.put(None)
+
+
+def check(results, args):
+    """返回未通过的检查项"""
+    failures = []
+    if results['deferred_loaded']:
+        failures.append(f"启动时导入了应延迟的模块: {', '.join(results['deferred_loaded'])}")
+    if args.max_import_ms and results['import_ms'] > args.max_import_ms:
+        failures.append(f"导入耗时 {results['import_ms']} ms 超过阈值 {args.max_import_ms} ms")
+    ready = results.get('ready_ms')
+    if ready is not None and args.max_ready_ms and ready > args.max_ready_ms:
+        failures.append(f"快捷键就绪耗时 {ready} ms 超过阈值 {args.max_ready_ms} ms")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for key in ('import_ms', 'ready_ms'):
+            if results.get(key) is None or not baseline.get(key):
+                continue
+            limit = baseline[key] * (1 + args.tolerance)
+            if results[key] > limit:
+                failures.append(f"{key} {results[key]} 比基线 {baseline[key]} 慢超过 {args.tolerance:.0%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument('-n', '--runs', type=int, default=10, help="重复次数，取中位数")
+    parser.add_argument('--ready', action='store_true', help="同时测量完整程序的快捷键就绪耗时")
+    parser.add_argument('--timeout', type=float, default=10.0, help="等待快捷键就绪的最长时间（秒）")
+    parser.add_argument('--max-import-ms', type=float, default=150.0, help="导入耗时阈值，0表示不检查")
+    parser.add_argument('--max-ready-ms', type=float, default=500.0, help="快捷键就绪耗时阈值，0表示不检查")
+    parser.add_argument('--baseline', help="基线结果JSON文件，用于比较")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许比基线慢的比例")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    args = parser.parse_args()
+
+    import_samples, loaded = measure_import(args.runs)
+    results = {
+        'runs': args.runs,
+        'import_ms': round(statistics.median(import_samples), 1),
+        'import_max_ms': round(max(import_samples), 1),
+        'deferred_loaded': loaded,
+        'ready_ms': None
+    }
+    if args.ready:
+        ready_samples = measure_ready(args.runs, args.timeout)
+        if ready_samples:
+            results['ready_ms'] = round(statistics.median(ready_samples), 1)
+        else:
+            print("未能读取快捷键就绪耗时（需要图形界面环境）", file=sys.stderr)
+    failures = check(results, args)
+    results['passed'] = not failures
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(f"导入 main 中位数 {results['import_ms']} ms，最大 {results['import_max_ms']} ms（{args.runs} 次）")
+        if results['ready_ms'] is not None:
+            print(f"快捷键就绪中位数 {results['ready_ms']} ms")
+        print(f"启动时已导入的延迟模块: {', '.join(loaded) or '无'}")
+    for failure in failures:
+        print(f"未通过: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
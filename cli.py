@@ -0,0 +1,196 @@
+"""
+命令行入口
+
+用法：
+    python main.py batch <文件/通配符/目录>... [-w 4] [-o results.jsonl] [--checkpoint done.txt]
+    python main.py watch [--region x1,y1,x2,y2 | --select] [--interval 1.0]
+    python main.py history [搜索词] [-n 20] [--json]
+    python main.py stats [--trace traces.jsonl]
+"""
+import argparse
+import json
+import logging
+import sys
+
+
+def run_batch(args):
+    """批量识别图片"""
+    from config.settings import get_settings
+    from core.batch import BatchRunner, collect_paths
+    from core.ocr import OCRManager
+    from utils.metrics import metrics
+
+    paths = collect_paths(args.inputs)
+    if not paths:
+        print("没有找到需要识别的图片", file=sys.stderr)
+        return 1
+
+    if args.output == '-':
+        output = sys.stdout
+        # 标准输出只保留JSON Lines结果，其余提示信息改写到标准错误
+        sys.stdout = sys.stderr
+    else:
+        output = open(args.output, 'a' if args.checkpoint else 'w', encoding='utf-8')
+
+    settings = get_settings()
+    metrics.configure(window=settings.METRICS_WINDOW, trace_file=settings.METRICS_TRACE_FILE)
+    ocr_manager = OCRManager()
+    runner = BatchRunner(ocr_manager, workers=args.workers, checkpoint_path=args.checkpoint)
+    try:
+        summary = runner.run(paths, output)
+    finally:
+        ocr_manager.close()
+        if output is not sys.__stdout__:
+            output.close()
+        sys.stdout = sys.__stdout__
+
+    print(f"批量识别完成: 共 {summary['total']} 个，成功 {summary['succeeded']} 个，"
+          f"失败 {summary['failed']} 个，跳过 {summary['skipped']} 个，"
+          f"耗时 {summary['elapsed_s']} 秒", file=sys.stderr)
+    print(metrics.format_summary(), file=sys.stderr)
+    return 0 if summary['failed'] == 0 else 2
+
+
+def run_watch(args):
+    """监视屏幕区域，画面变化时输出新增或变化的文字行"""
+    from config.settings import get_settings
+    from core.ocr import OCRManager
+    from core.screenshot import ScreenshotManager
+    from core.watch import format_region, parse_region
+    from utils.metrics import metrics
+
+    settings = get_settings()
+    logging.basicConfig(level=settings.LOG_LEVEL, format='%(levelname)s %(name)s: %(message)s')
+    metrics.configure(window=settings.METRICS_WINDOW, trace_file=settings.METRICS_TRACE_FILE)
+    # 标准输出只保留识别出的文字行
+    output = sys.stdout
+    sys.stdout = sys.stderr
+
+    screenshot_manager = ScreenshotManager(
+        frozen_frame=settings.SCREENSHOT_FROZEN_FRAME,
+        capture_backend=settings.SCREENSHOT_BACKEND
+    )
+    region = parse_region(args.region or settings.WATCH_REGION)
+    if args.select:
+        if screenshot_manager.start_region_selection() is None:
+            print("已取消选择")
+            sys.stdout = sys.__stdout__
+            return 1
+        region = screenshot_manager.last_region
+        settings.update(WATCH_REGION=format_region(region))
+        print(f"监视区域已保存: {settings.WATCH_REGION}")
+    if region is None:
+        print("请通过 --region 或 --select 指定监视区域，或在配置中设置 WATCH_REGION")
+        sys.stdout = sys.__stdout__
+        return 1
+
+    def emit(lines):
+        for line in lines:
+            output.write(line + '\n')
+        output.flush()
+
+    ocr_manager = OCRManager()
+    watcher = screenshot_manager.create_watcher(
+        region,
+        ocr_manager.recognize,
+        interval=args.interval or settings.WATCH_INTERVAL,
+        block_size=settings.WATCH_BLOCK_SIZE,
+        threshold=settings.WATCH_THRESHOLD,
+        on_lines=emit
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        screenshot_manager.close()
+        ocr_manager.close()
+        sys.stdout = sys.__stdout__
+    print(f"共截图 {watcher.polls} 次，识别 {watcher.recognitions} 次", file=sys.stderr)
+    print(metrics.format_summary(), file=sys.stderr)
+    return 0
+
+
+def run_history(args):
+    """搜索识别历史"""
+    import time
+    from config.settings import get_settings
+    from core.history import HistoryStore
+
+    history = HistoryStore.from_settings(get_settings())
+    start = time.perf_counter()
+    entries = history.search(args.query, limit=args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    history.close()
+
+    if args.json:
+        for entry in entries:
+            print(json.dumps(entry, ensure_ascii=False))
+        return 0
+    for entry in entries:
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['created_at']))
+        print(f"[{entry['id']}] {stamp} ({entry['source']})")
+        print(entry['text'])
+        print()
+    print(f"{len(entries)} 条结果，耗时 {elapsed:.1f} ms", file=sys.stderr)
+    return 0
+
+
+def run_stats(args):
+    """汇总导出的性能链路文件"""
+    from utils.metrics import format_summary, load_trace_file, summarize
+
+    trace_file = args.trace
+    if not trace_file:
+        from config.settings import get_settings
+        trace_file = get_settings().METRICS_TRACE_FILE
+    if not trace_file:
+        print("请通过 --trace 指定链路文件，或在配置中设置 METRICS_TRACE_FILE", file=sys.stderr)
+        return 1
+
+    summary = summarize(load_trace_file(trace_file))
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(format_summary(summary))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ScreenOCR', description="屏幕文字识别工具命令行")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    batch = subparsers.add_parser('batch', help="批量识别图片")
+    batch.add_argument('inputs', nargs='+', help="图片文件、通配符或目录")
+    batch.add_argument('-w', '--workers', type=int, default=4, help="并发识别数")
+    batch.add_argument('-o', '--output', default='-', help="结果输出文件，默认输出到标准输出")
+    batch.add_argument('--checkpoint', help="检查点文件，记录已完成的图片以便中断后继续")
+    batch.set_defaults(func=run_batch)
+
+    watch = subparsers.add_parser('watch', help="监视屏幕区域的文字变化")
+    watch.add_argument('--region', help="监视区域，物理像素坐标 x1,y1,x2,y2，默认使用 WATCH_REGION")
+    watch.add_argument('--select', action='store_true', help="框选监视区域并保存到配置")
+    watch.add_argument('--interval', type=float, help="截图间隔秒数，默认使用 WATCH_INTERVAL")
+    watch.set_defaults(func=run_watch)
+
+    history = subparsers.add_parser('history', help="搜索识别历史")
+    history.add_argument('query', nargs='*', help='搜索词，支持 "短语" 和 前缀*，为空时列出最近的记录')
+    history.add_argument('-n', '--limit', type=int, default=20, help="最多显示的条数")
+    history.add_argument('--json', action='store_true', help="以JSON Lines格式输出")
+    history.set_defaults(func=run_history)
+
+    stats = subparsers.add_parser('stats', help="查看各阶段耗时统计")
+    stats.add_argument('--trace', help="链路文件，默认使用 METRICS_TRACE_FILE")
+    stats.add_argument('--json', action='store_true', help="以JSON格式输出")
+    stats.set_defaults(func=run_stats)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import os
+import threading
+from config.settings import get_settings
+
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+
+KEY_NAMES = ('BAIDU_API_KEY', 'BAIDU_SECRET_KEY')
+# Windows 中用户和系统环境变量所在的注册表位置
+REGISTRY_LOCATIONS = (
+    ('HKEY_CURRENT_USER', r'Environment'),
+    ('HKEY_LOCAL_MACHINE', r'SYSTEM\CurrentControlSet\Control\Session Manager\Environment')
+)
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def from_environ():
+    """进程环境变量"""
+    return {name: os.environ.get(name) for name in KEY_NAMES}
+
+
+def from_dotenv():
+    """项目目录下的.env文件（环境变量中的空值不会被.env覆盖，因此单独读取一次）"""
+    from dotenv import dotenv_values
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+    if not os.path.exists(path):
+        return {}
+    values = dotenv_values(path)
+    return {name: values.get(name) for name in KEY_NAMES}
+
+
+def from_keyring():
+    """系统密钥库（Windows凭据管理器、macOS钥匙串、Secret Service），需要安装 keyring"""
+    try:
+        import keyring
+    except ImportError:
+        return {}
+    service = get_settings().KEYRING_SERVICE
+    return {name: keyring.get_password(service, name) for name in KEY_NAMES}
+
+
+def from_registry():
+    """Windows 注册表中的用户和系统环境变量"""
+    try:
+        import winreg
+    except ImportError:
+        return {}
+    values = {}
+    for hive, path in REGISTRY_LOCATIONS:
+        try:
+            key = winreg.OpenKey(getattr(winreg, hive), path, 0, winreg.KEY_READ)
+        except OSError:
+            continue
+        try:
+            for name in KEY_NAMES:
+                if values.get(name):
+                    continue
+                try:
+                    values[name], _ = winreg.QueryValueEx(key, name)
+                except OSError:
+                    pass
+        finally:
+            winreg.CloseKey(key)
+    return values
+
+
+# 按顺序查找，靠前的来源优先
+PROVIDERS = (
+    ('环境变量', from_environ),
+    ('.env', from_dotenv),
+    ('系统密钥库', from_keyring),
+    ('注册表', from_registry)
+)
+
+
+class CredentialResolver:
+    """
+    百度 API 密钥查找
+    依次从各来源读取密钥，在后台线程中执行且只查找一次，结果缓存在进程内；
+    界面通过 state 和 subscribe 获知查找结果，找不到密钥时不会阻止程序启动
+    """
+
+    def __init__(self, providers=PROVIDERS):
+        """
+        :param providers: [(来源名称, 返回 {变量名: 值} 的函数)]
+        """
+        self.providers = providers
+        self.state = PENDING
+        self.source = None
+        self.error = None
+        self._values = {}
+        self._done = threading.Event()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """在后台线程中开始查找"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._resolve, name='credentials', daemon=True)
+                self._thread.start()
+        return self
+
+    def _resolve(self):
+        sources = []
+        try:
+            for name, provider in self.providers:
+                try:
+                    found = provider()
+                except Exception as e:
+                    print(f"从{name}读取API密钥失败: {e}")
+                    continue
+                for key in KEY_NAMES:
+                    value = (found.get(key) or '').strip()
+                    if value and not self._values.get(key):
+                        self._values[key] = value
+                        if name not in sources:
+                            sources.append(name)
+                if all(self._values.get(key) for key in KEY_NAMES):
+                    break
+        finally:
+            self._finish(sources)
+
+    def _finish(self, sources):
+        missing = [key for key in KEY_NAMES if not self._values.get(key)]
+        if missing:
+            self.state = FAILED
+            self.error = f"未找到 {', '.join(missing)}，可在系统环境变量、.env文件或系统密钥库中设置"
+            print(f"API 密钥查找失败: {self.error}")
+        else:
+            self.source = '、'.join(sources)
+            api_key = self._values['BAIDU_API_KEY']
+            # 子进程和只读取环境变量的代码也能获得密钥
+            os.environ.update(self._values)
+            get_settings().update(
+                persist=False,
+                API_KEY=api_key,
+                SECRET_KEY=self._values['BAIDU_SECRET_KEY']
+            )
+            self.state = READY
+            print(f"API 密钥已就绪（来源：{self.source}）：API_KEY: {api_key[:8]}...")
+        self._done.set()
+        with self._lock:
+            listeners, self._listeners = self._listeners, []
+        for callback in listeners:
+            self._notify(callback)
+
+    def _notify(self, callback):
+        try:
+            callback(self)
+        except Exception as e:
+            print(f"通知密钥查找结果失败: {e}")
+
+    def subscribe(self, callback):
+        """查找完成后调用 callback(resolver)，已完成时立即调用"""
+        with self._lock:
+            if not self._done.is_set():
+                self._listeners.append(callback)
+                return
+        self._notify(callback)
+
+    def wait(self, timeout=None):
+        """
+        等待查找完成（未开始时先开始）
+        :return: 密钥是否可用
+        """
+        self.start()
+        self._done.wait(timeout)
+        return self.state == READY
+
+    def describe(self):
+        """界面上显示的状态文字"""
+        if self.state == READY:
+            return f"API 密钥: 已就绪（{self.source}）"
+        if self.state == FAILED:
+            return "API 密钥: 未找到"
+        return "API 密钥: 查找中..."
+
+
+def get_credentials():
+    """获取进程共享的密钥查找器，首次调用时在后台开始查找"""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = CredentialResolver().start()
+    return _resolver
@@ -1,12 +1,35 @@
 import os
-from dotenv import load_dotenv
-import requests
+import threading
+
+_settings = None
+_settings_lock = threading.Lock()
+_env_loaded = False
+
+
+def _load_env():
+    """加载.env文件中的环境变量（每个进程只加载一次）"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_settings():
+    """
+    获取进程共享的配置（首次调用时加载）
+    各模块都应通过该函数获取配置，配置修改后通过 subscribe 注册的回调通知各模块
+    """
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings()
+    return _settings
 
-# 加载.env文件中的环境变量
-load_dotenv()
 
 def load_config():
-    load_dotenv()
+    _load_env()
     
     config = {
         'BAIDU_API_KEY': os.getenv('BAIDU_API_KEY'),
@@ -21,26 +44,50 @@ def load_config():
 
 class Settings:
     def __init__(self):
-        # OCR API配置
+        _load_env()
+        # 配置变化的监听函数 {配置项: [回调]}，键为None时监听所有配置项
+        self._listeners = {}
+
+        # OCR API配置（环境变量中没有时由 config.credentials 在后台从其他来源查找）
         self.API_KEY = os.getenv("BAIDU_API_KEY")
         self.SECRET_KEY = os.getenv("BAIDU_SECRET_KEY")
+        # 系统密钥库中的服务名；识别时等待密钥查找的最长时间（秒）
+        self.KEYRING_SERVICE = os.getenv("KEYRING_SERVICE", "screen-ocr")
+        self.CREDENTIAL_TIMEOUT = float(os.getenv("CREDENTIAL_TIMEOUT", "10"))
         
-        # 检查必要的环境变量
-        if not self.API_KEY or not self.SECRET_KEY:
-            print("错误: 请确保已设置BAIDU_API_KEY和BAIDU_SECRET_KEY环境变量")
-            print("可以通过以下方式设置：")
-            print("1. 在系统环境变量中设置")
-            print("2. 在.env文件中设置")
-            print("3. 在运行程序前临时设置：")
-            print("   Windows PowerShell:")
-            print("   $env:BAIDU_API_KEY='你的API_KEY'")
-            print("   $env:BAIDU_SECRET_KEY='你的SECRET_KEY'")
-        
-        self.OCR_API_URL = "https://aip.baidubce.com/oauth/2.0/token"
-        self.OCR_REQUEST_URL = "https://aip.baidubce.com/rest/2.0/ocr/v1/general_basic"
+        # 服务地址可指向本地模拟服务（见 core/backends/mock_server.py）
+        self.OCR_API_BASE = os.getenv("OCR_API_BASE", "https://aip.baidubce.com").rstrip('/')
+        self.OCR_API_URL = f"{self.OCR_API_BASE}/oauth/2.0/token"
+        # 识别接口（general 返回每行坐标，用于版面重排；general_basic 不返回坐标）
+        self.OCR_ENDPOINT = os.getenv("OCR_ENDPOINT", "general")
+        self.OCR_REQUEST_URL = f"{self.OCR_API_BASE}/rest/2.0/ocr/v1/{self.OCR_ENDPOINT}"
+        # 复制前按版面重排文字（合并折行、按分栏顺序输出），false时每个识别行占一行
+        self.OCR_LAYOUT = os.getenv("OCR_LAYOUT", "true").lower() == "true"
+
+        # OCR后端配置（baidu/tesseract/auto，auto时像素数不超过阈值的小图使用本地识别）
+        self.OCR_BACKEND = os.getenv("OCR_BACKEND", "baidu")
+        self.OCR_LOCAL_MAX_PIXELS = int(os.getenv("OCR_LOCAL_MAX_PIXELS", "120000"))
+        self.TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
+        self.TESSERACT_LANG = os.getenv("TESSERACT_LANG", "chi_sim+eng")
+        self.TESSERACT_TIMEOUT = float(os.getenv("TESSERACT_TIMEOUT", "30"))
+
+        # OCR请求参数
+        self.OCR_LANGUAGE_TYPE = os.getenv("OCR_LANGUAGE_TYPE", "CHN_ENG")
+        self.OCR_DETECT_DIRECTION = os.getenv("OCR_DETECT_DIRECTION", "true")
+
+        # 网络配置（连接池、超时与重试）
+        self.HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "4"))
+        self.HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+        self.HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+        self.HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+        self.HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
         
         # 快捷键配置
         self.SCREENSHOT_HOTKEY = os.getenv("SCREENSHOT_HOTKEY", "ctrl+alt+z")
+        # 定格截图：按下快捷键时截取整屏作为遮罩背景，选区直接从该帧裁剪
+        self.SCREENSHOT_FROZEN_FRAME = os.getenv("SCREENSHOT_FROZEN_FRAME", "true").lower() == "true"
+        # 截图后端（auto/xshm/mss/imagegrab）
+        self.SCREENSHOT_BACKEND = os.getenv("SCREENSHOT_BACKEND", "auto")
         
         # UI配置
         self.WINDOW_WIDTH = int(os.getenv("WINDOW_WIDTH", "800"))
@@ -48,23 +95,126 @@ class Settings:
         
         # 临时文件配置
         self.TEMP_DIR = os.getenv("TEMP_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "temp"))
-        if not os.path.exists(self.TEMP_DIR):
-            os.makedirs(self.TEMP_DIR)
+        os.makedirs(self.TEMP_DIR, exist_ok=True)
+
+        # access token缓存配置（提前刷新的秒数）
+        self.TOKEN_CACHE_FILE = os.getenv("TOKEN_CACHE_FILE") or os.path.join(self.TEMP_DIR, "access_token.json")
+        self.TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", "86400"))
+
+        # 上传前图片预处理配置（候选格式可选 png/palette/jpeg，文字行高为0时不缩放）
+        self.PREPROCESS_GRAYSCALE = os.getenv("PREPROCESS_GRAYSCALE", "true").lower() == "true"
+        self.PREPROCESS_BINARIZE = os.getenv("PREPROCESS_BINARIZE", "false").lower() == "true"
+        self.PREPROCESS_CROP = os.getenv("PREPROCESS_CROP", "true").lower() == "true"
+        self.PREPROCESS_TEXT_HEIGHT = int(os.getenv("PREPROCESS_TEXT_HEIGHT", "32"))
+        self.PREPROCESS_FORMATS = os.getenv("PREPROCESS_FORMATS", "png,palette,jpeg")
+        self.PREPROCESS_JPEG_QUALITY = int(os.getenv("PREPROCESS_JPEG_QUALITY", "85"))
+
+        # 大图分块识别配置（条带最大高度、触发分块的像素总数、条带重叠高度、并发数）
+        self.OCR_TILE_MAX_HEIGHT = int(os.getenv("OCR_TILE_MAX_HEIGHT", "2048"))
+        self.OCR_TILE_MAX_PIXELS = int(os.getenv("OCR_TILE_MAX_PIXELS", str(4096 * 2048)))
+        self.OCR_TILE_OVERLAP = int(os.getenv("OCR_TILE_OVERLAP", "64"))
+        self.OCR_TILE_WORKERS = int(os.getenv("OCR_TILE_WORKERS", "4"))
+
+        # 识别引擎配置（并发数、排队上限、队列满时的策略：block/drop_oldest/coalesce）
+        self.OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+        self.OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "4"))
+        self.OCR_QUEUE_POLICY = os.getenv("OCR_QUEUE_POLICY", "drop_oldest")
+
+        # 请求调度配置（账号QPS上限，0表示不限速；令牌桶容量留空时与QPS相同；QPS超限和临时错误的重试次数与退避时间）
+        self.OCR_QPS = float(os.getenv("OCR_QPS", "2"))
+        self.OCR_QPS_BURST = float(os.getenv("OCR_QPS_BURST") or 0)
+        self.OCR_RETRIES = int(os.getenv("OCR_RETRIES", "3"))
+        self.OCR_RETRY_BACKOFF = float(os.getenv("OCR_RETRY_BACKOFF", "0.5"))
+        self.OCR_RETRY_MAX_DELAY = float(os.getenv("OCR_RETRY_MAX_DELAY", "8"))
+
+        # OCR结果缓存配置（内存条目数为0时关闭缓存，磁盘目录留空时仅使用内存）
+        self.OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "64"))
+        self.OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "")
+        self.OCR_CACHE_DISK_MB = int(os.getenv("OCR_CACHE_DISK_MB", "50"))
+
+        # 区域监视配置（区域为物理像素坐标 x1,y1,x2,y2；块平均亮度变化超过阈值才重新识别）
+        self.WATCH_REGION = os.getenv("WATCH_REGION", "")
+        self.WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "1.0"))
+        self.WATCH_BLOCK_SIZE = int(os.getenv("WATCH_BLOCK_SIZE", "16"))
+        self.WATCH_THRESHOLD = int(os.getenv("WATCH_THRESHOLD", "8"))
+
+        # 识别历史配置（数据库默认保存在TEMP_DIR下；最多保留条数为0时不限制）
+        self.HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "true").lower() == "true"
+        self.HISTORY_DB = os.getenv("HISTORY_DB") or os.path.join(self.TEMP_DIR, "history.db")
+        self.HISTORY_THUMBNAILS = os.getenv("HISTORY_THUMBNAILS", "false").lower() == "true"
+        self.HISTORY_MAX_ENTRIES = int(os.getenv("HISTORY_MAX_ENTRIES", "0"))
+
+        # 截图内存预算（MB，包括复用的整屏缓冲区和等待识别、预览的截图；0表示不复用缓冲区）
+        self.IMAGE_MEMORY_MB = int(os.getenv("IMAGE_MEMORY_MB", "256"))
+
+        # 性能统计配置（每个阶段保留的样本数；设置导出文件后每次截图的链路以JSON Lines追加写入）
+        self.METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1000"))
+        self.METRICS_TRACE_FILE = os.getenv("METRICS_TRACE_FILE", "")
+
+        # 调试配置：设置后会把每次上传的截图另存到该目录
+        self.DEBUG_DUMP_DIR = os.getenv("DEBUG_DUMP_DIR", "")
+        # 日志级别，DEBUG 时输出鼠标拖动等调试信息
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
             
-    def get_access_token(self):
-        """获取百度API access token"""
+    def subscribe(self, callback, *keys):
+        """
+        监听配置变化
+        :param callback: 回调函数，签名为 callback(配置项, 新值)
+        :param keys: 要监听的配置项，不指定时监听所有配置项
+        """
+        for key in keys or (None,):
+            self._listeners.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, callback):
+        for callbacks in self._listeners.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def update(self, persist=True, **changes):
+        """
+        修改配置并通知监听者
+        :param persist: 是否写回.env文件
+        :param changes: 配置项及新值
+        :return: 实际发生变化的配置项字典
+        """
+        changed = {key: value for key, value in changes.items() if getattr(self, key, None) != value}
+        for key, value in changed.items():
+            setattr(self, key, value)
+        if persist and changed:
+            self.save()
+        for key, value in changed.items():
+            for callback in self._listeners.get(key, []) + self._listeners.get(None, []):
+                try:
+                    callback(key, value)
+                except Exception as e:
+                    print(f"通知配置变化失败: {e}")
+        return changed
+
+    def fetch_access_token(self):
+        """
+        向百度API申请access token
+        :return: 包含access_token和expires_in的字典，失败时返回None
+        """
         params = {
             'grant_type': 'client_credentials',
             'client_id': self.API_KEY,
             'client_secret': self.SECRET_KEY
         }
         try:
-            response = requests.get(self.OCR_API_URL, params=params)
+            from utils import http
+            response = http.get(self.OCR_API_URL, params=params)
             if response.ok:
-                return response.json().get('access_token')
+                return response.json()
         except Exception as e:
             print(f"获取access token失败: {e}")
         return None
+
+    def get_access_token(self):
+        """获取百度API access token"""
+        result = self.fetch_access_token()
+        if result:
+            return result.get('access_token')
+        return None
         
     def save(self):
         """保存设置到.env文件"""
@@ -77,16 +227,18 @@ class Settings:
         else:
             lines = []
             
-        # 更新或添加SCREENSHOT_HOTKEY
-        hotkey_found = False
-        for i, line in enumerate(lines):
-            if line.startswith('SCREENSHOT_HOTKEY='):
-                lines[i] = f'SCREENSHOT_HOTKEY={self.SCREENSHOT_HOTKEY}\n'
-                hotkey_found = True
-                break
-                
-        if not hotkey_found:
-            lines.append(f'SCREENSHOT_HOTKEY={self.SCREENSHOT_HOTKEY}\n')
+        # 更新或添加界面上可修改的配置项
+        for key in ('SCREENSHOT_HOTKEY', 'WATCH_REGION'):
+            value = getattr(self, key)
+            key_found = False
+            for i, line in enumerate(lines):
+                if line.startswith(f'{key}='):
+                    lines[i] = f'{key}={value}\n'
+                    key_found = True
+                    break
+
+            if not key_found and value:
+                lines.append(f'{key}={value}\n')
             
         # 写回.env文件
         with open(env_path, 'w', encoding='utf-8') as f:
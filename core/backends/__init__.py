@@ -0,0 +1,31 @@
+# OCR后端模块
+from core.backends.base import OCRBackend, OCRAPIError
+
+
+def _create_baidu(settings):
+    """百度后端受账号QPS限制，请求统一经过进程共享的调度器"""
+    from core.backends.baidu import BaiduBackend
+    from core.backends.scheduler import ScheduledBackend, get_scheduler
+    return ScheduledBackend(BaiduBackend(settings), get_scheduler(), workers=settings.HTTP_POOL_SIZE)
+
+
+def create_backend(settings):
+    """
+    根据 OCR_BACKEND 配置创建后端
+    baidu：百度云端识别；tesseract：本地离线识别；auto：小图本地识别，其余走百度
+    """
+    name = settings.OCR_BACKEND.lower()
+    if name == 'baidu':
+        return _create_baidu(settings)
+    if name == 'tesseract':
+        from core.backends.tesseract import TesseractBackend
+        return TesseractBackend(settings)
+    if name == 'auto':
+        from core.backends.tesseract import TesseractBackend
+        from core.backends.router import RoutingBackend
+        return RoutingBackend(
+            _create_baidu(settings),
+            TesseractBackend(settings),
+            settings.OCR_LOCAL_MAX_PIXELS
+        )
+    raise ValueError(f"未知的OCR后端: {settings.OCR_BACKEND}")
@@ -0,0 +1,120 @@
+import base64
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.credentials import get_credentials, FAILED
+from core.backends.base import OCRBackend, OCRAPIError
+from core.preprocess import MAX_BASE64_BYTES, MAX_SIDE
+from core.token_store import TokenStore, INVALID_TOKEN_ERROR_CODES
+from utils import http
+from utils.metrics import metrics
+
+
+class BaiduBackend(OCRBackend):
+    """百度通用文字识别"""
+
+    name = 'baidu'
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._token_store = None
+        self._token_store_lock = threading.Lock()
+
+    @property
+    def token_store(self):
+        """首次使用时等待密钥查找完成后再创建，缓存的token与密钥对应"""
+        if self._token_store is None:
+            with self._token_store_lock:
+                if self._token_store is None:
+                    with metrics.span('credentials'):
+                        ready = get_credentials().wait(self.settings.CREDENTIAL_TIMEOUT)
+                    if not ready:
+                        raise Exception(f"API 密钥不可用: {get_credentials().error or '查找超时'}")
+                    self._token_store = TokenStore(self.settings)
+        return self._token_store
+
+    def _get_access_token(self):
+        """获取百度API access token（优先使用持久化缓存）"""
+        with metrics.span('token'):
+            access_token = self.token_store.get_token()
+        if not access_token:
+            print("获取access token失败，请检查API_KEY和SECRET_KEY是否正确")
+            raise Exception("无法获取access token")
+        return access_token
+
+    def recognize(self, image_bytes, params=None):
+        """
+        发送OCR请求，token失效时刷新一次后重试
+        :param image_bytes: 编码后的图片字节
+        :param params: 请求参数
+        :return: OCR API返回的JSON结果
+        """
+        access_token = self._get_access_token()
+
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+
+        data = {
+            'image': base64.b64encode(image_bytes),
+            'probability': 'true'         # 返回识别结果的置信度
+        }
+        # 语言类型（默认中英文混合）与文字方向检测
+        data.update(params or {})
+
+        for attempt in range(2):
+            print("正在发送OCR请求...")
+            # 发送OCR请求
+            with metrics.span('http'):
+                response = http.post(
+                    self.settings.OCR_REQUEST_URL,
+                    params={'access_token': access_token},
+                    headers=headers,
+                    data=data
+                )
+
+            if not response.ok:
+                print(f"响应内容: {response.text}")
+                raise Exception(f"OCR请求失败: HTTP {response.status_code}")
+
+            with metrics.span('json_parse'):
+                result = response.json()
+            print(f"OCR响应: {json.dumps(result, ensure_ascii=False, indent=2)}")
+
+            # token失效时刷新一次并重试
+            if result.get('error_code') in INVALID_TOKEN_ERROR_CODES and attempt == 0:
+                print("access token已失效，正在刷新...")
+                access_token = self.token_store.refresh(stale_token=access_token)
+                if not access_token:
+                    raise Exception("无法获取access token")
+                continue
+
+            # 检查错误码
+            if 'error_code' in result:
+                raise OCRAPIError(result['error_code'], result.get('error_msg', '未知错误'))
+
+            return result
+
+    def batch_recognize(self, images, params=None):
+        """并发识别多张图片，并发数与连接池大小一致"""
+        if len(images) <= 1:
+            return [self.recognize(image_bytes, params) for image_bytes in images]
+        with ThreadPoolExecutor(max_workers=self.settings.HTTP_POOL_SIZE) as executor:
+            return list(executor.map(lambda image_bytes: self.recognize(image_bytes, params), images))
+
+    def capabilities(self):
+        return {
+            'local': False,
+            'locations': not self.settings.OCR_ENDPOINT.endswith('_basic'),
+            'probability': True,
+            'max_side': MAX_SIDE,
+            'max_bytes': MAX_BASE64_BYTES
+        }
+
+    def available(self):
+        # 密钥仍在查找时视为可用，识别时再等待结果
+        return get_credentials().state != FAILED
+
+    def close(self):
+        if self._token_store is not None:
+            self._token_store.stop()
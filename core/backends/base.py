@@ -0,0 +1,56 @@
+class OCRAPIError(Exception):
+    """OCR服务返回的业务错误"""
+
+    def __init__(self, code, message):
+        super().__init__(f"OCR API返回错误: {message} (错误码: {code})")
+        self.code = code
+        self.message = message
+
+
+class OCRBackend:
+    """
+    OCR后端接口
+    所有后端都接收编码后的图片字节，返回与百度API格式一致的结果字典：
+    {'words_result': [{'words': ..., 'location': {...}, 'probability': {...}}], ...}
+    """
+
+    name = 'base'
+
+    def recognize(self, image_bytes, params=None):
+        """
+        识别单张图片
+        :param image_bytes: 编码后的图片字节
+        :param params: 请求参数（language_type、detect_direction等）
+        :return: OCR结果字典
+        """
+        raise NotImplementedError
+
+    def batch_recognize(self, images, params=None):
+        """
+        识别多张图片，默认逐张识别
+        :param images: 编码后的图片字节列表
+        :return: 与输入一一对应的OCR结果字典列表
+        """
+        return [self.recognize(image_bytes, params) for image_bytes in images]
+
+    def capabilities(self):
+        """
+        后端能力描述
+        :return: 字典，包含 local（是否本地识别）、locations（是否返回坐标）、
+                 probability（是否返回置信度）、max_side、max_bytes 等字段
+        """
+        return {
+            'local': False,
+            'locations': False,
+            'probability': False,
+            'max_side': None,
+            'max_bytes': None
+        }
+
+    def available(self):
+        """后端当前是否可用"""
+        return True
+
+    def close(self):
+        """释放后端资源"""
+        pass
@@ -0,0 +1,191 @@
+"""
+本地模拟百度OCR服务
+实现 token 接口和文字识别接口，可配置响应延迟与错误注入，
+用于在没有网络和API额度的情况下进行压力测试与延迟测试
+
+用法：
+    python -m core.backends.mock_server --port 8700 --latency 0.2 --error-rate 0.05
+然后在 .env 中设置 OCR_API_BASE=http://127.0.0.1:8700
+"""
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+TOKEN_PATH = '/oauth/2.0/token'
+OCR_PATH_PREFIX = '/rest/2.0/ocr/'
+MOCK_TOKEN = 'mock-access-token'
+DEFAULT_LINES = ('模拟识别结果', 'Mock OCR result')
+
+
+class MockBaiduServer:
+    """模拟百度OCR服务"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_code=18, http_error_rate=0.0, lines=DEFAULT_LINES, line_height=24):
+        """
+        :param port: 监听端口，0表示随机分配
+        :param latency: 每次识别请求的固定延迟（秒）
+        :param jitter: 在固定延迟之上附加的随机延迟上限（秒）
+        :param error_rate: 返回业务错误码的概率
+        :param error_code: 注入的业务错误码，默认18（QPS超限）
+        :param http_error_rate: 返回HTTP 500的概率
+        :param lines: 每次识别返回的文字行
+        :param line_height: 模拟文字行高，用于生成坐标
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.http_error_rate = http_error_rate
+        self.lines = list(lines)
+        self.line_height = line_height
+        self.request_count = 0
+        self.image_bytes = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头和响应体分两次写出，关闭 Nagle 算法，避免与延迟确认叠加出约40ms的额外延迟
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json;charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_GET(self):
+                if urlparse(self.path).path == TOKEN_PATH:
+                    self._send_json(200, server.token_response())
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+                if url.path == TOKEN_PATH:
+                    self._send_json(200, server.token_response())
+                elif url.path.startswith(OCR_PATH_PREFIX):
+                    query = parse_qs(url.query)
+                    form = parse_qs(body)
+                    self._send_json(*server.ocr_response(query, form))
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+        return Handler
+
+    def token_response(self):
+        return {'access_token': MOCK_TOKEN, 'expires_in': 2592000}
+
+    def ocr_response(self, query, form):
+        """
+        生成识别接口的响应
+        :return: (HTTP状态码, 响应字典)
+        """
+        with self._lock:
+            self.request_count += 1
+
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < self.http_error_rate:
+            return 500, {'error': 'internal server error'}
+        if query.get('access_token', [''])[0] != MOCK_TOKEN:
+            return 200, {'error_code': 110, 'error_msg': 'Access token invalid or no longer valid'}
+        if 'image' not in form:
+            return 200, {'error_code': 216101, 'error_msg': 'not enough param'}
+        if random.random() < self.error_rate:
+            return 200, {'error_code': self.error_code, 'error_msg': 'Injected error'}
+
+        with self._lock:
+            self.image_bytes += len(base64.b64decode(form['image'][0]))
+
+        words_result = []
+        for i, text in enumerate(self.lines):
+            words_result.append({
+                'words': text,
+                'location': {
+                    'left': 10,
+                    'top': 10 + i * self.line_height * 2,
+                    'width': len(text) * self.line_height // 2,
+                    'height': self.line_height
+                },
+                'probability': {'average': 0.99, 'min': 0.95, 'variance': 0.0}
+            })
+        return 200, {
+            'log_id': random.getrandbits(63),
+            'words_result': words_result,
+            'words_result_num': len(words_result)
+        }
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟百度OCR服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8700)
+    parser.add_argument('--latency', type=float, default=0.0, help="固定延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="随机附加延迟上限（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="业务错误概率")
+    parser.add_argument('--error-code', type=int, default=18, help="注入的业务错误码")
+    parser.add_argument('--http-error-rate', type=float, default=0.0, help="HTTP 500概率")
+    args = parser.parse_args()
+
+    server = MockBaiduServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_code=args.error_code,
+        http_error_rate=args.http_error_rate
+    )
+    print(f"模拟OCR服务已启动: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+from io import BytesIO
+from PIL import Image
+from core.backends.base import OCRBackend
+
+
+class RoutingBackend(OCRBackend):
+    """
+    按图片大小路由：小截图交给本地引擎，省去网络往返；其余交给远程服务
+    本地引擎不可用或识别失败时回退到远程服务
+    """
+
+    name = 'auto'
+
+    def __init__(self, remote, local, max_local_pixels):
+        self.remote = remote
+        self.local = local
+        self.max_local_pixels = max_local_pixels
+
+    def _use_local(self, image_bytes):
+        if not self.local.available():
+            return False
+        try:
+            # 只解析图片头部获取尺寸，不解码像素
+            width, height = Image.open(BytesIO(image_bytes)).size
+        except Exception:
+            return False
+        return width * height <= self.max_local_pixels
+
+    def recognize(self, image_bytes, params=None):
+        if self._use_local(image_bytes):
+            try:
+                return self.local.recognize(image_bytes, params)
+            except Exception as e:
+                print(f"本地识别失败，改用{self.remote.name}: {e}")
+        return self.remote.recognize(image_bytes, params)
+
+    def capabilities(self):
+        remote = self.remote.capabilities()
+        local = self.local.capabilities()
+        return {
+            'local': self.local.available(),
+            'locations': remote['locations'] and local['locations'],
+            'probability': remote['probability'] and local['probability'],
+            'max_side': remote['max_side'],
+            'max_bytes': remote['max_bytes']
+        }
+
+    def available(self):
+        return self.remote.available() or self.local.available()
+
+    def close(self):
+        self.remote.close()
+        self.local.close()
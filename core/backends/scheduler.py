@@ -0,0 +1,228 @@
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from core.backends.base import OCRBackend, OCRAPIError
+from utils.metrics import metrics
+
+# 请求优先级，数值越小越先发送
+PRIORITY_INTERACTIVE = 0    # 快捷键截图
+PRIORITY_BATCH = 1          # 批量识别
+PRIORITY_WATCH = 2          # 区域监视
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_BATCH: 'batch', PRIORITY_WATCH: 'watch'}
+
+# 百度API的QPS超限错误码，以及可以重试的临时错误码
+QPS_ERROR_CODES = (18,)
+TRANSIENT_ERROR_CODES = (1, 2, 282000)
+
+# 当前上下文中发出的请求的优先级，未设置时视为交互截图
+_current_priority = contextvars.ContextVar('request_priority', default=PRIORITY_INTERACTIVE)
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+@contextmanager
+def request_priority(priority):
+    """
+    设置上下文中OCR请求的优先级
+    用法：with request_priority(PRIORITY_BATCH): ocr_manager.recognize(image)
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """令牌桶：按固定速率补充令牌，最多积攒 capacity 个"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = max(1.0, capacity or rate)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self):
+        """
+        尝试取出一个令牌（调用方负责加锁）
+        :return: 0表示已取出，否则为还需等待的秒数
+        """
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def drain(self):
+        """服务端提示超限时清空令牌，后续请求等待新令牌补充"""
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+
+class RequestScheduler:
+    """
+    OCR请求调度
+    所有请求按优先级和到达顺序排队，每次发送前从令牌桶中取出令牌，使整个进程的请求速率不超过账号的QPS；
+    QPS超限和临时错误按带随机抖动的指数退避重试，排队等待时间计入性能统计
+    """
+
+    def __init__(self, qps=2, burst=None, retries=3, backoff=0.5, max_delay=8.0):
+        """
+        :param qps: 每秒最多发送的请求数，0表示不限速
+        :param burst: 令牌桶容量，默认与qps相同
+        :param retries: QPS超限或临时错误时的最大重试次数
+        :param backoff: 退避的基准时间（秒）
+        :param max_delay: 单次退避的最长时间（秒）
+        """
+        self.bucket = TokenBucket(qps, burst) if qps > 0 else None
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.max_depth = 0
+        self.throttled = 0
+        self.retried = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """根据配置创建调度器"""
+        return cls(
+            qps=settings.OCR_QPS,
+            burst=settings.OCR_QPS_BURST or None,
+            retries=settings.OCR_RETRIES,
+            backoff=settings.OCR_RETRY_BACKOFF,
+            max_delay=settings.OCR_RETRY_MAX_DELAY
+        )
+
+    def depth(self):
+        """正在排队的请求数"""
+        with self._cond:
+            return len(self._heap)
+
+    def acquire(self, priority):
+        """排队直到轮到该请求且有可用令牌"""
+        if self.bucket is None:
+            return
+        entry = (priority, next(self._counter))
+        # 等待时间按优先级分别统计，同时计入当前链路
+        with metrics.span(f"qps_wait_{PRIORITY_NAMES.get(priority, priority)}"), self._cond:
+            heapq.heappush(self._heap, entry)
+            self.max_depth = max(self.max_depth, len(self._heap))
+            try:
+                while True:
+                    if self._heap[0] == entry:
+                        delay = self.bucket.take()
+                        if delay == 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            finally:
+                # 取到令牌或等待被中断时都要离开队列，让下一个请求继续
+                if self._heap[0] == entry:
+                    heapq.heappop(self._heap)
+                else:
+                    self._heap.remove(entry)
+                    heapq.heapify(self._heap)
+                self._cond.notify_all()
+
+    def call(self, func, *args, priority=None):
+        """
+        按调度发送请求，QPS超限和临时错误时退避后重新排队
+        :param priority: 优先级，默认使用上下文中设置的优先级
+        :return: func 的返回值
+        """
+        if priority is None:
+            priority = _current_priority.get()
+        attempt = 0
+        while True:
+            self.acquire(priority)
+            try:
+                return func(*args)
+            except Exception as e:
+                if attempt >= self.retries or not self._retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.backoff * 2 ** attempt))
+                attempt += 1
+                self.retried += 1
+                print(f"OCR请求失败，{delay:.2f} 秒后第 {attempt} 次重试: {e}")
+            time.sleep(delay)
+
+    def _retryable(self, error):
+        if isinstance(error, OCRAPIError):
+            if error.code in QPS_ERROR_CODES:
+                # 服务端认为已超限，清空令牌，其他排队的请求也一起放慢
+                self.throttled += 1
+                if self.bucket is not None:
+                    with self._cond:
+                        self.bucket.drain()
+                return True
+            return error.code in TRANSIENT_ERROR_CODES
+        # 连接失败、超时等网络错误
+        return isinstance(error, OSError)
+
+    def format_status(self):
+        """用于统计输出的状态文字"""
+        return (f"OCR请求队列: 当前 {self.depth()}，最多 {self.max_depth}，"
+                f"QPS超限 {self.throttled} 次，重试 {self.retried} 次")
+
+
+class ScheduledBackend(OCRBackend):
+    """把请求交给 RequestScheduler 调度后再发给远程后端"""
+
+    def __init__(self, backend, scheduler, workers=4):
+        """
+        :param backend: 实际发送请求的后端
+        :param scheduler: 进程共享的请求调度器
+        :param workers: 批量识别时的并发数
+        """
+        self.backend = backend
+        self.scheduler = scheduler
+        self.workers = max(1, workers)
+        self.name = backend.name
+
+    def recognize(self, image_bytes, params=None):
+        return self.scheduler.call(self.backend.recognize, image_bytes, params)
+
+    def batch_recognize(self, images, params=None):
+        if len(images) <= 1:
+            return [self.recognize(image_bytes, params) for image_bytes in images]
+        # 每个请求在调用方上下文的副本中执行，保持优先级和性能链路
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(
+                lambda image_bytes: context.copy().run(self.recognize, image_bytes, params), images
+            ))
+
+    def capabilities(self):
+        return self.backend.capabilities()
+
+    def available(self):
+        return self.backend.available()
+
+    def close(self):
+        self.backend.close()
+
+
+def get_scheduler():
+    """获取进程共享的请求调度器，QPS限制按账号计算，所有功能共用一个令牌桶"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from config.settings import get_settings
+                _scheduler = RequestScheduler.from_settings(get_settings())
+    return _scheduler
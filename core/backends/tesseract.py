@@ -0,0 +1,101 @@
+import shutil
+import subprocess
+from core.backends.base import OCRBackend
+
+# Tesseract TSV输出中单词所在的层级
+WORD_LEVEL = '5'
+
+
+def _is_cjk(char):
+    return ('\u2e80' <= char <= '\u9fff' or '\uf900' <= char <= '\ufaff'
+            or '\uff00' <= char <= '\uffef')
+
+
+def _join_words(words):
+    """拼接一行中的单词，中日韩字符之间不加空格"""
+    text = ''
+    for word in words:
+        if text and not (_is_cjk(text[-1]) and _is_cjk(word[0])):
+            text += ' '
+        text += word
+    return text
+
+
+class TesseractBackend(OCRBackend):
+    """通过子进程调用本地 Tesseract 进行离线识别"""
+
+    name = 'tesseract'
+
+    def __init__(self, settings):
+        self.command = settings.TESSERACT_CMD
+        self.language = settings.TESSERACT_LANG
+        self.timeout = settings.TESSERACT_TIMEOUT
+
+    def recognize(self, image_bytes, params=None):
+        """
+        识别图片，并把TSV输出转换为百度API的结果格式
+        :param image_bytes: 编码后的图片字节
+        :return: OCR结果字典
+        """
+        completed = subprocess.run(
+            [self.command, 'stdin', 'stdout', '-l', self.language, 'tsv'],
+            input=image_bytes,
+            capture_output=True,
+            timeout=self.timeout
+        )
+        if completed.returncode != 0:
+            message = completed.stderr.decode('utf-8', errors='replace').strip()
+            raise Exception(f"Tesseract识别失败: {message}")
+        return self.parse_tsv(completed.stdout.decode('utf-8', errors='replace'))
+
+    def parse_tsv(self, tsv):
+        """将Tesseract TSV输出按行合并为 words_result"""
+        lines = {}
+        order = []
+        for row in tsv.splitlines()[1:]:
+            columns = row.split('\t')
+            if len(columns) < 12 or columns[0] != WORD_LEVEL or not columns[11].strip():
+                continue
+            key = (columns[2], columns[3], columns[4])
+            left, top, width, height = (int(value) for value in columns[6:10])
+            confidence = float(columns[10])
+            if key not in lines:
+                lines[key] = {'words': [], 'box': [left, top, left + width, top + height], 'conf': []}
+                order.append(key)
+            line = lines[key]
+            line['words'].append(columns[11].strip())
+            box = line['box']
+            box[0] = min(box[0], left)
+            box[1] = min(box[1], top)
+            box[2] = max(box[2], left + width)
+            box[3] = max(box[3], top + height)
+            if confidence >= 0:
+                line['conf'].append(confidence / 100)
+
+        words_result = []
+        for key in order:
+            line = lines[key]
+            left, top, right, bottom = line['box']
+            conf = line['conf'] or [0.0]
+            words_result.append({
+                'words': _join_words(line['words']),
+                'location': {'left': left, 'top': top, 'width': right - left, 'height': bottom - top},
+                'probability': {
+                    'average': sum(conf) / len(conf),
+                    'min': min(conf),
+                    'variance': 0.0
+                }
+            })
+        return {'words_result': words_result, 'words_result_num': len(words_result)}
+
+    def capabilities(self):
+        return {
+            'local': True,
+            'locations': True,
+            'probability': True,
+            'max_side': None,
+            'max_bytes': None
+        }
+
+    def available(self):
+        return shutil.which(self.command) is not None
@@ -0,0 +1,135 @@
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PIL import Image
+from core.backends.scheduler import PRIORITY_BATCH, request_priority
+from utils.metrics import metrics
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+
+
+def collect_paths(inputs):
+    """
+    展开输入参数为图片路径列表
+    :param inputs: 文件、通配符或目录（目录会递归查找图片）
+    :return: 去重并排序后的路径列表
+    """
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in files:
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        paths.add(os.path.join(root, name))
+        elif os.path.isfile(item):
+            paths.add(item)
+        else:
+            for path in glob.glob(item, recursive=True):
+                if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.add(path)
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+class BatchRunner:
+    """
+    批量识别
+    多个工作线程并发调用 OCRManager，结果以 JSON Lines 格式逐行输出，
+    已完成的路径记录在检查点文件中，中断后可从断点继续
+    """
+
+    def __init__(self, ocr_manager, workers=4, checkpoint_path=None):
+        self.ocr_manager = ocr_manager
+        self.workers = max(1, workers)
+        self.checkpoint_path = checkpoint_path
+        self._write_lock = threading.Lock()
+
+    def load_checkpoint(self):
+        """读取已完成的路径"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return {line.rstrip('\n') for line in f if line.strip()}
+
+    def recognize_file(self, path):
+        """
+        识别单个文件
+        :return: 结果记录字典
+        """
+        record = {'path': path}
+        trace = metrics.start_trace('batch')
+        start = time.perf_counter()
+        try:
+            with Image.open(path) as image:
+                image.load()
+                loaded = time.perf_counter()
+                # 批量识别排在快捷键截图之后发送
+                with request_priority(PRIORITY_BATCH):
+                    result = self.ocr_manager.recognize(image)
+            done = time.perf_counter()
+            words_result = result.get('words_result', [])
+            record['text'] = [item['words'] for item in words_result]
+            record['confidences'] = [
+                item.get('probability', {}).get('average') for item in words_result
+            ]
+            record['timings'] = {
+                'load_ms': round((loaded - start) * 1000, 2),
+                'ocr_ms': round((done - loaded) * 1000, 2),
+                'total_ms': round((done - start) * 1000, 2)
+            }
+        except Exception as e:
+            record['error'] = str(e)
+            record['timings'] = {'total_ms': round((time.perf_counter() - start) * 1000, 2)}
+        metrics.finish_trace(trace)
+        return record
+
+    def run(self, paths, output):
+        """
+        执行批量识别
+        :param paths: 图片路径列表
+        :param output: 结果输出的文本流
+        :return: 统计信息字典
+        """
+        done = self.load_checkpoint()
+        pending = [path for path in paths if path not in done]
+        skipped = len(paths) - len(pending)
+        if skipped:
+            print(f"从检查点恢复，跳过 {skipped} 个已完成的文件")
+
+        checkpoint_file = None
+        if self.checkpoint_path:
+            checkpoint_file = open(self.checkpoint_path, 'a', encoding='utf-8')
+
+        succeeded = 0
+        failed = 0
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self.recognize_file, path) for path in pending]
+                for future in as_completed(futures):
+                    record = future.result()
+                    with self._write_lock:
+                        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                        output.flush()
+                        if 'error' in record:
+                            failed += 1
+                            continue
+                        succeeded += 1
+                        # 只记录成功的文件，失败的文件在下次运行时重试
+                        if checkpoint_file:
+                            checkpoint_file.write(record['path'] + '\n')
+                            checkpoint_file.flush()
+                            os.fsync(checkpoint_file.fileno())
+        finally:
+            if checkpoint_file:
+                checkpoint_file.close()
+
+        return {
+            'total': len(paths),
+            'skipped': skipped,
+            'succeeded': succeeded,
+            'failed': failed,
+            'elapsed_s': round(time.perf_counter() - start, 2)
+        }
@@ -0,0 +1,184 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import BytesIO
+from utils.metrics import metrics
+
+# 截图的使用方：识别、历史记录（哈希和缩略图）、预览（最近一次截图）、打开中的预览窗口
+OWNER_OCR = 'ocr'
+OWNER_HISTORY = 'history'
+OWNER_PREVIEW = 'preview'
+OWNER_VIEWER = 'viewer'
+# 超出内存预算时可以提前释放的使用方，预览不可用时只是无法再打开
+EVICTABLE_OWNERS = (OWNER_PREVIEW,)
+
+# 编码缓冲区超过该大小时不再保留，避免一次超大截图长期占用内存
+MAX_SCRATCH_BYTES = 8 * 1024 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def image_bytes(image):
+    """图片像素占用的内存（Pillow 内部 RGB 每像素4字节）"""
+    width, height = image.size
+    bands = len(image.getbands())
+    return width * height * (4 if bands >= 3 else bands)
+
+
+@contextmanager
+def encode_buffer():
+    """
+    线程内复用的编码缓冲区
+    用法：with encode_buffer() as buffer: image.save(buffer, 'PNG'); data = buffer.getvalue()
+    """
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = BytesIO()
+    buffer.seek(0)
+    buffer.truncate()
+    try:
+        yield buffer
+    finally:
+        if buffer.tell() > MAX_SCRATCH_BYTES:
+            _local.buffer = None
+
+
+class ImageBufferPool:
+    """
+    截图内存管理
+    按尺寸复用整屏帧缓冲区；记录每张截图的使用方，全部使用方释放后立即关闭图片；
+    空闲缓冲区和截图的总内存超出预算时，先丢弃最久未用的空闲缓冲区，再释放仅供预览的较早截图
+    """
+
+    def __init__(self, budget_bytes=256 * 1024 * 1024):
+        """
+        :param budget_bytes: 内存预算（字节），0表示不复用缓冲区、不限制截图
+        """
+        self.budget_bytes = budget_bytes
+        self.evicted = 0
+        # 空闲的帧缓冲区 {id: image}，按最近使用排序
+        self._idle = OrderedDict()
+        # 使用中的截图 {id: [image, 使用方集合, 字节数]}，按加入顺序排序
+        self._held = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """根据配置创建"""
+        return cls(budget_bytes=settings.IMAGE_MEMORY_MB * 1024 * 1024)
+
+    def take(self, size, mode='RGB'):
+        """
+        取出尺寸一致的空闲帧缓冲区，作为截图后端的 out 参数
+        :return: PIL Image，没有可用的缓冲区时返回None
+        """
+        with self._lock:
+            for key, image in self._idle.items():
+                if image.size == size and image.mode == mode:
+                    del self._idle[key]
+                    return image
+        return None
+
+    def give(self, image):
+        """归还帧缓冲区，供下一次截图复用"""
+        if image is None or self.budget_bytes <= 0:
+            return
+        with self._lock:
+            self._idle[id(image)] = image
+            self._idle.move_to_end(id(image))
+            self._trim()
+
+    def track(self, image, *owners):
+        """登记截图及其使用方，同一张截图重复登记时追加使用方"""
+        if image is None:
+            return image
+        with self._lock:
+            entry = self._held.get(id(image))
+            if entry is None:
+                self._held[id(image)] = [image, set(owners), image_bytes(image)]
+                self._trim()
+            else:
+                entry[1].update(owners)
+        return image
+
+    def release(self, image, owner):
+        """使用方不再需要该截图，全部使用方释放后关闭图片（未登记的图片不处理）"""
+        if image is None:
+            return
+        with self._lock:
+            entry = self._held.get(id(image))
+            if entry is None or entry[0] is not image:
+                return
+            entry[1].discard(owner)
+            if not entry[1]:
+                del self._held[id(image)]
+                image.close()
+
+    def holds(self, image, owner):
+        """该使用方是否仍持有截图"""
+        with self._lock:
+            entry = self._held.get(id(image))
+            return entry is not None and entry[0] is image and owner in entry[1]
+
+    def usage(self):
+        """(空闲缓冲区字节数, 使用中截图字节数)"""
+        with self._lock:
+            return sum(image_bytes(image) for image in self._idle.values()), \
+                sum(entry[2] for entry in self._held.values())
+
+    def _trim(self):
+        """超出预算时释放内存（调用方负责加锁）"""
+        if self.budget_bytes <= 0:
+            self._idle.clear()
+            return
+        idle = sum(image_bytes(image) for image in self._idle.values())
+        held = sum(entry[2] for entry in self._held.values())
+        while self._idle and idle + held > self.budget_bytes:
+            _, image = self._idle.popitem(last=False)
+            idle -= image_bytes(image)
+            image.close()
+        # 最新登记的截图不释放：调用方登记完其他使用方（如识别）之前，它只有预览一个使用方
+        for key in list(self._held)[:-1]:
+            if idle + held <= self.budget_bytes:
+                break
+            image, owners, size = self._held[key]
+            # 仍在识别或写入历史的截图不能释放
+            if owners.issubset(EVICTABLE_OWNERS):
+                del self._held[key]
+                held -= size
+                image.close()
+                self.evicted += 1
+
+    def clear(self):
+        """退出时释放所有缓冲区和截图"""
+        with self._lock:
+            for image in self._idle.values():
+                image.close()
+            for image, _, _ in self._held.values():
+                image.close()
+            self._idle.clear()
+            self._held.clear()
+
+    def record_metrics(self):
+        """把截图占用的内存计入性能统计"""
+        idle, held = self.usage()
+        metrics.gauge('image_pool_mb', (idle + held) / (1024 * 1024))
+
+    def format_status(self):
+        """用于统计输出的状态文字"""
+        idle, held = self.usage()
+        return (f"截图内存: 使用中 {held / (1024 * 1024):.1f} MB，空闲缓冲区 {idle / (1024 * 1024):.1f} MB，"
+                f"预算 {self.budget_bytes / (1024 * 1024):.0f} MB，提前释放 {self.evicted} 张")
+
+
+def get_image_pool():
+    """获取进程共享的截图内存管理器"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from config.settings import get_settings
+                _pool = ImageBufferPool.from_settings(get_settings())
+    return _pool
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class OCRResultCache:
+    """
+    OCR结果缓存
+    以解码后像素数据和请求参数的哈希为键，内存中使用LRU淘汰，
+    可选的磁盘层按总大小淘汰最久未使用的条目
+    """
+
+    def __init__(self, max_entries=64, disk_dir=None, disk_max_bytes=50 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            if not os.path.exists(self.disk_dir):
+                os.makedirs(self.disk_dir)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    @staticmethod
+    def make_key(image, params):
+        """
+        计算缓存键
+        :param image: PIL Image
+        :param params: 影响识别结果的请求参数字典
+        :return: 十六进制哈希字符串
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}".encode('utf-8'))
+        digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """查询缓存，未命中返回None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        result = self._disk_get(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._memory_put(key, result)
+        return result
+
+    def put(self, key, result):
+        """写入缓存"""
+        with self._lock:
+            self._memory_put(key, result)
+        self._disk_put(key, result)
+
+    def stats(self):
+        """返回命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_bytes
+            }
+
+    def _memory_put(self, key, result):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_entries(self):
+        """列出磁盘缓存文件 (路径, 修改时间, 大小)"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            # 更新修改时间，淘汰时视为最近使用
+            os.utime(path)
+            return result
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key, result):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(path, 'wb') as f:
+                f.write(data)
+            with self._lock:
+                self._disk_bytes += len(data) - old_size
+                over_limit = self._disk_bytes > self.disk_max_bytes
+            if over_limit:
+                self._disk_evict()
+        except OSError as e:
+            print(f"写入OCR磁盘缓存失败: {e}")
+
+    def _disk_evict(self):
+        """删除最久未使用的文件，直到低于大小上限"""
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+    def clear(self):
+        """清空内存与磁盘缓存"""
+        with self._lock:
+            self._memory.clear()
+        if self.disk_dir:
+            for path, _, _ in self._disk_entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._disk_bytes = 0
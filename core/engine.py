@@ -0,0 +1,157 @@
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+# 队列已满时的处理策略
+POLICY_BLOCK = 'block'              # 阻塞提交方，直到队列有空位
+POLICY_DROP_OLDEST = 'drop_oldest'  # 丢弃最早排队的任务
+POLICY_COALESCE = 'coalesce'        # 用新任务替换最近排队的任务，被替换的任务取消
+POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_COALESCE)
+
+
+class _Job:
+    """排队中的识别任务"""
+
+    def __init__(self, image, kwargs, future):
+        self.image = image
+        self.kwargs = kwargs
+        self.futures = [future]
+        # 保留提交方的上下文（如性能链路），在工作线程中继续使用
+        self.context = contextvars.copy_context()
+
+
+class RecognitionEngine:
+    """
+    异步识别引擎
+    截图线程只负责把图片放入有界队列，由工作线程调用识别函数，
+    结果通过Future或回调返回，不再阻塞快捷键监听线程
+    """
+
+    def __init__(self, recognize, workers=2, queue_size=4, policy=POLICY_DROP_OLDEST):
+        """
+        :param recognize: 识别函数，签名为 recognize(image, **kwargs)
+        :param workers: 最大并发识别数
+        :param queue_size: 排队任务上限
+        :param policy: 队列已满时的处理策略
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"未知的队列策略: {policy}")
+        self.recognize = recognize
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.policy = policy
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+        self.dropped = 0
+
+    def start(self):
+        """启动工作线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"ocr-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, image, callback=None, **kwargs):
+        """
+        提交识别任务
+        :param image: 待识别的图片
+        :param callback: 可选，任务完成时以Future为参数回调
+        :param kwargs: 传给识别函数的其他参数
+        :return: concurrent.futures.Future
+        """
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("识别引擎未启动")
+
+            if len(self._queue) >= self.queue_size:
+                if self.policy == POLICY_BLOCK:
+                    while self._running and len(self._queue) >= self.queue_size:
+                        self._cond.wait()
+                    if not self._running:
+                        raise RuntimeError("识别引擎已停止")
+                elif self.policy == POLICY_DROP_OLDEST:
+                    dropped = self._queue.popleft()
+                    self.dropped += 1
+                    for dropped_future in dropped.futures:
+                        dropped_future.cancel()
+                    print("识别队列已满，丢弃最早的任务")
+                elif self.policy == POLICY_COALESCE:
+                    # 最近排队的任务已过时，改为识别新图片；原Future取消，
+                    # 不能让它得到新图片的结果（调用方会把旧截图和新文字配对）
+                    job = self._queue[-1]
+                    for superseded in job.futures:
+                        superseded.cancel()
+                    self.dropped += len(job.futures)
+                    job.image = image
+                    job.kwargs = kwargs
+                    job.context = contextvars.copy_context()
+                    job.futures = [future]
+                    print("识别队列已满，用新任务替换最近排队的任务")
+                    return future
+
+            self._queue.append(_Job(image, kwargs, future))
+            self._cond.notify_all()
+        return future
+
+    def pending(self):
+        """当前排队任务数"""
+        with self._cond:
+            return len(self._queue)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                job = self._queue.popleft()
+                # 唤醒因队列已满而阻塞的提交方
+                self._cond.notify_all()
+
+            futures = [f for f in job.futures if f.set_running_or_notify_cancel()]
+            if not futures:
+                continue
+
+            job.context.run(self._run_job, job, futures)
+
+    def _run_job(self, job, futures):
+        """执行识别并设置结果，完成回调也在提交方的上下文中执行"""
+        try:
+            result = self.recognize(job.image, **job.kwargs)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for future in futures:
+                future.set_result(result)
+
+    def stop(self, wait=True):
+        """停止引擎，取消尚未开始的任务"""
+        with self._cond:
+            self._running = False
+            pending = list(self._queue)
+            self._queue.clear()
+            self._cond.notify_all()
+        for job in pending:
+            for future in job.futures:
+                future.cancel()
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout=5)
+        self._threads = []
@@ -0,0 +1,312 @@
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from core.buffers import OWNER_HISTORY, encode_buffer, get_image_pool
+from core.cache import OCRResultCache
+from utils.metrics import metrics
+
+# 中日韩字符，全文索引时逐字切分
+_CJK_PATTERN = re.compile('([\u2e80-\u9fff\uf900-\ufaff\uff00-\uffef])')
+_QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+_STOP = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    text TEXT NOT NULL,
+    region TEXT,
+    image_hash TEXT,
+    confidence REAL,
+    confidences TEXT,
+    thumbnail BLOB
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    body, content='', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def segment(text):
+    """在中日韩字符两侧加空格，使每个字成为一个词元，短语查询即可匹配连续的字"""
+    return _CJK_PATTERN.sub(r' \1 ', text)
+
+
+def _quote(text):
+    return '"' + ' '.join(segment(text).split()).replace('"', '""') + '"'
+
+
+def build_match_query(query):
+    """
+    将搜索框输入转换为 FTS5 查询
+    空格分隔的词之间为“与”关系；引号内为短语；以 * 结尾的词按前缀匹配；
+    中文词按短语匹配连续的字
+    :param query: 搜索框输入的字符串，或命令行参数列表（shell 已去掉引号，含空白的参数作为短语）
+    :return: FTS5 MATCH 表达式，没有可搜索的内容时返回None
+    """
+    if not isinstance(query, str):
+        query = ' '.join('"' + item.replace('"', '') + '"' if len(item.split()) > 1 else item
+                         for item in query)
+    terms = []
+    for phrase, word in _QUERY_PATTERN.findall(query):
+        if phrase:
+            if phrase.strip():
+                terms.append(_quote(phrase))
+            continue
+        prefix = word.endswith('*')
+        word = word.rstrip('*')
+        if not segment(word).split():
+            continue
+        # 中文以单字为词元，前缀匹配没有意义
+        if prefix and not _CJK_PATTERN.search(word):
+            terms.append(_quote(word) + ' *')
+        else:
+            terms.append(_quote(word))
+    return ' '.join(terms) or None
+
+
+class HistoryStore:
+    """
+    识别历史
+    保存在 SQLite 中，文字建立 FTS5 全文索引；写入请求放入队列，由后台线程批量提交，
+    识别流程中调用 add 只做入队，队列满时丢弃记录而不是等待
+    """
+
+    def __init__(self, path, thumbnails=False, thumbnail_size=160, max_entries=0, queue_size=1000):
+        """
+        :param path: 数据库文件路径
+        :param thumbnails: 是否保存截图缩略图
+        :param thumbnail_size: 缩略图最长边（像素）
+        :param max_entries: 最多保留的记录数，0表示不限制
+        :param queue_size: 等待写入的最大记录数
+        """
+        self.path = path
+        self.thumbnails = thumbnails
+        self.thumbnail_size = thumbnail_size
+        self.max_entries = max_entries
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """根据配置创建历史记录"""
+        return cls(
+            settings.HISTORY_DB,
+            thumbnails=settings.HISTORY_THUMBNAILS,
+            max_entries=settings.HISTORY_MAX_ENTRIES
+        )
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        # WAL 模式下查询不会被后台写入阻塞
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _reader(self):
+        """每个线程使用独立的只读查询连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def start(self):
+        """启动后台写入线程"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, name='history-writer', daemon=True)
+                self._thread.start()
+        return self
+
+    def add(self, texts, image=None, region=None, confidences=None, source='capture'):
+        """
+        添加一条识别记录（不阻塞）
+        :param texts: 识别到的文字列表
+        :param image: 截图，用于计算图片哈希和缩略图，在后台线程中处理
+        :param region: 截图区域 (left, top, right, bottom)
+        :param confidences: 各行置信度
+        :return: 是否成功入队
+        """
+        if not texts:
+            return False
+        self.start()
+        record = {
+            'created_at': time.time(),
+            'source': source,
+            'texts': list(texts),
+            'image': image,
+            'region': region,
+            'confidences': confidences
+        }
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print("历史记录写入队列已满，丢弃本次记录")
+            return False
+
+    def _writer(self):
+        conn = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                # 取出队列中已有的全部记录，在同一个事务中提交
+                while batch[-1] is not _STOP and len(batch) < self._queue.maxsize:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is _STOP
+                records = [record for record in batch if record is not _STOP]
+                try:
+                    if records:
+                        with metrics.span('history_write'):
+                            self._write(conn, records)
+                except Exception as e:
+                    print(f"写入历史记录失败: {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _write(self, conn, records):
+        rows = [self._prepare(record) for record in records]
+        with conn:
+            for text, row in rows:
+                cursor = conn.execute(
+                    'INSERT INTO history (created_at, source, text, region, image_hash, confidence, '
+                    'confidences, thumbnail) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    row
+                )
+                conn.execute('INSERT INTO history_fts (rowid, body) VALUES (?, ?)',
+                             (cursor.lastrowid, segment(text)))
+            if self.max_entries > 0:
+                self._prune(conn)
+
+    def _prepare(self, record):
+        """在写入线程中计算哈希和缩略图"""
+        text = '\n'.join(record['texts'])
+        image = record['image']
+        image_hash = None
+        thumbnail = None
+        if image is not None:
+            try:
+                image_hash = OCRResultCache.make_key(image, {})
+                if self.thumbnails:
+                    thumbnail = self._thumbnail(image)
+            finally:
+                # 截图只用于计算哈希和缩略图，用完立即释放
+                get_image_pool().release(image, OWNER_HISTORY)
+        confidences = [value for value in (record['confidences'] or []) if value is not None]
+        confidence = sum(confidences) / len(confidences) if confidences else None
+        region = ','.join(str(value) for value in record['region']) if record['region'] else None
+        return text, (
+            record['created_at'], record['source'], text, region, image_hash, confidence,
+            json.dumps(confidences) if confidences else None, thumbnail
+        )
+
+    def _thumbnail(self, image):
+        """生成JPEG缩略图"""
+        width, height = image.size
+        scale = min(1.0, self.thumbnail_size / max(width, height))
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        thumbnail = image.resize(size, reducing_gap=2.0)
+        with encode_buffer() as buffer:
+            thumbnail.save(buffer, 'JPEG', quality=70)
+            return buffer.getvalue()
+
+    def _prune(self, conn):
+        """删除超出保留数量的旧记录"""
+        rows = conn.execute(
+            'SELECT id, text FROM history WHERE id <= (SELECT MAX(id) FROM history) - ? ORDER BY id',
+            (self.max_entries,)
+        ).fetchall()
+        for row_id, text in rows:
+            # 无内容表需要提供原始内容才能删除索引
+            conn.execute("INSERT INTO history_fts (history_fts, rowid, body) VALUES ('delete', ?, ?)",
+                         (row_id, segment(text)))
+        if rows:
+            conn.execute('DELETE FROM history WHERE id <= ?', (rows[-1][0],))
+
+    def search(self, query, limit=20):
+        """
+        搜索历史记录，按时间从新到旧排列
+        :param query: 搜索词，支持 "短语" 和 前缀*；也可以是命令行参数列表
+        :return: 记录字典列表，查询为空时返回最近的记录
+        """
+        match = build_match_query(query or '')
+        if match is None:
+            return self.recent(limit)
+        with metrics.span('history_search'):
+            try:
+                cursor = self._reader().execute(
+                    'SELECT id, created_at, source, text, region, confidence FROM history WHERE id IN '
+                    '(SELECT rowid FROM history_fts WHERE history_fts MATCH ? ORDER BY rowid DESC LIMIT ?) '
+                    'ORDER BY id DESC',
+                    (match, limit)
+                )
+                return [self._row_to_dict(row) for row in cursor]
+            except sqlite3.OperationalError as e:
+                print(f"搜索历史记录失败: {e}")
+                return []
+
+    def recent(self, limit=20):
+        """最近的记录"""
+        cursor = self._reader().execute(
+            'SELECT id, created_at, source, text, region, confidence FROM history '
+            'ORDER BY id DESC LIMIT ?',
+            (limit,)
+        )
+        return [self._row_to_dict(row) for row in cursor]
+
+    def thumbnail(self, entry_id):
+        """读取缩略图字节，没有时返回None"""
+        row = self._reader().execute('SELECT thumbnail FROM history WHERE id = ?', (entry_id,)).fetchone()
+        return row[0] if row else None
+
+    def count(self):
+        return self._reader().execute('SELECT COUNT(*) FROM history').fetchone()[0]
+
+    def _row_to_dict(self, row):
+        return {
+            'id': row[0],
+            'created_at': row[1],
+            'source': row[2],
+            'text': row[3],
+            'region': row[4],
+            'confidence': row[5]
+        }
+
+    def flush(self):
+        """等待队列中的记录全部写入"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """写完剩余记录后停止后台线程"""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout=5)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,203 @@
+import re
+from array import array
+
+# 宽度超过页面该比例的行视为通栏（标题、跨栏段落），不参与分栏
+WIDE_LINE_RATIO = 0.6
+# 同一行内各片段中心的最大纵向偏差、段间空白、首行缩进、行尾留白（均为行高的倍数）
+SAME_ROW_RATIO = 0.5
+PARAGRAPH_GAP_RATIO = 0.75
+INDENT_RATIO = 1.0
+SHORT_LINE_RATIO = 1.5
+
+# OCR结果字典中标记坐标空间的键和值：capture 表示坐标已映射回截图像素
+COORDINATES_KEY = 'coordinates'
+COORDINATES_CAPTURE = 'capture'
+
+_CJK_PATTERN = re.compile('[\u2e80-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+
+def _is_cjk(char):
+    return _CJK_PATTERN.match(char) is not None
+
+
+class OCRResult:
+    """
+    紧凑的识别结果
+    文字保存在列表中，坐标和置信度保存在 array 中：boxes 每行4个整数（left, top, width, height），
+    没有坐标的行为 -1；confidences 每行一个浮点数，没有置信度时为 -1；
+    in_capture 表示坐标是截图的像素坐标（而不是预处理后上传图片的坐标）
+    """
+
+    __slots__ = ('texts', 'boxes', 'confidences', 'in_capture')
+
+    def __init__(self, texts=None, boxes=None, confidences=None, in_capture=False):
+        self.texts = texts if texts is not None else []
+        self.boxes = boxes if boxes is not None else array('i')
+        self.confidences = confidences if confidences is not None else array('d')
+        self.in_capture = in_capture
+
+    @classmethod
+    def from_api(cls, result):
+        """从OCR API结果字典创建，跳过没有文字的行"""
+        texts = []
+        boxes = array('i')
+        confidences = array('d')
+        for item in result.get('words_result', []):
+            text = item.get('words')
+            if not text:
+                continue
+            texts.append(text)
+            location = item.get('location')
+            if location:
+                boxes.extend((location['left'], location['top'], location['width'], location['height']))
+            else:
+                boxes.extend((-1, -1, -1, -1))
+            probability = item.get('probability')
+            confidences.append(probability.get('average', -1) if probability else -1)
+        return cls(texts, boxes, confidences, result.get(COORDINATES_KEY) == COORDINATES_CAPTURE)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __bool__(self):
+        return bool(self.texts)
+
+    def has_boxes(self):
+        """所有行都带有坐标"""
+        return bool(self.texts) and -1 not in self.boxes[2::4]
+
+    def box(self, index):
+        """第 index 行的 (left, top, width, height)，没有坐标时返回None"""
+        box = tuple(self.boxes[index * 4:index * 4 + 4])
+        return None if box[2] < 0 else box
+
+    def confidence_list(self):
+        """各行置信度列表，缺失的为None"""
+        return [value if value >= 0 else None for value in self.confidences]
+
+    def text(self, layout=True):
+        """
+        复制到剪贴板的文字
+        :param layout: 是否按版面重排（分栏、合并折行），否则每个识别行占一行
+        """
+        if layout and self.has_boxes():
+            return format_layout(self)
+        return '\n'.join(self.texts)
+
+
+def _split_columns(indices, lefts, rights, gap):
+    """
+    按横向投影把行分栏：各行的横向区间重叠或间距小于 gap 时属于同一栏
+    :return: 从左到右的栏，每栏为 (左边界, 右边界, 行号列表)
+    """
+    columns = []
+    for index in sorted(indices, key=lefts.__getitem__):
+        if columns and lefts[index] <= columns[-1][1] + gap:
+            column = columns[-1]
+            column[1] = max(column[1], rights[index])
+            column[2].append(index)
+        else:
+            columns.append([lefts[index], rights[index], [index]])
+    return columns
+
+
+def _rows(indices, tops, centers, lefts, tolerance):
+    """把纵向位置相同的片段合并为一行，行内按从左到右排列"""
+    rows = []
+    for index in sorted(indices, key=tops.__getitem__):
+        if rows and abs(centers[index] - centers[rows[-1][0]]) <= tolerance:
+            rows[-1].append(index)
+        else:
+            rows.append([index])
+    for row in rows:
+        if len(row) > 1:
+            row.sort(key=lefts.__getitem__)
+    return rows
+
+
+def reading_order(result):
+    """
+    版面分析：按阅读顺序把行分为段落
+    先按纵向位置把页面分为通栏区和分栏区，分栏区内按栏从左到右、栏内从上到下排列；
+    行间空白较大、首行缩进或上一行提前结束时开始新段落
+    :param result: 所有行都带坐标的 OCRResult
+    :return: 段落列表，每个段落为行列表，每行为同一水平位置上的片段序号列表
+    """
+    count = len(result.texts)
+    boxes = result.boxes
+    lefts = boxes[0::4]
+    tops = boxes[1::4]
+    widths = boxes[2::4]
+    heights = boxes[3::4]
+    rights = [left + width for left, width in zip(lefts, widths)]
+    bottoms = [top + height for top, height in zip(tops, heights)]
+    centers = [top + height / 2 for top, height in zip(tops, heights)]
+    line_height = max(1, sorted(heights)[count // 2])
+    page_width = max(rights) - min(lefts)
+
+    # 按纵向位置划分区域：连续的通栏行，或连续的非通栏行
+    regions = []
+    for index in sorted(range(count), key=tops.__getitem__):
+        wide = widths[index] > page_width * WIDE_LINE_RATIO
+        if regions and regions[-1][0] == wide:
+            regions[-1][1].append(index)
+        else:
+            regions.append((wide, [index]))
+
+    # 非通栏区只有一栏时与相邻的通栏区合并为同一文字流，参差不齐的行尾不会被误判为分栏
+    blocks = []
+    for wide, indices in regions:
+        columns = [] if wide else _split_columns(indices, lefts, rights, line_height)
+        if len(columns) > 1:
+            blocks.extend((False, column[2]) for column in columns)
+        elif blocks and blocks[-1][0]:
+            blocks[-1][1].extend(indices)
+        else:
+            blocks.append((True, list(indices)))
+
+    tolerance = line_height * SAME_ROW_RATIO
+    paragraphs = []
+    for _, block in blocks:
+        rows = _rows(block, tops, centers, lefts, tolerance)
+        block_left = min(lefts[row[0]] for row in rows)
+        block_right = max(rights[row[-1]] for row in rows)
+        paragraph = [rows[0]]
+        for previous, row in zip(rows, rows[1:]):
+            gap = tops[row[0]] - bottoms[previous[0]]
+            if (gap > line_height * PARAGRAPH_GAP_RATIO
+                    or lefts[row[0]] - block_left > line_height * INDENT_RATIO
+                    or block_right - rights[previous[-1]] > line_height * SHORT_LINE_RATIO):
+                paragraphs.append(paragraph)
+                paragraph = [row]
+            else:
+                paragraph.append(row)
+        paragraphs.append(paragraph)
+    return paragraphs
+
+
+def format_layout(result):
+    """
+    按阅读顺序输出文字：段落之间换行，段内折行按语言合并
+    中日韩文字之间直接相连，西文之间加空格，行尾连字符后接小写字母时去掉连字符
+    """
+    texts = result.texts
+    pieces = []
+    for paragraph in reading_order(result):
+        if pieces:
+            pieces.append('\n')
+        previous = None
+        for row in paragraph:
+            for position, index in enumerate(row):
+                text = texts[index]
+                if previous is not None:
+                    if position > 0:
+                        # 同一行的片段之间保留空格
+                        pieces.append(' ')
+                    elif previous.endswith('-') and len(previous) > 1 and previous[-2].isalpha() \
+                            and text[0].islower():
+                        pieces[-1] = previous[:-1]
+                    elif not (_is_cjk(previous[-1]) or _is_cjk(text[0])):
+                        pieces.append(' ')
+                pieces.append(text)
+                previous = text
+    return ''.join(pieces)
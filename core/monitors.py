@@ -0,0 +1,369 @@
+import ctypes
+import select
+import sys
+import threading
+
+# 本进程的窗口坐标是否为物理像素（Windows 需要声明按显示器感知DPI，其他平台总是物理像素）
+_dpi_aware = None
+
+# XRandR 事件掩码和事件类型（相对于扩展的事件基数）
+RR_SCREEN_CHANGE_NOTIFY_MASK = 1 << 0
+RR_CRTC_CHANGE_NOTIFY_MASK = 1 << 1
+RR_OUTPUT_CHANGE_NOTIFY_MASK = 1 << 2
+RR_SCREEN_CHANGE_NOTIFY = 0
+RR_NOTIFY = 1
+# XEvent 联合体的大小（24个long）
+XEVENT_SIZE = 24 * 8
+
+# GetSystemMetrics：虚拟桌面范围和显示器数量，任一变化即视为拓扑变化
+WINDOWS_TOPOLOGY_METRICS = (76, 77, 78, 79, 80)
+
+
+def enable_dpi_awareness():
+    """
+    Windows 上声明按显示器感知DPI（优先 PerMonitorV2，早于 Windows 10 1703 时为按显示器感知），
+    此后窗口和鼠标坐标均为物理像素
+    需要在创建第一个窗口之前调用，重复调用无影响；系统不支持时返回False，不抛出异常
+    :return: 窗口坐标是否为物理像素
+    """
+    global _dpi_aware
+    if _dpi_aware is None:
+        if sys.platform != 'win32':
+            _dpi_aware = True
+        else:
+            try:
+                # DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2 = -4
+                set_context = getattr(ctypes.windll.user32, 'SetProcessDpiAwarenessContext', None)
+                if set_context is None or not set_context(ctypes.c_void_p(-4)):
+                    ctypes.windll.shcore.SetProcessDpiAwareness(2)
+                awareness = ctypes.c_int()
+                # 已经创建过窗口时声明会失败，以实际生效的模式为准（V1 和 V2 均返回2）
+                ctypes.windll.shcore.GetProcessDpiAwareness(None, ctypes.byref(awareness))
+                _dpi_aware = awareness.value == 2
+            except (OSError, AttributeError):
+                # Windows 8.1 之前没有 shcore，窗口坐标按系统DPI缩放
+                _dpi_aware = False
+    return _dpi_aware
+
+
+class Monitor:
+    """
+    显示器
+    范围为虚拟桌面上的物理像素；scale 为物理像素与窗口坐标之比，
+    进程按显示器感知DPI时为1，否则为系统缩放比例
+    """
+
+    def __init__(self, left, top, right, bottom, scale=1.0, dpi=96, primary=False, name=''):
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+        self.scale = scale
+        self.dpi = dpi
+        self.primary = primary
+        self.name = name
+
+    @property
+    def bbox(self):
+        return self.left, self.top, self.right, self.bottom
+
+    @property
+    def size(self):
+        return self.right - self.left, self.bottom - self.top
+
+    def logical_geometry(self):
+        """窗口坐标下的 (x, y, width, height)，用于放置遮罩窗口"""
+        width, height = self.size
+        return (round(self.left / self.scale), round(self.top / self.scale),
+                round(width / self.scale), round(height / self.scale))
+
+    def contains(self, x, y):
+        """窗口坐标 (x, y) 是否在该显示器上"""
+        left, top, width, height = self.logical_geometry()
+        return left <= x < left + width and top <= y < top + height
+
+    def distance(self, x, y):
+        """窗口坐标 (x, y) 到该显示器的距离，在显示器上时为0"""
+        left, top, width, height = self.logical_geometry()
+        dx = max(left - x, 0, x - (left + width - 1))
+        dy = max(top - y, 0, y - (top + height - 1))
+        return dx * dx + dy * dy
+
+    def to_physical(self, x, y):
+        """把窗口坐标转换为物理像素，以该显示器的左上角为原点缩放"""
+        left, top = self.logical_geometry()[:2]
+        return self.left + round((x - left) * self.scale), self.top + round((y - top) * self.scale)
+
+    def clip(self, bbox):
+        """把物理像素范围限制在该显示器内"""
+        left, top, right, bottom = bbox
+        left = max(self.left, min(left, self.right))
+        top = max(self.top, min(top, self.bottom))
+        right = max(left, min(right, self.right))
+        bottom = max(top, min(bottom, self.bottom))
+        return left, top, right, bottom
+
+    def __repr__(self):
+        width, height = self.size
+        return (f"Monitor({self.name or '?'} {width}x{height}+{self.left}+{self.top}, "
+                f"scale={self.scale}, dpi={self.dpi}{', primary' if self.primary else ''})")
+
+
+class _XRandR:
+    """XRandR 显示器查询和拓扑变化事件（使用独立的 X 连接）"""
+
+    def __init__(self):
+        import os
+        from core.xshm import XRRMonitorInfo, _declare, _load_library
+        self._x11 = x11 = _load_library('X11')
+        self._xrandr = xrandr = _load_library('Xrandr')
+        _declare(x11.XOpenDisplay, ctypes.c_void_p, [ctypes.c_char_p])
+        _declare(x11.XDefaultRootWindow, ctypes.c_ulong, [ctypes.c_void_p])
+        _declare(x11.XConnectionNumber, ctypes.c_int, [ctypes.c_void_p])
+        _declare(x11.XPending, ctypes.c_int, [ctypes.c_void_p])
+        _declare(x11.XNextEvent, ctypes.c_int, [ctypes.c_void_p, ctypes.c_void_p])
+        _declare(x11.XFlush, ctypes.c_int, [ctypes.c_void_p])
+        _declare(x11.XCloseDisplay, ctypes.c_int, [ctypes.c_void_p])
+        _declare(x11.XGetAtomName, ctypes.c_void_p, [ctypes.c_void_p, ctypes.c_ulong])
+        _declare(x11.XFree, ctypes.c_int, [ctypes.c_void_p])
+        _declare(xrandr.XRRQueryExtension, ctypes.c_int,
+                 [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)])
+        _declare(xrandr.XRRSelectInput, None, [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int])
+        _declare(xrandr.XRRGetMonitors, ctypes.POINTER(XRRMonitorInfo),
+                 [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.POINTER(ctypes.c_int)])
+        _declare(xrandr.XRRFreeMonitors, None, [ctypes.POINTER(XRRMonitorInfo)])
+
+        name = os.environ.get('DISPLAY')
+        if not name:
+            raise OSError("未设置 DISPLAY，无法连接 X 服务器")
+        self._display = x11.XOpenDisplay(name.encode())
+        if not self._display:
+            raise OSError(f"无法连接 X 服务器: {name}")
+        event_base = ctypes.c_int()
+        error_base = ctypes.c_int()
+        if not xrandr.XRRQueryExtension(self._display, ctypes.byref(event_base), ctypes.byref(error_base)):
+            x11.XCloseDisplay(self._display)
+            raise OSError("X 服务器不支持 XRandR 扩展")
+        self._event_base = event_base.value
+        self._root = x11.XDefaultRootWindow(self._display)
+        self._lock = threading.Lock()
+        self._event = ctypes.create_string_buffer(XEVENT_SIZE)
+
+    def query(self):
+        """当前各显示器，主显示器在前"""
+        with self._lock:
+            count = ctypes.c_int()
+            infos = self._xrandr.XRRGetMonitors(self._display, self._root, 1, ctypes.byref(count))
+            if not infos:
+                return []
+            try:
+                monitors = []
+                for i in range(count.value):
+                    info = infos[i]
+                    # X 的坐标总是物理像素，DPI 由物理尺寸估算，仅供参考
+                    dpi = round(info.width * 25.4 / info.mwidth) if info.mwidth else 96
+                    monitors.append(Monitor(info.x, info.y, info.x + info.width, info.y + info.height,
+                                            dpi=dpi, primary=bool(info.primary), name=self._atom_name(info.name)))
+            finally:
+                self._xrandr.XRRFreeMonitors(infos)
+        monitors.sort(key=lambda monitor: not monitor.primary)
+        return monitors
+
+    def _atom_name(self, atom):
+        pointer = self._x11.XGetAtomName(self._display, atom) if atom else None
+        if not pointer:
+            return ''
+        try:
+            return ctypes.string_at(pointer).decode('utf-8', 'replace')
+        finally:
+            self._x11.XFree(pointer)
+
+    def watch(self):
+        """订阅显示器增减、分辨率和位置变化事件"""
+        with self._lock:
+            self._xrandr.XRRSelectInput(
+                self._display, self._root,
+                RR_SCREEN_CHANGE_NOTIFY_MASK | RR_CRTC_CHANGE_NOTIFY_MASK | RR_OUTPUT_CHANGE_NOTIFY_MASK
+            )
+            self._x11.XFlush(self._display)
+
+    def wait_for_change(self, timeout):
+        """
+        等待拓扑变化事件
+        :return: 期间是否收到过变化事件
+        """
+        readable, _, _ = select.select([self._x11.XConnectionNumber(self._display)], [], [], timeout)
+        if not readable:
+            return False
+        changed = False
+        with self._lock:
+            while self._x11.XPending(self._display):
+                self._x11.XNextEvent(self._display, self._event)
+                event_type = ctypes.c_int.from_buffer(self._event).value
+                if event_type - self._event_base in (RR_SCREEN_CHANGE_NOTIFY, RR_NOTIFY):
+                    changed = True
+        return changed
+
+    def close(self):
+        with self._lock:
+            if self._display:
+                self._x11.XCloseDisplay(self._display)
+                self._display = None
+
+
+def _system_scale():
+    """进程未感知DPI时窗口坐标的缩放比例（系统DPI / 96）"""
+    try:
+        return ctypes.windll.user32.GetDpiForSystem() / 96.0
+    except (AttributeError, OSError):
+        return 1.0
+
+
+def _windows_signature():
+    user32 = ctypes.windll.user32
+    return tuple(user32.GetSystemMetrics(index) for index in WINDOWS_TOPOLOGY_METRICS)
+
+
+def _windows_monitors():
+    """通过 EnumDisplayMonitors 获取各显示器的范围和DPI"""
+    from ctypes import wintypes
+
+    class MONITORINFOEXW(ctypes.Structure):
+        _fields_ = [
+            ('cbSize', wintypes.DWORD),
+            ('rcMonitor', wintypes.RECT),
+            ('rcWork', wintypes.RECT),
+            ('dwFlags', wintypes.DWORD),
+            ('szDevice', wintypes.WCHAR * 32),
+        ]
+
+    user32 = ctypes.windll.user32
+    shcore = ctypes.windll.shcore
+    scale = 1.0 if enable_dpi_awareness() else _system_scale()
+    handles = []
+    callback_type = ctypes.WINFUNCTYPE(ctypes.c_int, wintypes.HMONITOR, wintypes.HDC,
+                                       ctypes.POINTER(wintypes.RECT), wintypes.LPARAM)
+    callback = callback_type(lambda handle, hdc, rect, data: handles.append(handle) or 1)
+    user32.EnumDisplayMonitors(None, None, callback, 0)
+
+    monitors = []
+    for handle in handles:
+        info = MONITORINFOEXW()
+        info.cbSize = ctypes.sizeof(MONITORINFOEXW)
+        if not user32.GetMonitorInfoW(handle, ctypes.byref(info)):
+            continue
+        dpi_x = wintypes.UINT(96)
+        dpi_y = wintypes.UINT(96)
+        try:
+            # MDT_EFFECTIVE_DPI
+            shcore.GetDpiForMonitor(handle, 0, ctypes.byref(dpi_x), ctypes.byref(dpi_y))
+        except OSError:
+            pass
+        rect = info.rcMonitor
+        monitors.append(Monitor(rect.left, rect.top, rect.right, rect.bottom, scale=scale,
+                                dpi=dpi_x.value, primary=bool(info.dwFlags & 1), name=info.szDevice))
+    monitors.sort(key=lambda monitor: not monitor.primary)
+    return monitors
+
+
+class MonitorTopology:
+    """
+    显示器拓扑
+    枚举各显示器的物理范围和缩放比例并缓存，只在拓扑变化时重新枚举：
+    Linux 由后台线程监听 XRandR 事件，Windows 在每次查询时比较虚拟桌面范围和显示器数量
+    """
+
+    def __init__(self, fallback=None):
+        """
+        :param fallback: 平台接口不可用时获取显示器范围的函数，返回 [(left, top, right, bottom)]，主显示器在前
+        """
+        self.fallback = fallback
+        # 每次拓扑变化加一，使用方据此判断缓存的截图缓冲区等是否需要重建
+        self.generation = 0
+        self._monitors = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self._xrandr = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Linux 上开始监听拓扑变化事件，连接 X 服务器失败时每次查询都重新枚举"""
+        if self._thread is not None or not sys.platform.startswith('linux'):
+            return self
+        try:
+            self._xrandr = _XRandR()
+            self._xrandr.watch()
+        except (OSError, AttributeError) as e:
+            print(f"无法监听显示器变化: {e}")
+            self._xrandr = None
+            return self
+        self._thread = threading.Thread(target=self._listen, name='monitor-topology', daemon=True)
+        self._thread.start()
+        return self
+
+    def _listen(self):
+        while not self._stop_event.is_set():
+            try:
+                changed = self._xrandr.wait_for_change(1.0)
+            except (OSError, ValueError):
+                break
+            if changed:
+                print("显示器布局已变化")
+                self.invalidate()
+
+    def invalidate(self):
+        """丢弃缓存，下一次查询时重新枚举"""
+        with self._lock:
+            self._monitors = None
+            self.generation += 1
+
+    def monitors(self):
+        """各显示器（Monitor 列表），主显示器在前"""
+        with self._lock:
+            if sys.platform == 'win32':
+                signature = _windows_signature()
+                if signature != self._signature:
+                    if self._signature is not None:
+                        self.generation += 1
+                    self._signature = signature
+                    self._monitors = None
+            if self._monitors is None:
+                self._monitors = self._enumerate()
+                print(f"显示器: {self._monitors}")
+            return self._monitors
+
+    def _enumerate(self):
+        monitors = []
+        try:
+            if sys.platform == 'win32':
+                monitors = _windows_monitors()
+            elif self._xrandr is not None:
+                monitors = self._xrandr.query()
+        except (OSError, AttributeError) as e:
+            print(f"枚举显示器失败: {e}")
+        if not monitors and self.fallback:
+            scale = 1.0 if enable_dpi_awareness() else _system_scale()
+            monitors = [Monitor(*bounds, scale=scale, primary=index == 0)
+                        for index, bounds in enumerate(self.fallback())]
+        return monitors
+
+    def primary(self):
+        return self.monitors()[0]
+
+    def monitor_at(self, x, y):
+        """窗口坐标 (x, y) 所在的显示器，不在任何显示器上时返回最近的一个"""
+        monitors = self.monitors()
+        for monitor in monitors:
+            if monitor.contains(x, y):
+                return monitor
+        return min(monitors, key=lambda monitor: monitor.distance(x, y))
+
+    def close(self):
+        self._stop_event.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=2)
+        if self._xrandr is not None:
+            self._xrandr.close()
+            self._xrandr = None
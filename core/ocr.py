@@ -1,89 +1,143 @@
-import requests
-import base64
-import json
-from config.settings import Settings
+from io import BytesIO
+from PIL import Image
+from config.settings import get_settings
+from core.cache import OCRResultCache
+from core.layout import COORDINATES_CAPTURE, COORDINATES_KEY, OCRResult
+from core.preprocess import ImagePreprocessor
+from core.tiling import TiledRecognizer
+from core.backends import create_backend
+from utils.metrics import metrics
 import os
 
 class OCRManager:
     def __init__(self):
-        self.settings = Settings()
-        self.access_token = None
-        
-    def _get_access_token(self):
-        """获取百度API access token"""
-        if not self.access_token:
-            self.access_token = self.settings.get_access_token()
-            if not self.access_token:
-                print("获取access token失败，请检查API_KEY和SECRET_KEY是否正确")
-            else:
-                print(f"成功获取access token: {self.access_token[:10]}...")
-        return self.access_token
+        self.settings = get_settings()
+        self.backend = create_backend(self.settings)
+        self.preprocessor = ImagePreprocessor.from_settings(self.settings)
+        self.tiler = TiledRecognizer.from_settings(self.settings)
+        self.cache = None
+        if self.settings.OCR_CACHE_SIZE > 0:
+            self.cache = OCRResultCache(
+                max_entries=self.settings.OCR_CACHE_SIZE,
+                disk_dir=self.settings.OCR_CACHE_DIR or None,
+                disk_max_bytes=self.settings.OCR_CACHE_DISK_MB * 1024 * 1024
+            )
         
-    def recognize_text(self, image_path):
+    def _encode_image(self, image):
+        """
+        将图片编码为上传所需的字节，全程在内存中完成
+        :param image: PIL Image、bytes/memoryview（已编码的图片数据）或图片文件路径
+        :return: (图片文件字节, 坐标变换)，坐标变换把识别结果映射回原图像素，未经预处理时为None
+        """
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return bytes(image), None
+
+        if isinstance(image, (str, os.PathLike)):
+            # 兼容旧的文件路径调用方式
+            if not os.path.exists(image):
+                raise Exception(f"图片文件不存在: {image}")
+            with open(image, 'rb') as f:
+                return f.read(), None
+
+        if hasattr(image, 'save'):
+            # 预处理后编码，减小上传体积
+            with metrics.span('encode'):
+                data, info = self.preprocessor.process_with_info(image)
+            return data, info['transform']
+
+        raise Exception(f"不支持的图片类型: {type(image).__name__}")
+
+    def _request_params(self):
+        """影响识别结果的请求参数"""
+        return {
+            'language_type': self.settings.OCR_LANGUAGE_TYPE,
+            'detect_direction': self.settings.OCR_DETECT_DIRECTION
+        }
+
+    def _load_pixels(self, image):
+        """获取用于计算缓存键的解码后图片"""
+        if hasattr(image, 'tobytes'):
+            return image
+        return Image.open(BytesIO(self._encode_image(image)[0]))
+
+    def _dump_image(self, image_bytes, dump_path):
+        """将实际上传的图片写入调试文件"""
+        try:
+            dump_dir = os.path.dirname(dump_path)
+            if dump_dir and not os.path.exists(dump_dir):
+                os.makedirs(dump_dir)
+            with open(dump_path, 'wb') as f:
+                f.write(image_bytes)
+            print(f"截图已保存到: {dump_path}")
+        except Exception as e:
+            print(f"保存调试截图失败: {str(e)}")
+
+    def recognize_text(self, image, dump_path=None):
         """
         识别图片中的文字
-        :param image_path: 图片文件路径
+        :param image: PIL Image、bytes/memoryview 或图片文件路径
+        :param dump_path: 可选，调试时将上传的图片另存到该路径
         :return: 识别到的文字列表
         """
         try:
-            # 检查图片文件是否存在
-            if not os.path.exists(image_path):
-                raise Exception(f"图片文件不存在: {image_path}")
-                
-            # 获取access token
-            access_token = self._get_access_token()
-            if not access_token:
-                raise Exception("无法获取access token")
-
-            # 读取图片文件
-            with open(image_path, 'rb') as f:
-                image = base64.b64encode(f.read())
-
-            # 设置请求参数
-            params = {
-                'access_token': access_token
-            }
-            
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded'
-            }
-            
-            data = {
-                'image': image,
-                'language_type': 'CHN_ENG',  # 中英文混合
-                'detect_direction': 'true',   # 检测文字方向
-                'probability': 'true'         # 返回识别结果的置信度
-            }
-
-            print("正在发送OCR请求...")
-            # 发送OCR请求
-            response = requests.post(
-                self.settings.OCR_REQUEST_URL,
-                params=params,
-                headers=headers,
-                data=data
-            )
-
-            # 处理响应
-            if response.ok:
-                result = response.json()
-                print(f"OCR响应: {json.dumps(result, ensure_ascii=False, indent=2)}")
-                
-                # 检查错误码
-                if 'error_code' in result:
-                    error_msg = result.get('error_msg', '未知错误')
-                    raise Exception(f"OCR API返回错误: {error_msg} (错误码: {result['error_code']})")
-                    
+            result = self.recognize(image, dump_path=dump_path)
+            with metrics.span('process_result'):
                 return self.process_result(result)
-            else:
-                print(f"OCR请求失败: HTTP {response.status_code}")
-                print(f"响应内容: {response.text}")
-                return []
-
         except Exception as e:
             print(f"OCR识别出错: {str(e)}")
             return []
 
+    def recognize(self, image, dump_path=None):
+        """
+        识别图片并返回原始结果，出错时抛出异常
+        :param image: PIL Image、bytes/memoryview 或图片文件路径
+        :param dump_path: 可选，调试时将上传的图片另存到该路径
+        :return: OCR API返回的JSON结果
+        """
+        # 相同画面直接返回缓存结果，不消耗API额度
+        cache_key = None
+        if self.cache:
+            with metrics.span('cache_lookup'):
+                # coordinates 区分坐标已映射回截图的结果，旧的缓存条目不再命中
+                # 预处理选项改变上传的图片，修改后（如开启二值化）需要重新识别
+                key_params = dict(self._request_params(), backend=self.backend.name,
+                                  endpoint=self.settings.OCR_ENDPOINT, coordinates=COORDINATES_CAPTURE,
+                                  preprocess=self.preprocessor.cache_params())
+                cache_key = self.cache.make_key(self._load_pixels(image), key_params)
+                cached = self.cache.get(cache_key)
+            if cached is not None:
+                print("命中OCR结果缓存")
+                return cached
+
+        # 超大截图分块并发识别
+        if hasattr(image, 'size') and self.tiler.should_tile(image):
+            result = self.tiler.recognize(image, self._recognize_single)
+        else:
+            result = self._recognize_single(image, dump_path=dump_path)
+
+        if cache_key:
+            self.cache.put(cache_key, result)
+        return result
+
+    def _recognize_single(self, image, dump_path=None):
+        """编码并识别单张图片，结果中的坐标为该图片的像素坐标"""
+        # 在内存中编码图片，不再经过临时文件
+        image_bytes, transform = self._encode_image(image)
+        if dump_path:
+            self._dump_image(image_bytes, dump_path)
+
+        result = self.backend.recognize(image_bytes, self._request_params())
+        # 上传的图片经过裁剪和缩放，坐标需要映射回截图后再缓存和返回
+        if transform:
+            result = transform.map_result(result)
+        result = dict(result)
+        result[COORDINATES_KEY] = COORDINATES_CAPTURE
+        return result
+
+    def close(self):
+        """释放OCR后端资源"""
+        self.backend.close()
+
     def process_result(self, result):
         """
         处理OCR返回结果
@@ -109,19 +163,37 @@ class OCRManager:
             print(f"处理OCR结果出错: {str(e)}")
         return texts
 
+    def parse_result(self, result):
+        """
+        将OCR返回结果转换为 OCRResult，保留坐标和置信度
+        :param result: OCR API返回的JSON结果
+        """
+        parsed = OCRResult.from_api(result)
+        if parsed:
+            print(f"识别到 {len(parsed)} 个文本区域")
+        else:
+            print("未识别到任何文字")
+        return parsed
+
+    def format_text(self, parsed):
+        """复制到剪贴板的文字，OCR_LAYOUT 开启时按版面重排"""
+        with metrics.span('layout'):
+            return parsed.text(layout=self.settings.OCR_LAYOUT)
+
     def save_to_clipboard(self, texts):
         """
         将文字保存到剪贴板
-        :param texts: 要保存的文字列表
+        :param texts: 要保存的文字列表，或已经排好版的文字
         """
         if not texts:
             print("没有文字需要保存到剪贴板")
             return False
             
-        text = '\n'.join(texts)
+        text = texts if isinstance(texts, str) else '\n'.join(texts)
         try:
             import pyperclip
-            pyperclip.copy(text)
+            with metrics.span('clipboard'):
+                pyperclip.copy(text)
             print(f"已将以下文字保存到剪贴板:\n{text}")
             return True
         except Exception as e:
@@ -0,0 +1,325 @@
+from PIL import Image, ImageChops, ImageFilter, ImageOps
+from core.buffers import encode_buffer
+
+# 百度通用文字识别的图片限制：base64编码后不超过4M，最短边至少15px，最长边不超过4096px
+MAX_BASE64_BYTES = 4 * 1024 * 1024
+MIN_SIDE = 15
+MAX_SIDE = 4096
+
+FORMAT_PNG = 'png'
+FORMAT_PALETTE = 'palette'
+FORMAT_JPEG = 'jpeg'
+
+
+def background_level(gray):
+    """以灰度直方图的众数作为背景亮度"""
+    histogram = gray.histogram()
+    return max(range(256), key=histogram.__getitem__)
+
+
+def ink_mask(gray, background, threshold=48):
+    """与背景差异明显的像素视为文字"""
+    diff = ImageChops.difference(gray, Image.new('L', gray.size, background))
+    return diff.point(lambda v: 255 if v > threshold else 0)
+
+
+def row_profile(mask):
+    """水平投影：每行压缩为一个像素，值为该行文字像素的占比（0-255）"""
+    return mask.resize((1, mask.size[1]), Image.BOX).tobytes()
+
+
+def text_line_runs(profile, min_value=2):
+    """
+    根据水平投影找出文字行
+    :return: [(起始行, 结束行)] 列表，结束行不包含在内
+    """
+    runs = []
+    start = None
+    for y, value in enumerate(profile):
+        if value > min_value:
+            if start is None:
+                start = y
+        elif start is not None:
+            runs.append((start, y))
+            start = None
+    if start is not None:
+        runs.append((start, len(profile)))
+    return runs
+
+
+def estimate_line_height(gray, background):
+    """
+    通过水平投影估计文字行高
+    :return: 各文字行高度的中位数，无法估计时返回0
+    """
+    runs = text_line_runs(row_profile(ink_mask(gray, background)))
+    if not runs:
+        return 0
+    heights = sorted(end - start for start, end in runs)
+    return heights[len(heights) // 2]
+
+
+class CoordinateTransform:
+    """
+    上传图片坐标到原图坐标的变换
+    原图坐标 = 偏移 + 上传图片坐标 / 缩放比例，依次记录裁剪、缩放和填充
+    """
+
+    __slots__ = ('size', 'offset_x', 'offset_y', 'scale_x', 'scale_y')
+
+    def __init__(self, size):
+        """
+        :param size: 原图尺寸，映射后的坐标限制在该范围内
+        """
+        self.size = size
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        self.scale_x = 1.0
+        self.scale_y = 1.0
+
+    def cropped(self, left, top):
+        """裁剪掉左上方的 left、top 像素"""
+        self.offset_x += left / self.scale_x
+        self.offset_y += top / self.scale_y
+
+    def resized(self, before, after):
+        """图片尺寸从 before 缩放为 after"""
+        self.scale_x *= after[0] / before[0]
+        self.scale_y *= after[1] / before[1]
+
+    def padded(self, left, top):
+        """在左侧和上方填充 left、top 像素"""
+        self.offset_x -= left / self.scale_x
+        self.offset_y -= top / self.scale_y
+
+    def is_identity(self):
+        return (self.offset_x, self.offset_y, self.scale_x, self.scale_y) == (0, 0, 1, 1)
+
+    def map_location(self, location):
+        """把上传图片中的 location 映射回原图像素"""
+        width, height = self.size
+        left = self.offset_x + location['left'] / self.scale_x
+        top = self.offset_y + location['top'] / self.scale_y
+        right = self.offset_x + (location['left'] + location['width']) / self.scale_x
+        bottom = self.offset_y + (location['top'] + location['height']) / self.scale_y
+        left, right = (min(max(round(v), 0), width) for v in (left, right))
+        top, bottom = (min(max(round(v), 0), height) for v in (top, bottom))
+        return dict(location, left=left, top=top, width=right - left, height=bottom - top)
+
+    def map_result(self, result):
+        """
+        把OCR结果中的坐标映射回原图像素
+        :return: 新的结果字典，不修改传入的结果
+        """
+        if self.is_identity() or not result.get('words_result'):
+            return result
+        items = []
+        for item in result['words_result']:
+            if 'location' in item:
+                item = dict(item, location=self.map_location(item['location']))
+            items.append(item)
+        return dict(result, words_result=items)
+
+
+class ImagePreprocessor:
+    """
+    上传前的图片预处理
+    按配置依次执行：裁剪到文字区域、按文字行高缩小、灰度化、自适应二值化，
+    最后在候选格式中选择编码后体积最小的一种，并保证满足百度API的尺寸限制
+    """
+
+    def __init__(self, grayscale=True, binarize=False, crop=True, target_text_height=0,
+                 formats=(FORMAT_PNG, FORMAT_PALETTE, FORMAT_JPEG), jpeg_quality=85):
+        """
+        :param grayscale: 是否转为灰度图
+        :param binarize: 是否进行自适应二值化
+        :param crop: 是否裁剪到文字所在区域
+        :param target_text_height: 目标文字行高（像素），行高大于该值时等比缩小，0表示不缩放
+        :param formats: 候选编码格式
+        :param jpeg_quality: JPEG编码质量
+        """
+        self.grayscale = grayscale
+        self.binarize = binarize
+        self.crop = crop
+        self.target_text_height = target_text_height
+        self.formats = tuple(formats) or (FORMAT_PNG,)
+        self.jpeg_quality = jpeg_quality
+
+    @classmethod
+    def from_settings(cls, settings):
+        """根据配置创建预处理器"""
+        formats = [f.strip().lower() for f in settings.PREPROCESS_FORMATS.split(',') if f.strip()]
+        return cls(
+            grayscale=settings.PREPROCESS_GRAYSCALE,
+            binarize=settings.PREPROCESS_BINARIZE,
+            crop=settings.PREPROCESS_CROP,
+            target_text_height=settings.PREPROCESS_TEXT_HEIGHT,
+            formats=formats,
+            jpeg_quality=settings.PREPROCESS_JPEG_QUALITY
+        )
+
+    def cache_params(self):
+        """影响上传图片的预处理选项，计入识别结果缓存的键"""
+        return {
+            'grayscale': self.grayscale,
+            'binarize': self.binarize,
+            'crop': self.crop,
+            'text_height': self.target_text_height,
+            'formats': ','.join(self.formats),
+            'jpeg_quality': self.jpeg_quality
+        }
+
+    def process(self, image):
+        """
+        预处理并编码图片
+        :param image: PIL Image
+        :return: 编码后的图片字节
+        """
+        return self.process_with_info(image)[0]
+
+    def process_with_info(self, image):
+        """
+        预处理并编码图片，同时返回处理信息
+        :param image: PIL Image
+        :return: (图片字节, 信息字典)，信息字典的 transform 为上传图片到原图的坐标变换
+        """
+        info = {'original_size': image.size}
+        transform = CoordinateTransform(image.size)
+        info['transform'] = transform
+
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        gray = image if image.mode == 'L' else image.convert('L')
+        background = background_level(gray)
+        info['background'] = background
+
+        if self.crop:
+            box = self._text_bbox(gray, background)
+            if box:
+                image = image.crop(box)
+                gray = gray.crop(box)
+                info['crop'] = box
+                transform.cropped(box[0], box[1])
+
+        if self.target_text_height > 0:
+            line_height = estimate_line_height(gray, background)
+            info['line_height'] = line_height
+            if line_height > self.target_text_height:
+                scale = self.target_text_height / line_height
+                before = image.size
+                image = self._resize(image, scale)
+                gray = self._resize(gray, scale)
+                transform.resized(before, image.size)
+
+        if self.binarize:
+            image = self._adaptive_binarize(gray, background)
+        elif self.grayscale:
+            image = gray
+
+        image = self._fit_limits(image, background, transform)
+        info['size'] = image.size
+
+        data, fmt = self._encode_smallest(image, transform)
+        info['format'] = fmt
+        info['bytes'] = len(data)
+        return data, info
+
+    def _text_bbox(self, gray, background, margin=8):
+        """计算文字所在区域，四周保留少量边距"""
+        bbox = ink_mask(gray, background).getbbox()
+        if not bbox:
+            return None
+        width, height = gray.size
+        left = max(0, bbox[0] - margin)
+        top = max(0, bbox[1] - margin)
+        right = min(width, bbox[2] + margin)
+        bottom = min(height, bbox[3] + margin)
+        if (left, top, right, bottom) == (0, 0, width, height):
+            return None
+        return left, top, right, bottom
+
+    def _resize(self, image, scale):
+        width, height = image.size
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return image.resize(size, Image.LANCZOS)
+
+    def _adaptive_binarize(self, gray, background, radius=15, offset=10):
+        """
+        自适应二值化：像素比邻域均值暗offset以上视为文字，输出白底黑字的1位图
+        """
+        if background < 128:
+            # 深色背景先反色，统一为浅底深字
+            gray = ImageOps.invert(gray)
+        local_mean = gray.filter(ImageFilter.BoxBlur(radius))
+        darker = ImageChops.subtract(local_mean, gray)
+        binary = darker.point(lambda v: 0 if v > offset else 255)
+        return binary.convert('1', dither=Image.Dither.NONE)
+
+    def _fit_limits(self, image, background, transform=None):
+        """缩放或填充图片，使其满足API的尺寸限制"""
+        width, height = image.size
+        if max(width, height) > MAX_SIDE:
+            image = self._resize(image, MAX_SIDE / max(width, height))
+            if transform:
+                transform.resized((width, height), image.size)
+            width, height = image.size
+        if min(width, height) < MIN_SIDE:
+            pad_x = max(0, MIN_SIDE - width)
+            pad_y = max(0, MIN_SIDE - height)
+            fill = background if image.mode == 'L' else 255 if image.mode == '1' else (background,) * 3
+            image = ImageOps.expand(
+                image,
+                border=(pad_x // 2, pad_y // 2, pad_x - pad_x // 2, pad_y - pad_y // 2),
+                fill=fill
+            )
+            if transform:
+                transform.padded(pad_x // 2, pad_y // 2)
+        return image
+
+    def _encode(self, image, fmt, quality=None):
+        if fmt == FORMAT_PALETTE and image.mode == '1':
+            return None
+        # 各候选格式依次写入同一个线程内复用的缓冲区，只复制最终的字节
+        with encode_buffer() as buffer:
+            if fmt == FORMAT_JPEG:
+                if image.mode == '1':
+                    image = image.convert('L')
+                image.save(buffer, 'JPEG', quality=quality or self.jpeg_quality)
+            elif fmt == FORMAT_PALETTE:
+                colors = 16 if image.mode == 'L' else 64
+                image.quantize(colors=colors).save(buffer, 'PNG')
+            else:
+                image.save(buffer, 'PNG')
+            return buffer.getvalue()
+
+    def _encode_smallest(self, image, transform=None):
+        """
+        用候选格式分别编码，选择体积最小的一种
+        :return: (图片字节, 格式)
+        """
+        best = None
+        for fmt in self.formats:
+            data = self._encode(image, fmt)
+            if data is not None and (best is None or len(data) < len(best[0])):
+                best = (data, fmt)
+        if best is None:
+            best = (self._encode(image, FORMAT_PNG), FORMAT_PNG)
+
+        # 超出大小限制时逐步降低JPEG质量，仍然过大则继续缩小
+        quality = self.jpeg_quality
+        while base64_size(len(best[0])) > MAX_BASE64_BYTES:
+            if quality > 40:
+                quality -= 15
+            else:
+                before = image.size
+                image = self._resize(image, 0.75)
+                if transform:
+                    transform.resized(before, image.size)
+            best = (self._encode(image, FORMAT_JPEG, quality), FORMAT_JPEG)
+        return best
+
+
+def base64_size(size):
+    """base64编码后的字节数"""
+    return (size + 2) // 3 * 4
+
@@ -1,278 +1,345 @@
-import tkinter as tk
-from PIL import ImageGrab, ImageTk, Image
+from PIL import Image
 import os
+import sys
 import tempfile
-import time
+import threading
+from ui.preview import PreviewWindow
+from ui.selection import SelectionOverlay
+from ui.tk_thread import TkThread
+from core.watch import RegionWatcher
+from core.monitors import MonitorTopology, enable_dpi_awareness
+from core.buffers import OWNER_PREVIEW, get_image_pool
+from utils.metrics import metrics
+
+
+class CaptureBackend:
+    """
+    截图后端接口
+    坐标均为物理像素，bbox 为 (left, top, right, bottom)，返回 RGB 模式的 PIL Image
+    """
+
+    name = 'base'
+
+    def grab(self, bbox=None, out=None):
+        """
+        截取屏幕区域
+        :param bbox: 截取范围，None 表示主屏幕（与 ImageGrab 的默认行为一致）
+        :param out: 可复用的 RGB 图片，尺寸一致时直接写入该图片，避免每次分配新内存
+        :return: PIL Image
+        """
+        raise NotImplementedError
+
+    def monitors(self):
+        """各显示器范围 [(left, top, right, bottom)]，主显示器在前"""
+        raise NotImplementedError
+
+    def grab_monitor(self, index=0, out=None):
+        """截取指定显示器"""
+        return self.grab(self.monitors()[index], out=out)
+
+    def refresh(self):
+        """显示器布局变化后丢弃缓存的屏幕范围和缓冲区"""
+        pass
+
+    def close(self):
+        pass
+
+
+def _clip_bbox(bbox, bounds):
+    """把截取范围限制在屏幕内，范围为空时抛出异常"""
+    left, top, right, bottom = bbox
+    left = max(bounds[0], min(left, bounds[2]))
+    top = max(bounds[1], min(top, bounds[3]))
+    right = max(left, min(right, bounds[2]))
+    bottom = max(top, min(bottom, bounds[3]))
+    if right <= left or bottom <= top:
+        raise ValueError(f"截取范围不在屏幕内: {bbox}")
+    return left, top, right, bottom
+
+
+def _image_from_bgrx(buffer, size, stride, out=None):
+    """把 BGRX 像素转换为 RGB 图片，尺寸一致时写入 out"""
+    if out is not None and out.size == size and out.mode == 'RGB':
+        out.frombytes(buffer, 'raw', 'BGRX', stride, 1)
+        return out
+    return Image.frombuffer('RGB', size, buffer, 'raw', 'BGRX', stride, 1)
+
+
+class ImageGrabBackend(CaptureBackend):
+    """Pillow 自带的 ImageGrab，所有平台都可用的兜底实现"""
+
+    name = 'imagegrab'
 
-class ScreenshotManager:
-    # 替换原来的 __init__ 方法中的DPI获取代码
     def __init__(self):
-        self.dpi_scale = 1.0
-        self.size_text_id = None  # 初始化 size_text_id
-        self.current_rect = None  # 初始化 current_rect
-        self.current_screenshot = None  # 初始化 current_screenshot
-        try:
-            import ctypes
-            shcore = ctypes.windll.shcore
-            shcore.SetProcessDpiAwareness(2)  # 使用PerMonitorV2模式
-            hwnd = ctypes.windll.user32.GetDesktopWindow()
-            dpi = ctypes.c_uint()
-            shcore.GetDpiForWindow(hwnd, ctypes.byref(dpi))
-            self.dpi_scale = dpi.value / 96.0
-        except:
-            pass
-        print(f"当前DPI缩放: {self.dpi_scale}")
+        self._bounds = None
 
-        
-    def start_region_selection(self):
-        """开始区域选择"""
-        # 创建全屏窗口
-        # self.selection_window = tk.Tk()
-        # self.selection_window.attributes('-fullscreen', True, '-alpha', 0.3, '-topmost', True)
-        # self.selection_window.configure(cursor="crosshair")
-
-        self.selection_window = tk.Tk()
-        # 使用更可靠的全屏实现
-        self.selection_window.attributes('-fullscreen', True)
-        self.selection_window.attributes('-alpha', 0.3)
-        self.selection_window.attributes('-topmost', True)
-        self.selection_window.update()  # 强制窗口立即完成布局
-
-        # 创建画布
-        self.canvas = tk.Canvas(
-            self.selection_window,
-            highlightthickness=0,
-            bg='gray11'
-        )
-        self.canvas.pack(fill=tk.BOTH, expand=True)
-
-        # 绑定事件
-        self.canvas.bind('<Button-1>', self._on_mouse_down)
-        self.canvas.bind('<B1-Motion>', self._on_mouse_drag)
-        self.canvas.bind('<ButtonRelease-1>', self._on_mouse_up)
-        self.selection_window.bind('<Escape>', self._on_escape)
-        
-        # 创建工具栏
-        self.create_toolbar()
-        
-        # 运行窗口
-        self.selection_window.mainloop()
-
-    def create_toolbar(self):
-        """创建工具栏"""
-        self.toolbar = tk.Toplevel(self.selection_window)
-        self.toolbar.overrideredirect(True)
-        self.toolbar.attributes('-topmost', True)
-        self.toolbar.withdraw()  # 初始时隐藏工具栏
-
-        # 创建按钮
-        confirm_btn = tk.Button(
-            self.toolbar,
-            text="确认",
-            command=lambda: self._confirm_selection(self.selection_window),
-            state=tk.DISABLED
-        )
-        confirm_btn.pack(side=tk.LEFT, padx=5, pady=5)
-
-        cancel_btn = tk.Button(
-            self.toolbar,
-            text="取消",
-            command=lambda: self._cancel_selection(self.selection_window)
-        )
-        cancel_btn.pack(side=tk.LEFT, padx=5, pady=5)
-        
-        # 保存按钮引用以便后续启用/禁用
-        self.confirm_btn = confirm_btn
-
-    def _on_mouse_down(self, event):
-        """鼠标按下事件处理"""
-        # 记录起始位置（使用相对坐标）
-        self.start_x = event.x
-        self.start_y = event.y
-        print(f"Mouse down at: ({self.start_x}, {self.start_y})")  # Debug output
-        
-        # 创建选择框
-        self.current_rect = self.canvas.create_rectangle(
-            self.start_x, self.start_y, self.start_x, self.start_y,
-            outline='#1E90FF',  # 蓝色边框
-            fill='#ADD8E6',     # 浅蓝色填充
-            stipple='gray50'    # 半透明效果
-        )
-
-    def _on_mouse_drag(self, event):
-        """鼠标拖动事件处理"""
-        if self.current_rect:
-            # 更新选择框（使用相对坐标）
-            current_x = event.x
-            current_y = event.y
-            print(f"Mouse drag to: ({current_x}, {current_y})")  # Debug output
-            
-            self.canvas.coords(
-                self.current_rect,
-                self.start_x, self.start_y,
-                current_x, current_y
-            )
-            
-            # 更新尺寸文本
-            width = abs(current_x - self.start_x)
-            height = abs(current_y - self.start_y)
-            if self.size_text_id is not None:  # 检查 size_text_id 是否为 None
-                self.canvas.delete(self.size_text_id)
-            self.size_text_id = self.canvas.create_text(
-                min(self.start_x, current_x) + width/2,
-                min(self.start_y, current_y) - 10,
-                text=f'{width} x {height}',
-                fill='white'
-            )
+    def grab(self, bbox=None, out=None):
+        from PIL import ImageGrab
+        # ImageGrab 每次都会分配新图片，out 参数仅为接口兼容；指定范围时可以位于副显示器上
+        return ImageGrab.grab(bbox=bbox, all_screens=bbox is not None)
 
-            # 更新工具栏位置
-            self.toolbar.geometry(f'+{event.x_root}+{event.y_root-40}')
-            self.toolbar.deiconify()
-            
-            # 启用确认按钮（如果选择区域足够大）
-            if width > 10 and height > 10:
-                self.confirm_btn.config(state=tk.NORMAL)
-            else:
-                self.confirm_btn.config(state=tk.DISABLED)
+    def monitors(self):
+        if self._bounds is None:
+            width, height = self.grab().size
+            self._bounds = (0, 0, width, height)
+        return [self._bounds]
+
+    def refresh(self):
+        self._bounds = None
+
+
+class XShmBackend(CaptureBackend):
+    """X11 共享内存截图，复用同一块共享内存，可直接截取单个显示器或子区域"""
+
+    name = 'xshm'
+
+    def __init__(self):
+        from core.xshm import XShmGrabber
+        self._grabber = XShmGrabber()
+        self._monitors = None
+
+    def grab(self, bbox=None, out=None):
+        bounds = (0, 0, self._grabber.width, self._grabber.height)
+        left, top, right, bottom = _clip_bbox(bbox or bounds, bounds)
+        size = (right - left, bottom - top)
+        # 监视线程和交互截图共用同一个共享内存段，在抓取锁内把像素解码到独立的图片中
+        return self._grabber.grab(left, top, size[0], size[1],
+                                  lambda buffer, stride: _image_from_bgrx(buffer, size, stride, out))
+
+    def monitors(self):
+        if self._monitors is None:
+            self._monitors = self._grabber.monitors()
+        return self._monitors
+
+    def refresh(self):
+        # 根窗口尺寸变化后共享内存段大小不再匹配，重新创建
+        from core.xshm import XShmGrabber
+        self._grabber.close()
+        self._grabber = XShmGrabber()
+        self._monitors = None
+
+    def close(self):
+        self._grabber.close()
+
+
+class MSSBackend(CaptureBackend):
+    """基于 mss 库的截图（Windows 使用 BitBlt，macOS 使用 CoreGraphics）"""
+
+    name = 'mss'
+
+    def __init__(self):
+        import mss
+        self._mss = mss
+        # mss 实例持有的句柄不能跨线程使用，每个线程单独创建
+        self._local = threading.local()
+        self._monitors = None
+
+    def _instance(self):
+        instance = getattr(self._local, 'instance', None)
+        if instance is None:
+            instance = self._local.instance = self._mss.mss()
+        return instance
+
+    def grab(self, bbox=None, out=None):
+        instance = self._instance()
+        if bbox is None:
+            monitor = instance.monitors[1]
         else:
-            self.size_text_id = None  # 重置 size_text_id
+            left, top, right, bottom = bbox
+            monitor = {'left': left, 'top': top, 'width': right - left, 'height': bottom - top}
+        shot = instance.grab(monitor)
+        return _image_from_bgrx(shot.bgra, shot.size, shot.width * 4, out)
 
-    def _on_mouse_up(self, event):
-        """鼠标释放事件处理"""
-        if self.current_rect is None:  # 检查 current_rect 是否为 None
-            return
-        # 获取选择区域的相对坐标
-        x1 = min(self.start_x, event.x)
-        y1 = min(self.start_y, event.y)
-        x2 = max(self.start_x, event.x)
-        y2 = max(self.start_y, event.y)
-        print(f"选择区域: ({x1}, {y1}) -> ({x2}, {y2})")
-        
-        # 如果选择区域太小，取消选择
-        if abs(x2-x1) < 10 or abs(y2-y1) < 10:
-            self._cancel_selection(self.selection_window)
-            return
+    def monitors(self):
+        if self._monitors is None:
+            # mss 的第0项是所有显示器的外接矩形，其余为各显示器
+            self._monitors = [
+                (item['left'], item['top'], item['left'] + item['width'], item['top'] + item['height'])
+                for item in self._instance().monitors[1:]
+            ]
+        return self._monitors
+
+    def refresh(self):
+        # mss 实例在创建时缓存显示器列表，其他线程的实例在下次使用时重新创建
+        self._local = threading.local()
+        self._monitors = None
+
+
+CAPTURE_BACKENDS = {
+    'xshm': XShmBackend,
+    'mss': MSSBackend,
+    'imagegrab': ImageGrabBackend,
+}
+
+
+def create_capture_backend(name='auto'):
+    """
+    创建截图后端
+    auto：Linux 优先使用 X11 共享内存，其次 mss，都不可用时回退到 ImageGrab
+    """
+    name = (name or 'auto').lower()
+    if name == 'auto':
+        candidates = ['xshm', 'mss'] if sys.platform.startswith('linux') else ['mss']
+    elif name in CAPTURE_BACKENDS:
+        candidates = [name]
+    else:
+        raise ValueError(f"未知的截图后端: {name}")
+
+    for candidate in candidates:
+        if candidate == 'imagegrab':
+            break
+        try:
+            backend = CAPTURE_BACKENDS[candidate]()
+            print(f"截图后端: {backend.name}")
+            return backend
+        except (ImportError, OSError) as e:
+            print(f"截图后端 {candidate} 不可用，回退: {e}")
+    print("截图后端: imagegrab")
+    return ImageGrabBackend()
+
+class ScreenshotManager:
+    def __init__(self, tk_thread=None, frozen_frame=True, capture_backend='auto'):
+        # 必须在创建窗口之前声明DPI感知，之后的窗口坐标才是物理像素
+        enable_dpi_awareness()
+        # 截图和整屏缓冲区由进程共享的内存管理器按预算释放和复用
+        self.image_pool = get_image_pool()
+        self._current_screenshot = None
+        # 最近一次选区的物理像素坐标，用于区域监视
+        self.last_region = None
+        # 定格模式：按下快捷键时截取鼠标所在的显示器，框选在静止画面上进行
+        self.frozen_frame = frozen_frame
+        self._frame = None
+        # 当前框选所在的显示器
+        self._monitor = None
+        self.backend = create_capture_backend(capture_backend)
+        # 显示器拓扑只在布局变化时重新枚举
+        self.topology = MonitorTopology(fallback=self.backend.monitors).start()
+        self._generation = self.topology.generation
+        # 所有窗口都在同一个Tk线程中创建，未传入时单独启动一个
+        self.tk_thread = tk_thread or TkThread()
+        self.overlay = SelectionOverlay(self.tk_thread, self._grab_region)
+        # 预览窗口在首次预览时创建
+        self.preview = None
+
+    def prepare(self):
+        """预先创建遮罩窗口，首次截图无需等待窗口创建"""
+        self.tk_thread.call(self.overlay.build)
         
+    def _check_topology(self):
+        """显示器布局变化后刷新截图后端并丢弃尺寸已不匹配的缓冲区"""
+        generation = self.topology.generation
+        if generation != self._generation:
+            self._generation = generation
+            self.backend.refresh()
+
+    def monitor_under_cursor(self):
+        """鼠标所在的显示器"""
+        self.topology.monitors()
+        self._check_topology()
+        x, y = self.tk_thread.call_sync(lambda: self.tk_thread.root.winfo_pointerxy())
+        return self.topology.monitor_at(x, y)
+
+    def start_region_selection(self):
+        """开始区域选择，阻塞直到用户确认或取消"""
+        self._monitor = monitor = self.monitor_under_cursor()
+        # 上一张截图不再用于预览
+        self.current_screenshot = None
+        if self.frozen_frame:
+            # 显示遮罩前只截取鼠标所在的显示器，所见画面即为识别的画面；
+            # 复用尺寸一致的显示器帧缓冲区（选区总是裁剪为独立的图片）
+            with metrics.span('grab'):
+                self._frame = self.backend.grab(monitor.bbox, out=self.image_pool.take(monitor.size))
         try:
-            # 获取窗口物理坐标
-            root_x = self.selection_window.winfo_x()
-            root_y = self.selection_window.winfo_y()
-            
-            # 转换为物理像素坐标
-            screen_x1 = int((root_x + x1) * self.dpi_scale)
-            screen_y1 = int((root_y + y1) * self.dpi_scale)
-            screen_x2 = int((root_x + x2) * self.dpi_scale)
-            screen_y2 = int((root_y + y2) * self.dpi_scale)
-            
-            # 添加边界检查（防止超出屏幕）
-            screen_width = self.selection_window.winfo_screenwidth()
-            screen_height = self.selection_window.winfo_screenheight()
-            
-            screen_x1 = max(0, min(screen_x1, screen_width))
-            screen_y1 = max(0, min(screen_y1, screen_height))
-            screen_x2 = max(0, min(screen_x2, screen_width))
-            screen_y2 = max(0, min(screen_y2, screen_height))
-            print(f"截图区域: ({screen_x1}, {screen_y1}) -> ({screen_x2}, {screen_y2})")
-            
-            # 截图前确保窗口已隐藏
-            self.selection_window.withdraw()
-            time.sleep(0.1)  # 给窗口一点时间来隐藏
-            
-            # 进行截图
-            self.current_screenshot = ImageGrab.grab(bbox=(
-                screen_x1,
-                screen_y1,
-                screen_x2,
-                screen_y2
-            ))
-            
-            print(f"截图尺寸: {self.current_screenshot.size}")
-            
-        except Exception as e:
-            print(f"截图时发生错误: {e}")
-            self._cancel_selection(self.selection_window)
+            self.current_screenshot = self.overlay.select(
+                background=self._frame, bounds=monitor.logical_geometry()
+            )
         finally:
-            self.current_rect = None  # 重置 current_rect
+            self.image_pool.give(self._frame)
+            self._frame = None
+            self.image_pool.record_metrics()
+        return self.current_screenshot
+
+    @property
+    def current_screenshot(self):
+        """最近一次的截图，超出内存预算被提前释放后为None"""
+        screenshot = self._current_screenshot
+        if screenshot is not None and not self.image_pool.holds(screenshot, OWNER_PREVIEW):
+            self._current_screenshot = screenshot = None
+        return screenshot
+
+    @current_screenshot.setter
+    def current_screenshot(self, screenshot):
+        """替换最近一次的截图，旧截图的预览用途随之释放"""
+        previous, self._current_screenshot = self._current_screenshot, screenshot
+        if previous is not None and previous is not screenshot:
+            self.image_pool.release(previous, OWNER_PREVIEW)
+        self.image_pool.track(screenshot, OWNER_PREVIEW)
 
+    def _grab_region(self, overlay, x1, y1, x2, y2):
+        """
+        截取选择的区域（在Tk线程中调用）
+        定格模式下直接从整屏帧中裁剪，否则在遮罩隐藏后重新截图
+        :return: PIL Image
+        """
+        # 按选区所在显示器的缩放比例转换为物理像素，并限制在该显示器内（防止超出屏幕）
+        monitor = self._monitor or self.topology.monitor_at(x1, y1)
+        region = monitor.clip(monitor.to_physical(x1, y1) + monitor.to_physical(x2, y2))
+        self.last_region = region
+        if self._frame is not None:
+            return self._crop_frame(region, monitor)
 
-    def _on_escape(self, event):
-        """ESC键按下事件处理"""
-        self._cancel_selection(self.selection_window)
+        print(f"截图区域: ({region[0]}, {region[1]}) -> ({region[2]}, {region[3]})")
+        with metrics.span('grab'):
+            screenshot = self.backend.grab(bbox=region)
 
-    def _confirm_selection(self, window):
-        """确认截图"""
-        window.destroy()
+        print(f"截图尺寸: {screenshot.size}")
+        return screenshot
 
-    def _cancel_selection(self, window):
-        """取消截图"""
+    def _crop_frame(self, region, monitor):
+        """从显示器帧中裁剪选区（虚拟桌面上的物理像素）"""
+        box = (region[0] - monitor.left, region[1] - monitor.top,
+               region[2] - monitor.left, region[3] - monitor.top)
+        print(f"裁剪区域: ({box[0]}, {box[1]}) -> ({box[2]}, {box[3]})")
+        with metrics.span('crop'):
+            screenshot = self._frame.crop(box)
+            screenshot.load()
+        print(f"截图尺寸: {screenshot.size}")
+        return screenshot
+
+    def create_watcher(self, region, recognize, **kwargs):
+        """
+        创建区域监视器，使用与截图相同的后端按间隔截取该区域
+        :param region: 物理像素坐标 (left, top, right, bottom)
+        :param recognize: 识别函数，接收 PIL Image，返回OCR API结果字典
+        """
+        return RegionWatcher(self.backend.grab, recognize, region, **kwargs)
+
+    def close(self):
+        """释放截图后端、最近的截图和拓扑监听"""
         self.current_screenshot = None
-        window.destroy()
+        self.topology.close()
+        self.backend.close()
 
     def save_screenshot(self):
-        """保存截图到临时文件"""
+        """保存截图到临时文件（仅用于调试，识别流程不再依赖该文件）"""
         if self.current_screenshot:
-            # 创建临时文件
-            temp_dir = tempfile.gettempdir()
-            temp_file = os.path.join(temp_dir, 'screenshot.png')
-            
-            # 保存截图
-            self.current_screenshot.save(temp_file, 'PNG')
+            # 使用唯一文件名，避免并发截图互相覆盖
+            fd, temp_file = tempfile.mkstemp(prefix='screenshot_', suffix='.png')
+            with os.fdopen(fd, 'wb') as f:
+                self.current_screenshot.save(f, 'PNG')
             return temp_file
             
         return None
 
-    def show_preview(self):
-        """显示截图预览"""
-        if self.current_screenshot:
-            # 创建预览窗口
-            preview_window = tk.Toplevel()
-            preview_window.title("截图预览")
-            preview_window.attributes('-topmost', True)
-            
-            # 获取屏幕尺寸
-            screen_width = preview_window.winfo_screenwidth()
-            screen_height = preview_window.winfo_screenheight()
-            
-            # 获取图片尺寸
-            img_width, img_height = self.current_screenshot.size
-            
-            # 计算预览窗口的合适大小（不超过屏幕的75%）
-            max_width = int(screen_width * 0.75)
-            max_height = int(screen_height * 0.75)
-            
-            # 如果图片太大，等比例缩小
-            scale = 1.0
-            if img_width > max_width:
-                scale = max_width / img_width
-            if img_height * scale > max_height:
-                scale = max_height / img_height
-                
-            preview_width = int(img_width * scale)
-            preview_height = int(img_height * scale)
-            
-            # 调整预览窗口大小
-            preview_window.geometry(f"{preview_width}x{preview_height}")
-            
-            # 转换PIL图片为PhotoImage
-            preview_image = self.current_screenshot
-            if scale != 1.0:
-                preview_image = preview_image.resize((preview_width, preview_height))
-            photo = ImageTk.PhotoImage(preview_image)
-            
-            # 创建标签显示图片
-            label = tk.Label(preview_window, image=photo)
-            label.image = photo  # 保持引用防止被垃圾回收
-            label.pack(fill=tk.BOTH, expand=True)
-            
-            # 添加关闭按钮
-            close_button = tk.Button(
-                preview_window,
-                text="关闭预览",
-                command=preview_window.destroy
-            )
-            close_button.pack(pady=5)
-            
-            # 运行预览窗口
-            preview_window.mainloop()
-        else:
-            print("没有可预览的截图")
\ No newline at end of file
+    def show_preview(self, result=None):
+        """
+        显示最近一次截图的预览，预览窗口只创建一次
+        :param result: 可选，该截图的识别结果（OCRResult），带坐标时绘制文字框
+        """
+        screenshot = self.current_screenshot
+        if screenshot is None:
+            print("没有可预览的截图")
+            return
+        if self.preview is None:
+            self.preview = PreviewWindow(self.tk_thread)
+        self.preview.show(screenshot, result)
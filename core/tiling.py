@@ -0,0 +1,141 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from core.preprocess import background_level, ink_mask, row_profile
+
+
+class TiledRecognizer:
+    """
+    大图分块识别
+    将超出限制的截图沿空白行切分为互相重叠的水平条带，并发识别各条带，
+    再按阅读顺序合并 words_result 并去掉重叠区域中重复的行
+    """
+
+    def __init__(self, max_height=2048, max_pixels=4096 * 2048, overlap=64, workers=4):
+        """
+        :param max_height: 单个条带的最大高度
+        :param max_pixels: 图片像素总数超过该值时启用分块
+        :param overlap: 相邻条带的重叠高度
+        :param workers: 并发识别的条带数
+        """
+        self.max_height = max_height
+        self.max_pixels = max_pixels
+        self.overlap = min(overlap, max_height // 4)
+        self.workers = max(1, workers)
+
+    @classmethod
+    def from_settings(cls, settings):
+        """根据配置创建分块识别器"""
+        return cls(
+            max_height=settings.OCR_TILE_MAX_HEIGHT,
+            max_pixels=settings.OCR_TILE_MAX_PIXELS,
+            overlap=settings.OCR_TILE_OVERLAP,
+            workers=settings.OCR_TILE_WORKERS
+        )
+
+    def should_tile(self, image):
+        """判断图片是否需要分块识别"""
+        width, height = image.size
+        return height > self.max_height or width * height > self.max_pixels
+
+    def split(self, image):
+        """
+        计算条带范围，切分点尽量落在空白行上，避免把一行文字切成两半
+        :return: [(top, bottom)] 列表
+        """
+        gray = image.convert('L')
+        profile = row_profile(ink_mask(gray, background_level(gray)))
+        width, height = image.size
+        # 很宽的截图需要更矮的条带，才能让单块像素数不超过上限
+        band_height = max(min(self.max_height, self.max_pixels // width), self.overlap * 4, 64)
+        overlap = min(self.overlap, band_height // 4)
+
+        bands = []
+        top = 0
+        while True:
+            if height - top <= band_height:
+                bands.append((top, height))
+                break
+            limit = top + band_height
+            # 在条带下半部分从下往上寻找空白行作为切分点
+            bottom = self._find_blank(profile, limit - 1, top + band_height // 2, -1) or limit
+            bands.append((top, bottom))
+            # 下一条带从重叠区域内的空白行开始
+            next_top = bottom - overlap
+            top = self._find_blank(profile, next_top, bottom, 1) or next_top
+        return bands
+
+    def _find_blank(self, profile, start, stop, step):
+        for y in range(start, stop, step):
+            if profile[y] == 0:
+                return y
+        return None
+
+    def recognize(self, image, recognize_tile):
+        """
+        分块并发识别
+        :param image: PIL Image
+        :param recognize_tile: 识别单个条带的函数，返回OCR API结果字典，
+                               其中的坐标必须已映射回条带的像素坐标（条带各自预处理，裁剪和缩放各不相同）
+        :return: 合并后的OCR结果字典
+        """
+        bands = self.split(image)
+        width = image.size[0]
+        tiles = [image.crop((0, top, width, bottom)) for top, bottom in bands]
+        print(f"图片尺寸 {image.size} 超出限制，分为 {len(tiles)} 块并发识别")
+
+        # 各条带在调用方上下文的副本中识别，保持请求优先级和性能链路
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(tiles))) as executor:
+            results = list(executor.map(lambda tile: context.copy().run(recognize_tile, tile), tiles))
+        return self.merge(bands, results)
+
+    def merge(self, bands, results):
+        """
+        合并各条带的识别结果
+        :param bands: 条带范围列表
+        :param results: 与条带一一对应的OCR结果字典，坐标为条带的像素坐标
+        :return: 合并后的OCR结果字典，坐标为整张截图的像素坐标
+        """
+        merged = []
+        prev_bottom = None
+        for (top, bottom), result in zip(bands, results):
+            items = []
+            for item in result.get('words_result', []):
+                item = dict(item)
+                if 'location' in item:
+                    # 条带是整幅宽度的水平切片，水平坐标不变，垂直方向加上条带起点
+                    location = dict(item['location'])
+                    location['top'] += top
+                    item['location'] = location
+                items.append(item)
+
+            if prev_bottom is not None and prev_bottom > top:
+                items = self._drop_overlap(merged, items, top, prev_bottom)
+            merged.extend(items)
+            prev_bottom = bottom
+
+        combined = dict(results[0]) if results else {}
+        combined['words_result'] = merged
+        combined['words_result_num'] = len(merged)
+        return combined
+
+    def _drop_overlap(self, merged, items, top, prev_bottom):
+        """去掉重叠区域内与上一条带重复的行"""
+        if items and all('location' in item for item in items):
+            # 有坐标时以重叠区域中线为界，中线以上的行归上一条带（两侧都已是截图坐标）
+            middle = (top + prev_bottom) / 2
+            merged[:] = [item for item in merged
+                         if 'location' not in item or _center_y(item) < middle]
+            return [item for item in items if _center_y(item) >= middle]
+
+        # 没有坐标时按文字比较：上一条带末尾与本条带开头相同的行视为重复
+        tail = [item['words'].strip() for item in merged[-len(items):]] if items else []
+        for size in range(min(len(tail), len(items)), 0, -1):
+            if tail[-size:] == [item['words'].strip() for item in items[:size]]:
+                return items[size:]
+        return items
+
+
+def _center_y(item):
+    location = item['location']
+    return location['top'] + location['height'] / 2
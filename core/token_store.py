@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# 百度API中表示access token无效或过期的错误码
+INVALID_TOKEN_ERROR_CODES = (110, 111)
+# 两次后台刷新之间的最短间隔（秒），有效期很短的token也不会被连续刷新
+MIN_REFRESH_INTERVAL = 60
+
+
+class TokenStore:
+    """
+    access token 持久化存储
+    将token及其过期时间写入磁盘，重启后直接复用，并在过期前由后台线程提前刷新
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.cache_path = settings.TOKEN_CACHE_FILE
+        self.refresh_margin = settings.TOKEN_REFRESH_MARGIN
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self._load()
+        if self._token:
+            self._schedule_refresh()
+
+    def _key_id(self):
+        """当前API_KEY和服务地址的摘要，二者变化后旧token自动失效"""
+        source = f"{self.settings.API_KEY or ''}@{self.settings.OCR_API_BASE}"
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+
+    def _load(self):
+        """从磁盘读取缓存的token"""
+        try:
+            if not os.path.exists(self.cache_path):
+                return
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('key_id') != self._key_id():
+                return
+            if data.get('expires_at', 0) <= time.time():
+                return
+            self._token = data.get('access_token')
+            self._expires_at = data.get('expires_at', 0)
+            print("已从缓存加载access token")
+        except Exception as e:
+            print(f"读取access token缓存失败: {e}")
+
+    def _save(self):
+        """将token写入磁盘（仅当前用户可读）"""
+        try:
+            cache_dir = os.path.dirname(self.cache_path)
+            if cache_dir and not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            data = {
+                'key_id': self._key_id(),
+                'access_token': self._token,
+                'expires_at': self._expires_at
+            }
+            tmp_path = self.cache_path + '.tmp'
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"保存access token缓存失败: {e}")
+
+    def _is_valid(self):
+        return bool(self._token) and time.time() < self._expires_at
+
+    def get_token(self):
+        """获取有效的token，缓存失效时同步刷新"""
+        if self._is_valid():
+            return self._token
+        return self.refresh()
+
+    def refresh(self, stale_token=None):
+        """
+        向百度API重新申请token
+        :param stale_token: 调用方认为已失效的token；若其他线程已完成刷新则直接返回新token
+        :return: 新token，失败时返回None
+        """
+        with self._lock:
+            if stale_token is not None and self._token != stale_token and self._is_valid():
+                return self._token
+
+            result = self.settings.fetch_access_token()
+            if not result or not result.get('access_token'):
+                return None
+
+            self._token = result['access_token']
+            # 百度token默认有效期30天
+            expires_in = int(result.get('expires_in', 2592000))
+            self._expires_at = time.time() + expires_in
+            self._save()
+            print(f"成功获取access token: {self._token[:10]}...")
+
+        self._schedule_refresh()
+        return self._token
+
+    def invalidate(self):
+        """标记当前token失效"""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0
+
+    def _schedule_refresh(self):
+        """在token过期前启动后台刷新"""
+        if self._timer:
+            self._timer.cancel()
+        remaining = self._expires_at - time.time()
+        # 有效期不超过提前量时，改为在剩余有效期过半时刷新
+        margin = min(self.refresh_margin, remaining / 2)
+        delay = max(remaining - margin, MIN_REFRESH_INTERVAL)
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        """后台刷新，失败时稍后重试"""
+        if self.refresh() is None:
+            print(f"后台刷新access token失败，{MIN_REFRESH_INTERVAL}秒后重试")
+            self._timer = threading.Timer(MIN_REFRESH_INTERVAL, self._background_refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def stop(self):
+        """停止后台刷新"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,182 @@
+import threading
+from collections import Counter
+from PIL import ImageChops
+from core.backends.scheduler import PRIORITY_WATCH, request_priority
+from core.preprocess import background_level, ink_mask, row_profile
+from utils.metrics import metrics
+
+
+def parse_region(text):
+    """解析 'x1,y1,x2,y2' 格式的区域，无效时返回None"""
+    try:
+        x1, y1, x2, y2 = (int(value) for value in text.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+def format_region(region):
+    return ','.join(str(value) for value in region)
+
+
+def block_signature(image, block_size):
+    """块签名：灰度图按块取平均，每个像素代表一个块的平均亮度"""
+    return image.convert('L').reduce(block_size)
+
+
+def changed_block_rows(previous, current, threshold):
+    """
+    比较两帧的块签名
+    :return: 有块发生变化的块行号列表
+    """
+    mask = ImageChops.difference(previous, current).point(lambda v: 255 if v > threshold else 0)
+    width, height = mask.size
+    data = mask.tobytes()
+    return [row for row in range(height) if any(data[row * width:(row + 1) * width])]
+
+
+class RegionWatcher:
+    """
+    区域监视
+    按固定间隔截取同一区域，与上一帧的块签名比较，只把发生变化的水平条带交给OCR，
+    并与这些条带上一次的识别结果比较，只输出新增或变化的文字行
+    """
+
+    def __init__(self, capture, recognize, region, interval=1.0, block_size=16, threshold=8,
+                 on_lines=None):
+        """
+        :param capture: 截图函数，签名与 CaptureBackend.grab 相同
+        :param recognize: 识别函数，接收 PIL Image，返回OCR API结果字典，坐标为该图片的像素坐标
+        :param region: 监视区域 (left, top, right, bottom)，物理像素
+        :param interval: 截图间隔（秒）
+        :param block_size: 比较画面时的块大小（像素）
+        :param threshold: 块平均亮度变化超过该值才视为变化
+        :param on_lines: 有新增或变化的文字行时调用，参数为文字列表
+        """
+        self.capture = capture
+        self.recognize = recognize
+        self.region = region
+        self.interval = interval
+        self.block_size = max(1, block_size)
+        self.threshold = threshold
+        self.on_lines = on_lines
+        self.polls = 0
+        self.recognitions = 0
+        self._buffer = None
+        self._signature = None
+        # 当前画面中的文字行 [(纵坐标, 文字)]
+        self._lines = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        截图一次并识别变化的部分
+        :return: 新增或变化的文字行
+        """
+        self.polls += 1
+        with metrics.span('watch_grab'):
+            frame = self._buffer = self.capture(self.region, out=self._buffer)
+
+        with metrics.span('watch_diff'):
+            signature = block_signature(frame, self.block_size)
+            if self._signature is None or self._signature.size != signature.size:
+                bands = [(0, frame.size[1])]
+                self._lines = []
+            else:
+                rows = changed_block_rows(self._signature, signature, self.threshold)
+                bands = self._bands(frame, rows)
+        if not bands:
+            return []
+
+        emitted = []
+        lines = self._lines
+        for top, bottom in bands:
+            # 条带在下一次截图时会被覆盖，裁剪出独立的图片再识别
+            band = frame.crop((0, top, frame.size[0], bottom))
+            with metrics.span('watch_ocr'), request_priority(PRIORITY_WATCH):
+                result = self.recognize(band)
+            self.recognitions += 1
+            band_lines = self._band_lines(result, top, bottom)
+            previous = Counter(text for y, text in lines if top <= y < bottom)
+            for y, text in band_lines:
+                if previous[text] > 0:
+                    previous[text] -= 1
+                else:
+                    emitted.append(text)
+            lines = [item for item in lines if not top <= item[0] < bottom] + band_lines
+        # 所有条带都识别成功后才更新状态，失败时下一次会重新识别
+        self._lines = sorted(lines)
+        self._signature = signature
+
+        if emitted and self.on_lines:
+            self.on_lines(emitted)
+        return emitted
+
+    def _bands(self, frame, rows):
+        """把变化的块行转换为像素条带，并向上下扩展到空白行，避免切断文字"""
+        if not rows:
+            return []
+        height = frame.size[1]
+        gray = frame.convert('L')
+        profile = row_profile(ink_mask(gray, background_level(gray)))
+
+        bands = []
+        for row in rows:
+            top = row * self.block_size
+            bottom = min(height, top + self.block_size)
+            while top > 0 and profile[top - 1] > 0:
+                top -= 1
+            while bottom < height and profile[bottom] > 0:
+                bottom += 1
+            if bands and top <= bands[-1][1]:
+                bands[-1] = (bands[-1][0], max(bands[-1][1], bottom))
+            else:
+                bands.append((top, bottom))
+        return bands
+
+    def _band_lines(self, result, top, bottom):
+        """
+        把条带的识别结果转换为 [(纵坐标, 文字)]
+        结果带位置时使用行的中心（已由识别函数映射回条带像素，再加上条带起点），否则在条带内均匀分布
+        """
+        words = [item for item in result.get('words_result', []) if item.get('words')]
+        lines = []
+        for index, item in enumerate(words):
+            location = item.get('location')
+            if location:
+                y = top + location['top'] + location['height'] // 2
+            else:
+                y = top + (index * 2 + 1) * (bottom - top) // (len(words) * 2)
+            lines.append((max(top, min(y, bottom - 1)), item['words']))
+        return lines
+
+    def start(self):
+        """在后台线程中开始监视"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name='region-watch', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """按间隔循环截图，直到调用 stop"""
+        print(f"开始监视区域: {format_region(self.region)}，间隔 {self.interval} 秒")
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"区域监视出错: {e}")
+            self._stop_event.wait(self.interval)
+        print(f"停止监视区域，共截图 {self.polls} 次，识别 {self.recognitions} 次")
+
+    def running(self):
+        return self._thread is not None
+
+    def stop(self):
+        self._stop_event.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.interval + 5)
@@ -0,0 +1,254 @@
+"""
+基于 MIT-SHM 扩展的 X11 截图
+像素由 X 服务器直接写入共享内存，省去 XGetImage 经由套接字传输整帧数据；
+共享内存段只在创建时分配一次，按整个根窗口大小申请，之后每次截图都复用
+"""
+import ctypes
+import ctypes.util
+import os
+import threading
+
+ZPIXMAP = 2
+ALL_PLANES = 0xFFFFFFFF
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+# 同一共享内存段上按尺寸缓存的 XImage 头数量
+MAX_IMAGE_HEADERS = 8
+
+
+class XImage(ctypes.Structure):
+    # 只声明需要读取的前部字段，结构体始终由 Xlib 分配
+    _fields_ = [
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('xoffset', ctypes.c_int),
+        ('format', ctypes.c_int),
+        ('data', ctypes.c_void_p),
+        ('byte_order', ctypes.c_int),
+        ('bitmap_unit', ctypes.c_int),
+        ('bitmap_bit_order', ctypes.c_int),
+        ('bitmap_pad', ctypes.c_int),
+        ('depth', ctypes.c_int),
+        ('bytes_per_line', ctypes.c_int),
+        ('bits_per_pixel', ctypes.c_int),
+        ('red_mask', ctypes.c_ulong),
+        ('green_mask', ctypes.c_ulong),
+        ('blue_mask', ctypes.c_ulong),
+    ]
+
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ('shmseg', ctypes.c_ulong),
+        ('shmid', ctypes.c_int),
+        ('shmaddr', ctypes.c_void_p),
+        ('readOnly', ctypes.c_int),
+    ]
+
+
+class XRRMonitorInfo(ctypes.Structure):
+    _fields_ = [
+        ('name', ctypes.c_ulong),
+        ('primary', ctypes.c_int),
+        ('automatic', ctypes.c_int),
+        ('noutput', ctypes.c_int),
+        ('x', ctypes.c_int),
+        ('y', ctypes.c_int),
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('mwidth', ctypes.c_int),
+        ('mheight', ctypes.c_int),
+        ('outputs', ctypes.c_void_p),
+    ]
+
+
+def _load_library(name):
+    path = ctypes.util.find_library(name)
+    if not path:
+        raise OSError(f"找不到动态库: {name}")
+    return ctypes.CDLL(path)
+
+
+def _declare(func, restype, argtypes):
+    func.restype = restype
+    func.argtypes = argtypes
+    return func
+
+
+class XShmGrabber:
+    """
+    X11 共享内存截图
+    可在多个线程中共用：截图、查询显示器和关闭都在内部锁内进行，
+    grab 在锁内把共享内存中的像素交给转换函数复制出来，调用方无需另外加锁
+    """
+
+    def __init__(self, display_name=None):
+        self._x11 = _load_library('X11')
+        self._xext = _load_library('Xext')
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._declare_functions()
+
+        name = display_name or os.environ.get('DISPLAY')
+        if not name:
+            raise OSError("未设置 DISPLAY，无法连接 X 服务器")
+        self._display = self._x11.XOpenDisplay(name.encode())
+        if not self._display:
+            raise OSError(f"无法连接 X 服务器: {name}")
+
+        self._shminfo = None
+        self._headers = {}
+        self._lock = threading.Lock()
+        try:
+            if not self._xext.XShmQueryExtension(self._display):
+                raise OSError("X 服务器不支持 MIT-SHM 扩展")
+            screen = self._x11.XDefaultScreen(self._display)
+            self._root = self._x11.XRootWindow(self._display, screen)
+            self._visual = self._x11.XDefaultVisual(self._display, screen)
+            self._depth = self._x11.XDefaultDepth(self._display, screen)
+            self.width = self._x11.XDisplayWidth(self._display, screen)
+            self.height = self._x11.XDisplayHeight(self._display, screen)
+            self._attach_segment()
+            # 检查像素格式，只支持每像素32位的真彩色
+            self._header(1, 1)
+        except Exception:
+            self.close()
+            raise
+
+    def _declare_functions(self):
+        x11, xext, libc = self._x11, self._xext, self._libc
+        _declare(x11.XOpenDisplay, ctypes.c_void_p, [ctypes.c_char_p])
+        _declare(x11.XCloseDisplay, ctypes.c_int, [ctypes.c_void_p])
+        _declare(x11.XDefaultScreen, ctypes.c_int, [ctypes.c_void_p])
+        _declare(x11.XRootWindow, ctypes.c_ulong, [ctypes.c_void_p, ctypes.c_int])
+        _declare(x11.XDefaultVisual, ctypes.c_void_p, [ctypes.c_void_p, ctypes.c_int])
+        _declare(x11.XDefaultDepth, ctypes.c_int, [ctypes.c_void_p, ctypes.c_int])
+        _declare(x11.XDisplayWidth, ctypes.c_int, [ctypes.c_void_p, ctypes.c_int])
+        _declare(x11.XDisplayHeight, ctypes.c_int, [ctypes.c_void_p, ctypes.c_int])
+        _declare(x11.XSync, ctypes.c_int, [ctypes.c_void_p, ctypes.c_int])
+        _declare(x11.XFree, ctypes.c_int, [ctypes.c_void_p])
+        _declare(xext.XShmQueryExtension, ctypes.c_int, [ctypes.c_void_p])
+        _declare(xext.XShmCreateImage, ctypes.POINTER(XImage), [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+            ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint
+        ])
+        _declare(xext.XShmAttach, ctypes.c_int, [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)])
+        _declare(xext.XShmDetach, ctypes.c_int, [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)])
+        _declare(xext.XShmGetImage, ctypes.c_int, [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage),
+            ctypes.c_int, ctypes.c_int, ctypes.c_ulong
+        ])
+        _declare(libc.shmget, ctypes.c_int, [ctypes.c_int, ctypes.c_size_t, ctypes.c_int])
+        _declare(libc.shmat, ctypes.c_void_p, [ctypes.c_int, ctypes.c_void_p, ctypes.c_int])
+        _declare(libc.shmdt, ctypes.c_int, [ctypes.c_void_p])
+        _declare(libc.shmctl, ctypes.c_int, [ctypes.c_int, ctypes.c_int, ctypes.c_void_p])
+
+    def _attach_segment(self):
+        """按根窗口大小申请共享内存段并交给 X 服务器"""
+        shminfo = XShmSegmentInfo()
+        size = self.width * self.height * 4
+        shminfo.shmid = self._libc.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            raise OSError(ctypes.get_errno(), "申请共享内存失败")
+        address = self._libc.shmat(shminfo.shmid, None, 0)
+        if address is None or address == ctypes.c_void_p(-1).value:
+            self._libc.shmctl(shminfo.shmid, IPC_RMID, None)
+            raise OSError(ctypes.get_errno(), "映射共享内存失败")
+        shminfo.shmaddr = address
+        shminfo.readOnly = 0
+        if not self._xext.XShmAttach(self._display, ctypes.byref(shminfo)):
+            self._libc.shmdt(address)
+            self._libc.shmctl(shminfo.shmid, IPC_RMID, None)
+            raise OSError("XShmAttach 失败")
+        self._x11.XSync(self._display, 0)
+        # 双方都已映射后立即标记删除，进程异常退出时由系统回收
+        self._libc.shmctl(shminfo.shmid, IPC_RMID, None)
+        self._shminfo = shminfo
+
+    def _header(self, width, height):
+        """
+        获取指定尺寸的 XImage 头
+        所有尺寸共用同一块共享内存，头结构只包含尺寸和行宽，按尺寸缓存
+        """
+        header = self._headers.get((width, height))
+        if header is not None:
+            return header
+        if len(self._headers) >= MAX_IMAGE_HEADERS:
+            self._free_headers()
+        header = self._xext.XShmCreateImage(
+            self._display, self._visual, self._depth, ZPIXMAP,
+            None, ctypes.byref(self._shminfo), width, height
+        )
+        if not header:
+            raise OSError("XShmCreateImage 失败")
+        if header.contents.bits_per_pixel != 32:
+            bits = header.contents.bits_per_pixel
+            self._x11.XFree(header)
+            raise OSError(f"不支持的像素格式: {bits} 位")
+        header.contents.data = self._shminfo.shmaddr
+        self._headers[(width, height)] = header
+        return header
+
+    def _free_headers(self):
+        for header in self._headers.values():
+            # 像素数据属于共享内存段，只释放头结构
+            header.contents.data = None
+            self._x11.XFree(header)
+        self._headers.clear()
+
+    def grab(self, left, top, width, height, convert):
+        """
+        截取根窗口上的矩形区域
+        共享内存段由所有线程共用，convert 在持有锁时调用，返回前必须把像素复制出来
+        :param convert: 转换函数 convert(内存视图, 行字节数)，像素为 BGRX 格式
+        :return: convert 的返回值
+        """
+        with self._lock:
+            if not self._display:
+                raise OSError("X 连接已关闭")
+            header = self._header(width, height)
+            if not self._xext.XShmGetImage(self._display, self._root, header, left, top, ALL_PLANES):
+                raise OSError("XShmGetImage 失败")
+            stride = header.contents.bytes_per_line
+            buffer = (ctypes.c_char * (stride * height)).from_address(self._shminfo.shmaddr)
+            return convert(memoryview(buffer).cast('B'), stride)
+
+    def monitors(self):
+        """
+        通过 XRandR 获取各显示器的位置
+        :return: [(left, top, right, bottom)]，主显示器在前；不支持时返回整个根窗口
+        """
+        with self._lock:
+            try:
+                xrandr = _load_library('Xrandr')
+                _declare(xrandr.XRRGetMonitors, ctypes.POINTER(XRRMonitorInfo), [
+                    ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.POINTER(ctypes.c_int)
+                ])
+                _declare(xrandr.XRRFreeMonitors, None, [ctypes.POINTER(XRRMonitorInfo)])
+            except (OSError, AttributeError):
+                return [(0, 0, self.width, self.height)]
+            count = ctypes.c_int()
+            infos = xrandr.XRRGetMonitors(self._display, self._root, 1, ctypes.byref(count))
+            if not infos:
+                return [(0, 0, self.width, self.height)]
+            try:
+                result = [(infos[i].x, infos[i].y, infos[i].x + infos[i].width,
+                           infos[i].y + infos[i].height, bool(infos[i].primary))
+                          for i in range(count.value)]
+            finally:
+                xrandr.XRRFreeMonitors(infos)
+        result.sort(key=lambda item: not item[4])
+        return [item[:4] for item in result] or [(0, 0, self.width, self.height)]
+
+    def close(self):
+        with self._lock:
+            if not self._display:
+                return
+            self._free_headers()
+            if self._shminfo is not None:
+                self._xext.XShmDetach(self._display, ctypes.byref(self._shminfo))
+                self._x11.XSync(self._display, 0)
+                self._libc.shmdt(self._shminfo.shmaddr)
+                self._shminfo = None
+            self._x11.XCloseDisplay(self._display)
+            self._display = None
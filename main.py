@@ -1,105 +1,145 @@
+import logging
 import threading
 import os
 import time
-from pynput import keyboard
-from core.screenshot import ScreenshotManager
-from core.ocr import OCRManager
-from ui.tray import SystemTray
-from ui.main_window import MainWindow
-from config.settings import Settings
+from config.settings import get_settings
+from config.credentials import get_credentials
+from utils.metrics import metrics
 import sys
 
+# 进程启动时刻，用于统计快捷键就绪耗时
+_PROCESS_START = time.perf_counter()
+
+
 class ScreenOCR:
+    """
+    启动时只创建托盘和快捷键监听，其余子系统（Tk线程、截图、OCR、网络、历史）
+    在首次使用时或启动后的后台预热中创建，重量级模块也随之延迟导入
+    """
+
     def __init__(self):
         # 添加资源路径处理
         self.base_path = self._get_base_path()
-        # 验证环境变量
-        self._verify_api_keys()
-        
-        self.settings = Settings()
-        self.screenshot_manager = ScreenshotManager()
-        self.ocr_manager = OCRManager()
-        self.main_window = MainWindow(
-            screenshot_callback=self.capture_and_recognize,
-            hotkey_callback=self.register_hotkey
+        self.settings = get_settings()
+        logging.basicConfig(level=self.settings.LOG_LEVEL, format='%(levelname)s %(name)s: %(message)s')
+        metrics.configure(
+            window=self.settings.METRICS_WINDOW,
+            trace_file=self.settings.METRICS_TRACE_FILE
         )
+        # 延迟创建的子系统，工厂函数之间会互相依赖，因此使用可重入锁
+        self._components = {}
+        self._components_lock = threading.RLock()
+        self._capture_lock = threading.Lock()
+        # API 密钥在后台查找，找不到时在托盘中提示，不影响启动
+        self.credentials = get_credentials()
+        # 托盘和Tk窗口创建之前声明按显示器感知DPI，各显示器的坐标均为物理像素
+        from core.monitors import enable_dpi_awareness
+        enable_dpi_awareness()
+
+        from ui.tray import SystemTray
         self.system_tray = SystemTray(
-            screenshot_callback=self.capture_and_recognize,
+            screenshot_callback=self.trigger_capture,
             show_window_callback=self.show_window,
-            exit_callback=self.cleanup
+            exit_callback=self.cleanup,
+            stats_callback=self.show_stats,
+            watch_callback=self.toggle_watch,
+            history_callback=self.show_history,
+            credentials=self.credentials,
+            preview_callback=self.show_preview
         )
+        self.watcher = None
+        # 最近一次截图的识别结果，预览时绘制文字框
+        self._last_result = None
         self.running = True
         self.keyboard_listener = None
+        # 快捷键在主窗口中修改后重新注册
+        self.settings.subscribe(lambda key, value: self.register_hotkey(), 'SCREENSHOT_HOTKEY')
         
-    def _verify_api_keys(self):
-        """验证百度 API 密钥是否正确设置"""
-        # 首先尝试直接获取环境变量
-        api_key = os.getenv('BAIDU_API_KEY')
-        secret_key = os.getenv('BAIDU_SECRET_KEY')
-        
-        if not api_key or not secret_key:
-            # 尝试通过不同方式获取环境变量
-            try:
-                # 方法1：使用 winreg 读取注册表（仅 Windows）
-                import winreg
-                def get_env_from_registry(name):
-                    try:
-                        key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, 
-                                           r'Environment', 
-                                           0, 
-                                           winreg.KEY_READ)
-                        value, _ = winreg.QueryValueEx(key, name)
-                        winreg.CloseKey(key)
-                        return value
-                    except:
-                        return None
-
-                api_key = get_env_from_registry('BAIDU_API_KEY')
-                secret_key = get_env_from_registry('BAIDU_SECRET_KEY')
-                
-                # 如果注册表中没有，尝试系统环境变量
-                if not api_key or not secret_key:
-                    key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 
-                                       r'SYSTEM\CurrentControlSet\Control\Session Manager\Environment', 
-                                       0, 
-                                       winreg.KEY_READ)
-                    if not api_key:
-                        api_key, _ = winreg.QueryValueEx(key, 'BAIDU_API_KEY')
-                    if not secret_key:
-                        secret_key, _ = winreg.QueryValueEx(key, 'BAIDU_SECRET_KEY')
-                    winreg.CloseKey(key)
-
-                # 如果还是没有找到，抛出异常
-                if not api_key or not secret_key:
-                    raise ValueError("未在注册表中找到环境变量")
+    def _component(self, name, factory):
+        """获取子系统，首次获取时调用 factory 创建并记录初始化耗时"""
+        try:
+            return self._components[name]
+        except KeyError:
+            pass
+        with self._components_lock:
+            if name not in self._components:
+                with metrics.span(f'init_{name}'):
+                    self._components[name] = factory()
+            return self._components[name]
 
-            except Exception as e:
-                print(f"从注册表读取失败: {str(e)}")
-                try:
-                    # 方法2：通过 subprocess 从 CMD 获取
-                    import subprocess
-                    api_key = subprocess.check_output('echo %BAIDU_API_KEY%', 
-                                                   shell=True).decode('utf-8').strip()
-                    secret_key = subprocess.check_output('echo %BAIDU_SECRET_KEY%', 
-                                                      shell=True).decode('utf-8').strip()
-                    
-                    # 检查是否获取到了实际的值而不是环境变量名称
-                    if api_key == '%BAIDU_API_KEY%' or secret_key == '%BAIDU_SECRET_KEY%':
-                        raise ValueError("环境变量未设置")
-                        
-                except Exception as sub_e:
-                    raise ValueError(
-                        f"无法获取环境变量。请确保已正确设置 BAIDU_API_KEY 和 BAIDU_SECRET_KEY。\n"
-                        f"错误详情：{str(sub_e)}"
-                    )
-        
-        # 确保值有效并设置到当前进程的环境变量中
-        if api_key and secret_key:
-            os.environ['BAIDU_API_KEY'] = api_key.strip()
-            os.environ['BAIDU_SECRET_KEY'] = secret_key.strip()
-            print(f"API 密钥验证成功：\nAPI_KEY: {api_key[:8]}...\nSECRET_KEY: {secret_key[:8]}...")
-        else:
-            raise ValueError("环境变量验证失败")
+    @property
+    def tk_thread(self):
+        """所有Tk窗口都在同一个专用线程中运行"""
+        def create():
+            from ui.tk_thread import TkThread
+            return TkThread().start()
+        return self._component('tk_thread', create)
+
+    @property
+    def screenshot_manager(self):
+        def create():
+            from core.screenshot import ScreenshotManager
+            return ScreenshotManager(
+                tk_thread=self.tk_thread,
+                frozen_frame=self.settings.SCREENSHOT_FROZEN_FRAME,
+                capture_backend=self.settings.SCREENSHOT_BACKEND
+            )
+        return self._component('screenshot_manager', create)
+
+    @property
+    def ocr_manager(self):
+        def create():
+            from core.ocr import OCRManager
+            return OCRManager()
+        return self._component('ocr_manager', create)
+
+    @property
+    def engine(self):
+        """识别在工作线程中进行，截图完成后立即返回"""
+        def create():
+            from core.engine import RecognitionEngine
+            engine = RecognitionEngine(
+                self.ocr_manager.recognize,
+                workers=self.settings.OCR_WORKERS,
+                queue_size=self.settings.OCR_QUEUE_SIZE,
+                policy=self.settings.OCR_QUEUE_POLICY
+            )
+            engine.start()
+            return engine
+        return self._component('engine', create)
+
+    @property
+    def history(self):
+        """识别历史在后台线程中写入，未启用时为None"""
+        def create():
+            if not self.settings.HISTORY_ENABLED:
+                return None
+            from core.history import HistoryStore
+            return HistoryStore.from_settings(self.settings)
+        return self._component('history', create)
+
+    @property
+    def history_window(self):
+        def create():
+            if self.history is None:
+                return None
+            from ui.history_window import HistoryWindow
+            return HistoryWindow(
+                self.tk_thread,
+                self.history,
+                copy_callback=self.ocr_manager.save_to_clipboard
+            )
+        return self._component('history_window', create)
+
+    @property
+    def main_window(self):
+        def create():
+            from ui.main_window import MainWindow
+            return MainWindow(
+                screenshot_callback=self.trigger_capture,
+                tk_thread=self.tk_thread
+            )
+        return self._component('main_window', create)
 
     def _get_base_path(self):
         """获取程序运行时的基础路径"""
@@ -114,28 +154,153 @@ class ScreenOCR:
         """显示主窗口"""
         self.main_window.show()
         
+    def trigger_capture(self):
+        """在独立线程中开始截图，立即返回，不阻塞快捷键监听和托盘线程"""
+        if not self._capture_lock.acquire(blocking=False):
+            print("正在截图中，忽略本次触发")
+            return
+        thread = threading.Thread(target=self._capture_worker, daemon=True)
+        thread.start()
+
+    def _capture_worker(self):
+        try:
+            self.capture_and_recognize()
+        except Exception as e:
+            print(f"截图失败: {e}")
+        finally:
+            self._capture_lock.release()
+
     def capture_and_recognize(self):
-        """截图并识别文字"""
-        # 开始截图
-        self.screenshot_manager.start_region_selection()
+        """截图并提交识别，识别结果在工作线程中写入剪贴板"""
+        # 记录本次截图识别的完整链路
+        trace = metrics.start_trace('capture')
+
+        # 开始截图（包含用户框选的时间）
+        with metrics.span('selection'):
+            self.screenshot_manager.start_region_selection()
         
-        # 如果有截图，进行识别
-        if self.screenshot_manager.current_screenshot:
-            # 保存截图到临时文件
-            temp_file = self.screenshot_manager.save_screenshot()
-            if temp_file:
-                # 识别文字
-                texts = self.ocr_manager.recognize_text(temp_file)
-                
-                # 保存到剪贴板
-                if texts:
-                    self.ocr_manager.save_to_clipboard(texts)
-                
-                # 清理临时文件
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+        # 如果有截图，直接在内存中进行识别
+        screenshot = self.screenshot_manager.current_screenshot
+        if screenshot:
+            # 识别完成前截图不会被释放
+            from core.buffers import OWNER_OCR, get_image_pool
+            get_image_pool().track(screenshot, OWNER_OCR)
+            # 调试模式下另存一份上传的截图
+            dump_path = None
+            if self.settings.DEBUG_DUMP_DIR:
+                dump_path = os.path.join(
+                    self.settings.DEBUG_DUMP_DIR,
+                    f"screenshot_{int(time.time() * 1000)}.png"
+                )
+
+            # 交给识别引擎排队处理
+            region = self.screenshot_manager.last_region
+            self.engine.submit(
+                screenshot,
+                callback=lambda future: self._on_recognized(future, trace, screenshot, region),
+                dump_path=dump_path
+            )
+
+    def _on_recognized(self, future, trace=None, screenshot=None, region=None):
+        """识别完成回调"""
+        from core.buffers import OWNER_HISTORY, OWNER_OCR, get_image_pool
+        pool = get_image_pool()
+        try:
+            if future.cancelled():
+                return
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"识别任务失败: {e}")
+                metrics.finish_trace(trace)
+                return
+            with metrics.span('process_result'):
+                parsed = self.ocr_manager.parse_result(result)
+            self._last_result = (screenshot, parsed)
+            # 按版面重排后保存到剪贴板
+            if parsed:
+                self.ocr_manager.save_to_clipboard(self.ocr_manager.format_text(parsed))
+                # 只入队，由后台线程写入数据库，截图在计算哈希和缩略图后释放
+                if self.history:
+                    pool.track(screenshot, OWNER_HISTORY)
+                    if not self.history.add(parsed.texts, image=screenshot, region=region,
+                                            confidences=parsed.confidence_list()):
+                        pool.release(screenshot, OWNER_HISTORY)
+            metrics.finish_trace(trace)
+        finally:
+            # 识别结束（包括被丢弃的任务），截图只剩预览用途
+            pool.release(screenshot, OWNER_OCR)
+            pool.record_metrics()
+
+    def show_preview(self):
+        """预览最近一次截图，识别完成后同时显示文字框"""
+        screenshot, parsed = self._last_result or (None, None)
+        if screenshot is not self.screenshot_manager.current_screenshot:
+            parsed = None
+        self.screenshot_manager.show_preview(parsed)
+
+    def show_history(self):
+        """显示识别历史搜索窗口"""
+        if self.history_window:
+            self.history_window.show()
+        else:
+            print("识别历史未启用")
+
+    def toggle_watch(self):
+        """开始或停止区域监视，未保存监视区域时先框选"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.system_tray.notify("已停止区域监视")
+            return
+        if not self._capture_lock.acquire(blocking=False):
+            print("正在截图中，稍后再开始区域监视")
+            return
+        thread = threading.Thread(target=self._start_watch, daemon=True)
+        thread.start()
+
+    def _start_watch(self):
+        from core.watch import format_region, parse_region
+        try:
+            region = parse_region(self.settings.WATCH_REGION)
+            if region is None:
+                if self.screenshot_manager.start_region_selection() is None:
+                    return
+                region = self.screenshot_manager.last_region
+                self.settings.update(WATCH_REGION=format_region(region))
+            self.watcher = self.screenshot_manager.create_watcher(
+                region,
+                self.ocr_manager.recognize,
+                interval=self.settings.WATCH_INTERVAL,
+                block_size=self.settings.WATCH_BLOCK_SIZE,
+                threshold=self.settings.WATCH_THRESHOLD,
+                on_lines=self._on_watch_lines
+            )
+            self.watcher.start()
+        except Exception as e:
+            print(f"开始区域监视失败: {e}")
+        finally:
+            self._capture_lock.release()
+
+    def _on_watch_lines(self, lines):
+        """区域监视发现新增或变化的文字行"""
+        text = '\n'.join(lines)
+        print(f"区域内容变化:\n{text}")
+        self.system_tray.notify(text, "区域监视")
+        if self.history and self.watcher:
+            self.history.add(lines, region=self.watcher.region, source='watch')
+
+    def show_stats(self):
+        """输出各阶段耗时统计"""
+        metrics.record_rss()
+        summary = metrics.format_summary()
+        if 'screenshot_manager' in self._components:
+            summary += '\n' + self.screenshot_manager.image_pool.format_status()
+        if 'ocr_manager' in self._components:
+            from core.backends.scheduler import get_scheduler
+            summary += '\n' + get_scheduler().format_status()
+        print(summary)
+        self.system_tray.notify(summary)
 
     def register_hotkey(self):
         """注册快捷键"""
@@ -161,24 +326,44 @@ class ScreenOCR:
             hotkey_str = '+'.join(formatted_parts)
             print(f"注册热键: {hotkey_str}")  # 调试信息
             
+            from pynput import keyboard
             # 创建热键监听器
             self.keyboard_listener = keyboard.GlobalHotKeys({
-                hotkey_str: self.capture_and_recognize
+                hotkey_str: self.trigger_capture
             })
             self.keyboard_listener.start()
                 
         except Exception as e:
             print(f"注册快捷键失败: {e}")
             
+    def _warm_up(self):
+        """在后台创建其余子系统，首次截图和识别无需等待初始化"""
+        try:
+            from utils import http
+            # 创建识别引擎时会一并加载OCR后端
+            self.engine
+            # 预热到OCR服务的连接，首次识别无需等待握手
+            http.warm_up(self.settings.OCR_REQUEST_URL, background=False)
+            # 启动Tk线程，预先创建截图遮罩并显示主窗口
+            self.screenshot_manager.prepare()
+            self.main_window.run()
+            self.history_window
+            elapsed = (time.perf_counter() - _PROCESS_START) * 1000
+            metrics.record('startup_warm', elapsed)
+            print(f"后台初始化完成，耗时 {elapsed:.0f} ms")
+        except Exception as e:
+            print(f"后台初始化失败: {e}")
+
     def run(self):
         """运行程序"""
-        # 注册快捷键
+        # 先注册快捷键，其余子系统在后台初始化
         self.register_hotkey()
-        
-        # 创建并启动主窗口线程
-        window_thread = threading.Thread(target=self.main_window.run)
-        window_thread.daemon = True
-        window_thread.start()
+        elapsed = (time.perf_counter() - _PROCESS_START) * 1000
+        metrics.record('startup_hotkey', elapsed)
+        print(f"快捷键就绪，启动耗时 {elapsed:.0f} ms")
+
+        thread = threading.Thread(target=self._warm_up, name='warm-up', daemon=True)
+        thread.start()
         
         # 运行系统托盘
         self.system_tray.run()
@@ -203,17 +388,46 @@ class ScreenOCR:
             if self.system_tray:
                 self.system_tray.cleanup()  # 确保SystemTray类中实现了cleanup方法
             
+            # 只释放已经创建的子系统
+            components = self._components
+
             # 关闭主窗口
-            if self.main_window:
-                self.main_window.close()
+            if components.get('main_window'):
+                components['main_window'].close()
+
+            # 写完剩余的历史记录
+            if components.get('history'):
+                components['history'].close()
+
+            # 停止区域监视
+            if self.watcher:
+                self.watcher.stop()
+
+            # 退出Tk线程并释放截图后端
+            if components.get('tk_thread'):
+                components['tk_thread'].stop()
+            if components.get('screenshot_manager'):
+                components['screenshot_manager'].close()
             
+            # 停止识别引擎
+            if components.get('engine'):
+                components['engine'].stop(wait=False)
+
+            # 释放OCR后端（停止access token后台刷新等）
+            if components.get('ocr_manager'):
+                components['ocr_manager'].close()
+
+            # 关闭网络连接池
+            from utils import http
+            http.close_session()
+
+            # 显式释放截图和复用的缓冲区，不再依赖垃圾回收
+            if components.get('screenshot_manager'):
+                components['screenshot_manager'].image_pool.clear()
+
             # 标记程序结束
             self.running = False
             
-            # 确保所有资源都被释放
-            import gc
-            gc.collect()
-            
         except Exception as e:
             print(f"清理资源时出错: {e}")
         finally:
@@ -221,5 +435,10 @@ class ScreenOCR:
             self.running = False
 
 if __name__ == "__main__":
+    # 带参数启动时进入命令行模式
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main())
+
     app = ScreenOCR()
     app.run()
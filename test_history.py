@@ -0,0 +1,32 @@
+from core.history import HistoryStore, build_match_query
+import os
+import tempfile
+
+
+def test_cli_query():
+    # README 中的示例：python main.py history 发票 "total amount" conn*
+    # shell 去掉引号后得到的参数列表，短语仍按短语匹配
+    args = ['发票', 'total amount', 'conn*']
+    assert build_match_query(args) == '"发 票" "total amount" "conn" *'
+    assert build_match_query(args) == build_match_query('发票 "total amount" conn*')
+    assert build_match_query([]) is None
+
+
+def test_cli_search():
+    with tempfile.TemporaryDirectory() as directory:
+        history = HistoryStore(os.path.join(directory, 'history.db'))
+        try:
+            history.add(['发票 total amount: 100', 'connection ok'], source='test')
+            history.add(['发票 amount total', 'connection ok'], source='test')
+            history.flush()
+            entries = history.search(['发票', 'total amount', 'conn*'])
+            assert len(entries) == 1
+            assert 'total amount' in entries[0]['text']
+        finally:
+            history.close()
+
+
+if __name__ == "__main__":
+    test_cli_query()
+    test_cli_search()
+    print("历史搜索测试通过")
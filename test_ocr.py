@@ -22,8 +22,8 @@ def test_ocr():
         print(f"\n截图已保存到: {debug_file}")
         
         print("正在识别文字...")
-        # 识别文字
-        texts = ocr_manager.recognize_text(debug_file)
+        # 识别文字（直接使用内存中的截图）
+        texts = ocr_manager.recognize_text(screenshot_manager.current_screenshot)
         
         if texts:
             print("\n识别结果:")
@@ -0,0 +1,101 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+
+# 输入停止多久后开始搜索（毫秒）
+SEARCH_DELAY_MS = 150
+SEARCH_LIMIT = 50
+
+
+class HistoryWindow:
+    """识别历史搜索窗口，窗口只创建一次，关闭时隐藏"""
+
+    def __init__(self, tk_thread, history, copy_callback=None):
+        """
+        :param tk_thread: 专用Tk线程
+        :param history: HistoryStore
+        :param copy_callback: 复制选中记录的函数，参数为文字列表
+        """
+        self.tk_thread = tk_thread
+        self.history = history
+        self.copy_callback = copy_callback
+        self.window = None
+        self._entry = None
+        self.query_var = None
+        self.listbox = None
+        self.status_label = None
+        self._entries = []
+        self._search_pending = None
+
+    def setup_window(self):
+        """创建窗口（在Tk线程中调用）"""
+        self.window = tk.Toplevel(self.tk_thread.root)
+        self.window.title("识别历史")
+        self.window.geometry("600x400")
+
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        self.query_var = tk.StringVar()
+        self._entry = ttk.Entry(frame, textvariable=self.query_var, font=('Microsoft YaHei', 10))
+        self._entry.pack(fill=tk.X)
+        self._entry.bind('<KeyRelease>', self._on_query_changed)
+        self._entry.bind('<Return>', self._on_copy)
+
+        hint_label = ttk.Label(
+            frame,
+            text='提示：多个词同时匹配，"引号"内按短语匹配，词尾加 * 按前缀匹配；双击复制',
+            font=('Microsoft YaHei', 9),
+            foreground='gray'
+        )
+        hint_label.pack(anchor=tk.W, pady=5)
+
+        self.listbox = tk.Listbox(frame, font=('Microsoft YaHei', 10), activestyle='none')
+        self.listbox.pack(fill=tk.BOTH, expand=True)
+        self.listbox.bind('<Double-Button-1>', self._on_copy)
+
+        self.status_label = ttk.Label(frame, font=('Microsoft YaHei', 9))
+        self.status_label.pack(anchor=tk.W, pady=(5, 0))
+
+        self.window.protocol("WM_DELETE_WINDOW", self.window.withdraw)
+        self.window.bind('<Escape>', lambda e: self.window.withdraw())
+
+    def show(self):
+        """显示窗口"""
+        self.tk_thread.call(self._show)
+
+    def _show(self):
+        if not self.window:
+            self.setup_window()
+        self.window.deiconify()
+        self.window.lift()
+        self._entry.focus_set()
+        self._search()
+
+    def _on_query_changed(self, event=None):
+        # 连续输入时只在停顿后搜索一次
+        if self._search_pending is not None:
+            self.window.after_cancel(self._search_pending)
+        self._search_pending = self.window.after(SEARCH_DELAY_MS, self._search)
+
+    def _search(self):
+        self._search_pending = None
+        start = time.perf_counter()
+        self._entries = self.history.search(self.query_var.get(), limit=SEARCH_LIMIT)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.listbox.delete(0, tk.END)
+        for entry in self._entries:
+            stamp = time.strftime('%m-%d %H:%M', time.localtime(entry['created_at']))
+            first_line = entry['text'].split('\n', 1)[0]
+            self.listbox.insert(tk.END, f"{stamp}  {first_line}")
+        self.status_label.configure(text=f"{len(self._entries)} 条结果，耗时 {elapsed:.1f} ms")
+
+    def _on_copy(self, event=None):
+        selection = self.listbox.curselection()
+        index = selection[0] if selection else 0
+        if index >= len(self._entries):
+            return
+        if self.copy_callback:
+            self.copy_callback(self._entries[index]['text'].split('\n'))
+        self.status_label.configure(text="已复制到剪贴板")
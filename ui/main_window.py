@@ -1,19 +1,34 @@
 import tkinter as tk
 from tkinter import ttk
 import webbrowser
-from config.settings import Settings
+from config.settings import get_settings
+from ui.tk_thread import TkThread
 
 class MainWindow:
-    def __init__(self, screenshot_callback=None, hotkey_callback=None):
-        self.settings = Settings()
+    def __init__(self, screenshot_callback=None, tk_thread=None):
+        self.settings = get_settings()
+        # 主窗口与截图遮罩共用同一个Tk线程
+        self.tk_thread = tk_thread or TkThread()
         self.screenshot_callback = screenshot_callback
-        self.hotkey_callback = hotkey_callback
         self.window = None
+        self.desc_label = None
         self.hotkey_var = None
+        # 快捷键修改后更新说明文字
+        self.settings.subscribe(self.on_hotkey_changed, 'SCREENSHOT_HOTKEY')
+
+    def usage_text(self):
+        """使用说明"""
+        return """
+使用说明：
+1. 点击"开始截图"或按快捷键 {} 开始截图
+2. 鼠标框选要识别的区域
+3. 点击确认或取消按钮
+4. 识别的文字会自动复制到剪贴板
+        """.format(self.settings.SCREENSHOT_HOTKEY)
         
     def setup_window(self):
-        """设置主窗口"""
-        self.window = tk.Tk()
+        """设置主窗口（在Tk线程中调用）"""
+        self.window = tk.Toplevel(self.tk_thread.root)
         self.window.title("屏幕文字识别工具")
         self.window.geometry("600x500")
         self.window.resizable(True, True)
@@ -37,22 +52,14 @@ class MainWindow:
         title_label.pack(pady=20)
         
         # 添加说明文本
-        desc_text = """
-使用说明：
-1. 点击"开始截图"或按快捷键 {} 开始截图
-2. 鼠标框选要识别的区域
-3. 点击确认或取消按钮
-4. 识别的文字会自动复制到剪贴板
-        """.format(self.settings.SCREENSHOT_HOTKEY)
-        
-        desc_label = ttk.Label(
+        self.desc_label = ttk.Label(
             main_frame,
-            text=desc_text,
+            text=self.usage_text(),
             justify=tk.LEFT,
             wraplength=500,
             font=('Microsoft YaHei', 11)
         )
-        desc_label.pack(pady=20)
+        self.desc_label.pack(pady=20)
         
         # 添加按钮框架
         button_frame = ttk.Frame(main_frame)
@@ -150,32 +157,19 @@ class MainWindow:
     def save_settings(self, dialog):
         """保存设置"""
         new_hotkey = self.hotkey_var.get()
-        if new_hotkey and new_hotkey != self.settings.SCREENSHOT_HOTKEY:
-            self.settings.SCREENSHOT_HOTKEY = new_hotkey
-            self.settings.save()
-            
-            # 更新主窗口的说明文本
-            desc_text = """
-使用说明：
-1. 点击"开始截图"或按快捷键 {} 开始截图
-2. 鼠标框选要识别的区域
-3. 点击确认或取消按钮
-4. 识别的文字会自动复制到剪贴板
-            """.format(self.settings.SCREENSHOT_HOTKEY)
-            
-            # 找到并更新说明标签的文本
-            for child in self.window.winfo_children():
-                if isinstance(child, ttk.Frame):
-                    for frame_child in child.winfo_children():
-                        if isinstance(frame_child, ttk.Label) and frame_child.cget("wraplength") == 500:
-                            frame_child.configure(text=desc_text)
-                            break
-            
-            # 重新注册热键
-            if self.hotkey_callback:
-                self.hotkey_callback()
+        if new_hotkey:
+            # 保存后由配置变化通知更新说明文字、托盘菜单并重新注册热键
+            self.settings.update(SCREENSHOT_HOTKEY=new_hotkey)
         
         dialog.destroy()
+
+    def on_hotkey_changed(self, key, value):
+        """快捷键配置变化，在Tk线程中更新说明文字"""
+        def _update():
+            if self.desc_label is not None:
+                self.desc_label.configure(text=self.usage_text())
+        if self.tk_thread.root is not None:
+            self.tk_thread.call(_update)
         
     def on_screenshot(self):
         """截图按钮点击回调"""
@@ -190,17 +184,33 @@ class MainWindow:
         
     def show(self):
         """显示窗口"""
+        self.tk_thread.call(self._show)
+
+    def _show(self):
         if not self.window:
             self.setup_window()
         self.window.deiconify()
+        self.window.lift()
         
     def hide(self):
         """隐藏窗口"""
+        self.tk_thread.call(self._hide)
+
+    def _hide(self):
         if self.window:
             self.window.withdraw()
             
     def run(self):
         """运行主窗口"""
-        if not self.window:
-            self.setup_window()
-        self.window.mainloop()
\ No newline at end of file
+        self.tk_thread.start()
+        self.show()
+
+    def close(self):
+        """销毁主窗口"""
+        def _close():
+            if self.window:
+                self.window.destroy()
+                self.window = None
+                self.desc_label = None
+        if self.tk_thread.root is not None:
+            self.tk_thread.call(_close)
\ No newline at end of file
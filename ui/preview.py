@@ -0,0 +1,333 @@
+# 截图预览窗口
+import threading
+import tkinter as tk
+from PIL import Image
+from core.buffers import OWNER_VIEWER, get_image_pool
+from utils.metrics import metrics
+
+# 预览窗口最多占屏幕的比例
+MAX_SCREEN_RATIO = 0.75
+# 最大放大倍率（相对于原图）和每次滚轮缩放的倍率
+MAX_ZOOM = 4.0
+ZOOM_STEP = 1.25
+# 拖动和缩放时的重绘间隔（毫秒），期间的多次变化合并为一次重绘
+FRAME_INTERVAL_MS = 16
+# 识别文字框的颜色
+BOX_COLOR = '#FF4500'
+
+
+class ImagePyramid:
+    """
+    图片金字塔
+    第 n 层为原图按 n 倍（2的幂）缩小的图片，由上一层逐级 reduce(2) 生成并缓存；
+    生成之前可以直接从原图最近邻采样得到草图，代价只与输出尺寸有关
+    """
+
+    def __init__(self, image):
+        self.image = image
+        self._levels = {1: image}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def factor_for(scale):
+        """显示比例 scale 下分辨率足够的最小层"""
+        factor = 1
+        while factor * 2 * scale <= 1:
+            factor *= 2
+        return factor
+
+    def cached(self, factor):
+        """已经生成的层，未生成时返回None"""
+        with self._lock:
+            return self._levels.get(factor)
+
+    def level(self, factor):
+        """生成第 factor 层（耗时与原图大小成正比，在后台线程中调用）"""
+        with self._lock:
+            current = max(f for f in self._levels if f <= factor)
+            image = self._levels[current]
+        # 缩小时不持有锁，渲染线程仍可读取已有的层
+        while current < factor:
+            image = image.reduce(2)
+            current *= 2
+            with self._lock:
+                self._levels[current] = image
+        return image
+
+    def render(self, scale, box, size, draft=False):
+        """
+        按显示比例渲染原图的一部分
+        :param scale: 显示比例（显示像素 / 原图像素）
+        :param box: 原图中的范围 (left, top, right, bottom)
+        :param size: 输出尺寸
+        :param draft: 是否只需要草图（打开窗口时先显示）
+        :return: (图片, 是否为草图)
+        """
+        factor = self.factor_for(scale)
+        level = None if draft else self.cached(factor)
+        if level is None:
+            return self.image.resize(size, Image.NEAREST, box=box), True
+        level_box = tuple(value / factor for value in box)
+        # 放大时保留像素边缘，便于看清小字
+        resample = Image.NEAREST if scale >= 1 else Image.BILINEAR
+        return level.resize(size, resample, box=level_box), False
+
+
+class PreviewWindow:
+    """
+    截图预览窗口，窗口只创建一次，关闭时隐藏并释放图片
+    打开时先显示草图，再在后台生成金字塔层替换为清晰的图片；
+    只渲染可见部分，滚轮缩放、拖动平移，识别到的文字框作为画布元素绘制
+    """
+
+    def __init__(self, tk_thread):
+        """
+        :param tk_thread: 专用Tk线程
+        """
+        self.tk_thread = tk_thread
+        self.image_pool = get_image_pool()
+        self.window = None
+        self.canvas = None
+        self.status_label = None
+        self.image_id = None
+        self._photo = None
+        self._pyramid = None
+        self._result = None
+        self._scale = 1.0
+        self._fit_scale = 1.0
+        # 可见区域左上角在缩放后图片中的位置
+        self._view_x = 0
+        self._view_y = 0
+        self._drag_start = None
+        self._render_pending = None
+        self._building = set()
+        self._box_ids = {}
+
+    def setup_window(self):
+        """创建窗口（在Tk线程中调用）"""
+        self.window = tk.Toplevel(self.tk_thread.root)
+        self.window.withdraw()
+        self.window.title("截图预览")
+        self.window.attributes('-topmost', True)
+
+        self.canvas = tk.Canvas(self.window, highlightthickness=0, bg='gray20')
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.image_id = self.canvas.create_image(0, 0, anchor=tk.NW)
+        self.status_label = tk.Label(self.window, anchor=tk.W)
+        self.status_label.pack(fill=tk.X)
+
+        self.canvas.bind('<ButtonPress-1>', self._on_drag_start)
+        self.canvas.bind('<B1-Motion>', self._on_drag)
+        self.canvas.bind('<MouseWheel>', self._on_wheel)
+        self.canvas.bind('<Button-4>', lambda e: self._zoom_at(ZOOM_STEP, e.x, e.y))
+        self.canvas.bind('<Button-5>', lambda e: self._zoom_at(1 / ZOOM_STEP, e.x, e.y))
+        self.canvas.bind('<Configure>', lambda e: self._schedule_render())
+        self.canvas.tag_bind('box', '<Enter>', self._on_box_enter)
+        self.canvas.tag_bind('box', '<Leave>', lambda e: self._update_status())
+        self.window.bind('<Escape>', lambda e: self._close())
+        self.window.bind('<plus>', lambda e: self._zoom_at(ZOOM_STEP))
+        self.window.bind('<equal>', lambda e: self._zoom_at(ZOOM_STEP))
+        self.window.bind('<minus>', lambda e: self._zoom_at(1 / ZOOM_STEP))
+        self.window.bind('<Key-0>', lambda e: self._fit())
+        self.window.protocol("WM_DELETE_WINDOW", self._close)
+
+    def show(self, image, result=None):
+        """
+        显示截图
+        :param image: PIL Image
+        :param result: 可选，该截图的识别结果（OCRResult），带坐标时绘制文字框
+        """
+        # 窗口打开期间截图不会因超出内存预算被释放
+        self.image_pool.track(image, OWNER_VIEWER)
+        self.tk_thread.call(self._show, image, result)
+
+    def _show(self, image, result=None):
+        with metrics.span('preview_open'):
+            if self.window is None:
+                self.setup_window()
+            self._set_image(image, result)
+
+            # 窗口按适合屏幕的大小打开，图片等比缩小
+            max_width = int(self.window.winfo_screenwidth() * MAX_SCREEN_RATIO)
+            max_height = int(self.window.winfo_screenheight() * MAX_SCREEN_RATIO)
+            width, height = image.size
+            self._fit_scale = min(1.0, max_width / width, max_height / height)
+            self._scale = self._fit_scale
+            self._view_x = self._view_y = 0
+            view_width = max(1, round(width * self._scale))
+            view_height = max(1, round(height * self._scale))
+            self.canvas.configure(width=view_width, height=view_height)
+            self.window.geometry('')
+            self._render(view_width, view_height, draft=True)
+
+            self.window.deiconify()
+            self.window.lift()
+            self.window.focus_force()
+
+    def _set_image(self, image, result):
+        """替换预览的截图，释放上一张截图的引用"""
+        previous = self._pyramid.image if self._pyramid else None
+        if previous is not None and previous is not image:
+            self.image_pool.release(previous, OWNER_VIEWER)
+        if previous is not image:
+            self._pyramid = ImagePyramid(image)
+        # 只绘制已映射回截图坐标的文字框，预处理裁剪或缩放后的坐标画上去会错位
+        self._result = result if result is not None and result.has_boxes() and result.in_capture else None
+        self.canvas.delete('box')
+        self._box_ids = {}
+
+    def _close(self):
+        """隐藏窗口，释放截图、金字塔和显示用的图片"""
+        self._cancel_render()
+        self.window.withdraw()
+        if self._pyramid is not None:
+            self.image_pool.release(self._pyramid.image, OWNER_VIEWER)
+        self._pyramid = None
+        self._result = None
+        self.canvas.delete('box')
+        self._box_ids = {}
+        self.canvas.itemconfig(self.image_id, image='')
+        self._photo = None
+
+    def _fit(self):
+        self._scale = self._fit_scale
+        self._view_x = self._view_y = 0
+        self._schedule_render()
+
+    def _zoom_at(self, ratio, x=None, y=None):
+        """以画布上的 (x, y) 为中心缩放，默认以画布中心为中心"""
+        if self._pyramid is None:
+            return
+        if x is None:
+            x, y = self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2
+        scale = min(MAX_ZOOM, max(self._fit_scale, self._scale * ratio))
+        if scale == self._scale:
+            return
+        ratio = scale / self._scale
+        self._view_x = (self._view_x + x) * ratio - x
+        self._view_y = (self._view_y + y) * ratio - y
+        self._scale = scale
+        self._schedule_render()
+
+    def _on_wheel(self, event):
+        self._zoom_at(ZOOM_STEP if event.delta > 0 else 1 / ZOOM_STEP, event.x, event.y)
+
+    def _on_drag_start(self, event):
+        self._drag_start = (event.x + self._view_x, event.y + self._view_y)
+
+    def _on_drag(self, event):
+        if self._drag_start is None:
+            return
+        self._view_x = self._drag_start[0] - event.x
+        self._view_y = self._drag_start[1] - event.y
+        self._schedule_render()
+
+    def _schedule_render(self):
+        if self._pyramid is not None and self._render_pending is None:
+            self._render_pending = self.canvas.after(FRAME_INTERVAL_MS, self._render)
+
+    def _cancel_render(self):
+        if self._render_pending is not None:
+            self.canvas.after_cancel(self._render_pending)
+            self._render_pending = None
+
+    def _render(self, view_width=None, view_height=None, draft=False):
+        """只渲染画布中可见的部分，先显示草图时随后再渲染清晰的画面"""
+        self._cancel_render()
+        if self._pyramid is None:
+            return
+        view_width = view_width or self.canvas.winfo_width()
+        view_height = view_height or self.canvas.winfo_height()
+        width, height = self._pyramid.image.size
+        scale = self._scale
+        # 限制平移范围，图片小于画布时靠左上显示
+        self._view_x = max(0, min(self._view_x, width * scale - view_width))
+        self._view_y = max(0, min(self._view_y, height * scale - view_height))
+        left = self._view_x / scale
+        top = self._view_y / scale
+        right = min(width, (self._view_x + view_width) / scale)
+        bottom = min(height, (self._view_y + view_height) / scale)
+        size = (max(1, round((right - left) * scale)), max(1, round((bottom - top) * scale)))
+
+        with metrics.span('preview_render'):
+            image, is_draft = self._pyramid.render(scale, (left, top, right, bottom), size, draft)
+            self._set_photo(image)
+        self._draw_boxes()
+        self._update_status()
+        if is_draft:
+            factor = ImagePyramid.factor_for(scale)
+            if self._pyramid.cached(factor) is None:
+                self._build_level(factor)
+            else:
+                self._schedule_render()
+
+    def _set_photo(self, image):
+        """尺寸不变时把新画面写入原有的 PhotoImage，不重新创建Tk图片"""
+        from PIL import ImageTk
+        if self._photo is not None and (self._photo.width(), self._photo.height()) == image.size:
+            self._photo.paste(image)
+        else:
+            self._photo = ImageTk.PhotoImage(image)
+            self.canvas.itemconfig(self.image_id, image=self._photo)
+
+    def _build_level(self, factor):
+        """在后台生成金字塔层，完成后重新渲染"""
+        pyramid = self._pyramid
+        key = (id(pyramid), factor)
+        if key in self._building:
+            return
+        self._building.add(key)
+
+        def build():
+            try:
+                with metrics.span('preview_level'):
+                    pyramid.level(factor)
+            except ValueError as e:
+                # 截图已被释放
+                print(f"生成预览图失败: {e}")
+                return
+            finally:
+                self.tk_thread.call(self._building.discard, key)
+            self.tk_thread.call(self._on_level_ready, pyramid)
+
+        threading.Thread(target=build, name='preview-level', daemon=True).start()
+
+    def _on_level_ready(self, pyramid):
+        if pyramid is self._pyramid:
+            self._schedule_render()
+
+    def _draw_boxes(self):
+        """按当前缩放和平移绘制识别文字框，已有的框只移动位置"""
+        if self._result is None:
+            return
+        scale = self._scale
+        for index in range(len(self._result)):
+            left, top, width, height = self._result.box(index)
+            coords = (left * scale - self._view_x, top * scale - self._view_y,
+                      (left + width) * scale - self._view_x, (top + height) * scale - self._view_y)
+            box_id = self._box_ids.get(index)
+            if box_id is None:
+                self._box_ids[index] = self.canvas.create_rectangle(
+                    *coords, outline=BOX_COLOR, width=2, tags=('box', f'line{index}')
+                )
+            else:
+                self.canvas.coords(box_id, *coords)
+
+    def _on_box_enter(self, event):
+        """鼠标移到文字框上时在状态栏显示该行文字"""
+        for tag in self.canvas.gettags(tk.CURRENT):
+            if tag.startswith('line'):
+                index = int(tag[4:])
+                confidence = self._result.confidence_list()[index]
+                suffix = f"（置信度 {confidence:.2f}）" if confidence is not None else ''
+                self.status_label.configure(text=f"{self._result.texts[index]}{suffix}")
+                return
+
+    def _update_status(self):
+        if self._pyramid is None:
+            return
+        width, height = self._pyramid.image.size
+        lines = f"，{len(self._result)} 行文字" if self._result is not None else ''
+        self.status_label.configure(
+            text=f"{width} x {height}，{self._scale:.0%}{lines}    滚轮缩放，拖动平移，0 适合窗口，Esc 关闭"
+        )
@@ -1 +1,370 @@
-# 截图选择界面 
\ No newline at end of file
+# 截图选择界面
+import logging
+import threading
+import tkinter as tk
+from PIL import Image
+from utils.metrics import metrics
+
+# 选择区域的最小尺寸（像素）
+MIN_SELECTION_SIZE = 10
+# 隐藏遮罩后等待窗口消失再截图的时间（毫秒，仅实时模式）
+HIDE_DELAY_MS = 100
+# 实时模式下遮罩的透明度
+LIVE_ALPHA = 0.3
+# 拖动时的重绘间隔（毫秒），约等于一帧，期间的鼠标移动事件合并为一次重绘
+FRAME_INTERVAL_MS = 16
+
+logger = logging.getLogger(__name__)
+
+
+class SelectionOverlay:
+    """
+    常驻的区域选择遮罩
+    遮罩窗口和工具栏只在Tk线程中创建一次，截图之间保持隐藏，
+    每次截图时直接显示，不再重复创建Tk解释器和窗口；
+    传入背景帧时以不透明窗口显示该静止画面（定格模式），选区确定后无需隐藏遮罩等待重绘
+    """
+
+    def __init__(self, tk_thread, on_region):
+        """
+        :param tk_thread: 专用Tk线程
+        :param on_region: 选择完成后在Tk线程中调用，
+                          签名为 on_region(overlay, x1, y1, x2, y2)，坐标为逻辑屏幕坐标，返回截图或None
+        """
+        self.tk_thread = tk_thread
+        self.on_region = on_region
+        self.window = None
+        self.canvas = None
+        self.toolbar = None
+        self.confirm_btn = None
+        self.current_rect = None
+        self.size_text_id = None
+        self.background_id = None
+        self._photo = None
+        self._frozen = False
+        # 遮罩覆盖的显示器范围（逻辑坐标 x, y, width, height），None 表示窗口所在的整个屏幕
+        self._bounds = None
+        self.start_x = 0
+        self.start_y = 0
+        self._dragging = False
+        # 最近一次鼠标移动事件的位置，等待下一帧重绘
+        self._pointer = None
+        self._render_pending = None
+        # 已经应用到界面上的状态，未变化时不重复设置
+        self._size_text = None
+        self._toolbar_position = None
+        self._confirm_enabled = False
+        self._result = None
+        self._capturing = False
+        self._confirm_pending = False
+        self._done = None
+
+    def build(self):
+        """创建遮罩窗口（仅在Tk线程中调用一次）"""
+        if self.window is not None:
+            return
+        self.window = tk.Toplevel(self.tk_thread.root)
+        self.window.withdraw()
+        # 使用更可靠的全屏实现
+        self.window.attributes('-fullscreen', True)
+        self.window.attributes('-alpha', LIVE_ALPHA)
+        self.window.attributes('-topmost', True)
+        self.window.configure(cursor="crosshair")
+        self.window.protocol("WM_DELETE_WINDOW", self._cancel_selection)
+
+        # 创建画布
+        self.canvas = tk.Canvas(
+            self.window,
+            highlightthickness=0,
+            bg='gray11'
+        )
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+        # 绑定事件
+        self.canvas.bind('<Button-1>', self._on_mouse_down)
+        self.canvas.bind('<B1-Motion>', self._on_mouse_drag)
+        self.canvas.bind('<ButtonRelease-1>', self._on_mouse_up)
+        self.window.bind('<Escape>', self._on_escape)
+
+        # 创建工具栏
+        self.create_toolbar()
+
+    def create_toolbar(self):
+        """创建工具栏"""
+        self.toolbar = tk.Toplevel(self.window)
+        self.toolbar.overrideredirect(True)
+        self.toolbar.attributes('-topmost', True)
+        self.toolbar.withdraw()  # 初始时隐藏工具栏
+
+        # 创建按钮
+        self.confirm_btn = tk.Button(
+            self.toolbar,
+            text="确认",
+            command=self._confirm_selection,
+            state=tk.DISABLED
+        )
+        self.confirm_btn.pack(side=tk.LEFT, padx=5, pady=5)
+
+        cancel_btn = tk.Button(
+            self.toolbar,
+            text="取消",
+            command=self._cancel_selection
+        )
+        cancel_btn.pack(side=tk.LEFT, padx=5, pady=5)
+
+    def select(self, background=None, bounds=None):
+        """
+        显示遮罩并等待用户完成选择（在非Tk线程中调用）
+        :param background: 显示器截图（PIL Image），传入时在该静止画面上框选
+        :param bounds: 遮罩覆盖的显示器范围（逻辑坐标 x, y, width, height），None 表示整个屏幕
+        :return: on_region 返回的截图，取消时返回None
+        """
+        done = threading.Event()
+        with metrics.span('selection_window'):
+            self.tk_thread.call(self._show, done, background, bounds).result()
+        done.wait()
+        return self._result
+
+    def _show(self, done, background=None, bounds=None):
+        """重置状态并显示遮罩"""
+        self.build()
+        self._done = done
+        self._result = None
+        self._capturing = False
+        self._confirm_pending = False
+        self._dragging = False
+        self._reset_canvas()
+        self._place(bounds)
+        self._set_background(background)
+        self.window.deiconify()
+        self.window.lift()
+        self.window.focus_force()
+
+    def _place(self, bounds):
+        """把遮罩移到指定显示器上，全屏窗口只能覆盖它所在的显示器，需要先退出全屏再移动"""
+        if bounds is None or bounds == self._bounds:
+            return
+        x, y, width, height = bounds
+        self.window.attributes('-fullscreen', False)
+        self.window.geometry(f'{width}x{height}+{x}+{y}')
+        self.window.update_idletasks()
+        self.window.attributes('-fullscreen', True)
+        self._bounds = bounds
+
+    def _set_background(self, background):
+        """设置遮罩背景：有背景帧时不透明显示，否则为半透明实时遮罩"""
+        self._frozen = background is not None
+        if not self._frozen:
+            self._clear_background()
+            self.window.attributes('-alpha', LIVE_ALPHA)
+            return
+
+        # 背景帧为物理像素，缩放到窗口的逻辑尺寸后显示
+        width, height = self.screen_size()
+        if background.size != (width, height):
+            background = background.resize((width, height), Image.BILINEAR)
+        from PIL import ImageTk
+        self._photo = ImageTk.PhotoImage(background)
+        if self.background_id is None:
+            self.background_id = self.canvas.create_image(0, 0, anchor=tk.NW, image=self._photo)
+        else:
+            self.canvas.itemconfig(self.background_id, image=self._photo, state=tk.NORMAL)
+        self.canvas.tag_lower(self.background_id)
+        self.window.attributes('-alpha', 1.0)
+
+    def _clear_background(self):
+        """释放背景帧，避免在截图之间占用整屏大小的内存"""
+        if self.background_id is not None:
+            self.canvas.itemconfig(self.background_id, image='', state=tk.HIDDEN)
+        self._photo = None
+
+    def _reset_canvas(self):
+        self._cancel_render()
+        if self.current_rect is not None:
+            self.canvas.delete(self.current_rect)
+            self.current_rect = None
+        if self.size_text_id is not None:
+            self.canvas.delete(self.size_text_id)
+            self.size_text_id = None
+        self._size_text = None
+        self._set_confirm_enabled(False)
+        self._set_toolbar_position(None)
+
+    def _on_mouse_down(self, event):
+        """鼠标按下事件处理"""
+        # 重新框选时清除上一次的选择框
+        self._reset_canvas()
+        # 记录起始位置（使用相对坐标）
+        self.start_x = event.x
+        self.start_y = event.y
+        self._dragging = True
+        logger.debug("Mouse down at: (%s, %s)", self.start_x, self.start_y)
+
+        # 创建选择框和尺寸文本，拖动过程中只更新它们的坐标和内容
+        self.current_rect = self.canvas.create_rectangle(
+            self.start_x, self.start_y, self.start_x, self.start_y,
+            outline='#1E90FF',  # 蓝色边框
+            fill='#ADD8E6',     # 浅蓝色填充
+            stipple='gray50'    # 半透明效果
+        )
+        self.size_text_id = self.canvas.create_text(
+            self.start_x, self.start_y - 10,
+            text='',
+            fill='white'
+        )
+
+    def _on_mouse_drag(self, event):
+        """
+        鼠标拖动事件处理
+        只记录位置，同一帧内的多次移动合并为一次重绘
+        """
+        if not self._dragging:
+            return
+        self._pointer = (event.x, event.y, event.x_root, event.y_root)
+        if self._render_pending is None:
+            self._render_pending = self.canvas.after(FRAME_INTERVAL_MS, self._render)
+
+    def _render(self):
+        """按最近一次鼠标位置重绘选择框"""
+        self._render_pending = None
+        if not self._dragging or self._pointer is None:
+            return
+        current_x, current_y, x_root, y_root = self._pointer
+        logger.debug("Mouse drag to: (%s, %s)", current_x, current_y)
+
+        # 更新选择框（使用相对坐标）
+        self.canvas.coords(
+            self.current_rect,
+            self.start_x, self.start_y,
+            current_x, current_y
+        )
+
+        # 更新尺寸文本
+        width = abs(current_x - self.start_x)
+        height = abs(current_y - self.start_y)
+        self.canvas.coords(
+            self.size_text_id,
+            min(self.start_x, current_x) + width / 2,
+            min(self.start_y, current_y) - 10
+        )
+        size_text = f'{width} x {height}'
+        if size_text != self._size_text:
+            self.canvas.itemconfig(self.size_text_id, text=size_text)
+            self._size_text = size_text
+
+        # 更新工具栏位置
+        self._set_toolbar_position((x_root, y_root - 40))
+
+        # 启用确认按钮（如果选择区域足够大）
+        self._set_confirm_enabled(width > MIN_SELECTION_SIZE and height > MIN_SELECTION_SIZE)
+
+    def _cancel_render(self):
+        if self._render_pending is not None:
+            self.canvas.after_cancel(self._render_pending)
+            self._render_pending = None
+        self._pointer = None
+
+    def _set_toolbar_position(self, position):
+        """移动并显示工具栏，position 为 None 时隐藏"""
+        if position == self._toolbar_position:
+            return
+        if position is None:
+            self.toolbar.withdraw()
+        else:
+            self.toolbar.geometry(f'+{position[0]}+{position[1]}')
+            if self._toolbar_position is None:
+                self.toolbar.deiconify()
+        self._toolbar_position = position
+
+    def _set_confirm_enabled(self, enabled):
+        if enabled != self._confirm_enabled:
+            self.confirm_btn.config(state=tk.NORMAL if enabled else tk.DISABLED)
+            self._confirm_enabled = enabled
+
+    def _on_mouse_up(self, event):
+        """鼠标释放事件处理"""
+        if not self._dragging:
+            return
+        # 立即绘制最后的位置，不再等待下一帧
+        if self._render_pending is not None:
+            self.canvas.after_cancel(self._render_pending)
+            self._pointer = (event.x, event.y, event.x_root, event.y_root)
+            self._render()
+        self._dragging = False
+        # 获取选择区域的相对坐标
+        x1 = min(self.start_x, event.x)
+        y1 = min(self.start_y, event.y)
+        x2 = max(self.start_x, event.x)
+        y2 = max(self.start_y, event.y)
+        logger.debug("选择区域: (%s, %s) -> (%s, %s)", x1, y1, x2, y2)
+
+        # 如果选择区域太小，取消选择
+        if abs(x2-x1) < MIN_SELECTION_SIZE or abs(y2-y1) < MIN_SELECTION_SIZE:
+            self._cancel_selection()
+            return
+
+        # 转换为屏幕逻辑坐标，全屏窗口的位置由窗口管理器决定，已知显示器范围时以其为准
+        if self._bounds is not None:
+            root_x, root_y = self._bounds[:2]
+        else:
+            root_x = self.window.winfo_x()
+            root_y = self.window.winfo_y()
+        region = (root_x + x1, root_y + y1, root_x + x2, root_y + y2)
+
+        # 定格模式下直接从背景帧裁剪，无需隐藏遮罩
+        self._capturing = True
+        if self._frozen:
+            self._capture(region)
+            return
+
+        # 截图前隐藏遮罩，等窗口消失后再截图，期间不阻塞Tk线程
+        self.window.withdraw()
+        self.window.after(HIDE_DELAY_MS, self._capture, region)
+
+    def _capture(self, region):
+        if self._done is None:
+            # 等待截图期间已取消
+            self._capturing = False
+            return
+        try:
+            self._result = self.on_region(self, *region)
+        except Exception as e:
+            print(f"截图时发生错误: {e}")
+            self._result = None
+        self._capturing = False
+        if self._result is None:
+            self._cancel_selection()
+        elif self._confirm_pending:
+            self._finish()
+
+    def screen_size(self):
+        """遮罩所在显示器的逻辑尺寸"""
+        if self._bounds is not None:
+            return self._bounds[2], self._bounds[3]
+        return self.window.winfo_screenwidth(), self.window.winfo_screenheight()
+
+    def _on_escape(self, event):
+        """ESC键按下事件处理"""
+        self._cancel_selection()
+
+    def _confirm_selection(self):
+        """确认截图"""
+        if self._capturing:
+            # 截图尚未完成，完成后自动确认
+            self._confirm_pending = True
+            return
+        self._finish()
+
+    def _cancel_selection(self):
+        """取消截图"""
+        self._result = None
+        self._finish()
+
+    def _finish(self):
+        """隐藏遮罩并通知等待方"""
+        self.window.withdraw()
+        self._reset_canvas()
+        self._clear_background()
+        if self._done is not None:
+            self._done.set()
+            self._done = None
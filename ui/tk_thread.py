@@ -0,0 +1,89 @@
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import Future
+
+# 命令队列轮询间隔（毫秒）
+POLL_INTERVAL_MS = 10
+
+
+class TkThread:
+    """
+    专用Tk线程
+    整个进程只创建一个Tk解释器，所有窗口都是其隐藏根窗口的子窗口；
+    其他线程通过线程安全的命令队列把操作交给该线程执行
+    """
+
+    def __init__(self):
+        self.root = None
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动Tk线程，等待根窗口创建完成后返回"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='tk-thread', daemon=True)
+            self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.root.after(POLL_INTERVAL_MS, self._poll)
+        self._ready.set()
+        self.root.mainloop()
+
+    def _poll(self):
+        """执行队列中的命令"""
+        while True:
+            try:
+                future, func, args, kwargs = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._execute(future, func, args, kwargs)
+        if self.root is not None:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _execute(self, future, func, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            print(f"Tk线程执行命令出错: {e}")
+            future.set_exception(e)
+
+    def in_tk_thread(self):
+        return threading.current_thread() is self._thread
+
+    def call(self, func, *args, **kwargs):
+        """
+        在Tk线程中异步执行函数
+        :return: concurrent.futures.Future
+        """
+        self.start()
+        future = Future()
+        if self.in_tk_thread():
+            self._execute(future, func, args, kwargs)
+        else:
+            self._queue.put((future, func, args, kwargs))
+        return future
+
+    def call_sync(self, func, *args, **kwargs):
+        """在Tk线程中执行函数并等待结果"""
+        return self.call(func, *args, **kwargs).result()
+
+    def stop(self):
+        """退出Tk主循环"""
+        if self.root is None:
+            return
+
+        def _quit():
+            root = self.root
+            self.root = None
+            root.quit()
+            root.destroy()
+
+        self.call(_quit)
@@ -1,15 +1,27 @@
 import pystray
 from PIL import Image, ImageDraw
 import sys
-from config.settings import Settings
+from config.settings import get_settings
 
 class SystemTray:
-    def __init__(self, screenshot_callback=None, show_window_callback=None, exit_callback=None):
-        self.settings = Settings()
+    def __init__(self, screenshot_callback=None, show_window_callback=None, exit_callback=None,
+                 stats_callback=None, watch_callback=None, history_callback=None, credentials=None,
+                 preview_callback=None):
+        self.settings = get_settings()
+        # 密钥查找器（CredentialResolver），用于在菜单中显示密钥状态
+        self.credentials = credentials
         self.screenshot_callback = screenshot_callback
         self.show_window_callback = show_window_callback
         self.exit_callback = exit_callback
+        self.stats_callback = stats_callback
+        self.watch_callback = watch_callback
+        self.history_callback = history_callback
+        self.preview_callback = preview_callback
         self.setup_tray()
+        # 快捷键修改后刷新菜单中的快捷键文字
+        self.settings.subscribe(self.on_hotkey_changed, 'SCREENSHOT_HOTKEY')
+        if self.credentials:
+            self.credentials.subscribe(self.on_credentials_resolved)
 
     def create_tray_icon(self):
         """创建托盘图标"""
@@ -41,10 +53,33 @@ class SystemTray:
                 self.on_screenshot
             ),
             pystray.MenuItem(
-                f"快捷键: {self.settings.SCREENSHOT_HOTKEY}",
+                lambda item: f"快捷键: {self.settings.SCREENSHOT_HOTKEY}",
                 lambda: None,
                 enabled=False
             ),
+            pystray.MenuItem(
+                lambda item: self.credentials.describe() if self.credentials else "API 密钥: 未知",
+                lambda: None,
+                enabled=False,
+                visible=self.credentials is not None
+            ),
+            pystray.MenuItem(
+                "预览上次截图",
+                self.on_preview,
+                visible=self.preview_callback is not None
+            ),
+            pystray.MenuItem(
+                "搜索历史",
+                self.on_history
+            ),
+            pystray.MenuItem(
+                "区域监视（开始/停止）",
+                self.on_watch
+            ),
+            pystray.MenuItem(
+                "性能统计",
+                self.on_stats
+            ),
             pystray.MenuItem(
                 "退出",
                 self.on_exit
@@ -69,6 +104,52 @@ class SystemTray:
         if self.screenshot_callback:
             self.screenshot_callback()
 
+    def on_preview(self):
+        """预览截图回调"""
+        if self.preview_callback:
+            self.preview_callback()
+
+    def on_history(self):
+        """搜索历史回调"""
+        if self.history_callback:
+            self.history_callback()
+
+    def on_watch(self):
+        """区域监视回调"""
+        if self.watch_callback:
+            self.watch_callback()
+
+    def on_stats(self):
+        """性能统计回调"""
+        if self.stats_callback:
+            self.stats_callback()
+
+    def on_hotkey_changed(self, key, value):
+        """快捷键配置变化"""
+        try:
+            if self.tray:
+                self.tray.update_menu()
+        except Exception as e:
+            print(f"更新托盘菜单失败: {e}")
+
+    def on_credentials_resolved(self, credentials):
+        """密钥查找完成，刷新菜单中的状态，找不到密钥时提示"""
+        try:
+            if self.tray:
+                self.tray.update_menu()
+        except Exception as e:
+            print(f"更新托盘菜单失败: {e}")
+        if credentials.error:
+            self.notify(credentials.error, "API 密钥未找到")
+
+    def notify(self, message, title="屏幕文字识别"):
+        """显示托盘通知（平台不支持时忽略）"""
+        try:
+            if self.tray:
+                self.tray.notify(message, title)
+        except Exception as e:
+            print(f"显示通知失败: {e}")
+
     def on_exit(self):
         """退出程序回调"""
         self.cleanup()
@@ -0,0 +1,97 @@
+import threading
+
+# 进程内共享的HTTP会话，复用与百度API之间的长连接
+_session = None
+_timeout = None
+_session_lock = threading.Lock()
+
+
+def _create_session(settings):
+    """根据配置创建带连接池和重试策略的会话"""
+    # requests 导入较慢，首次发送请求时才导入
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=settings.HTTP_RETRIES,
+        connect=settings.HTTP_RETRIES,
+        read=settings.HTTP_RETRIES,
+        backoff_factor=settings.HTTP_BACKOFF,
+        status_forcelist=(500, 502, 503, 504),
+        # OCR接口只读不写，POST重试是安全的
+        allowed_methods=frozenset(['GET', 'POST', 'HEAD']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.HTTP_POOL_SIZE,
+        pool_maxsize=settings.HTTP_POOL_SIZE,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """获取共享会话（首次调用时创建）"""
+    global _session, _timeout
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                from config.settings import get_settings
+                settings = get_settings()
+                _timeout = (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+                _session = _create_session(settings)
+    return _session
+
+
+def request(method, url, **kwargs):
+    """
+    通过共享会话发送请求，未指定时使用默认超时
+    :param method: HTTP方法
+    :param url: 请求地址
+    :return: requests.Response
+    """
+    session = get_session()
+    kwargs.setdefault('timeout', _timeout)
+    return session.request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def warm_up(url, background=True):
+    """
+    预先建立到目标主机的连接，避免首次识别承担握手开销
+    :param url: 目标地址（只关心主机，响应内容会被忽略）
+    :param background: 是否在后台线程中执行
+    """
+    def _warm_up():
+        try:
+            request('HEAD', url, allow_redirects=False)
+            print("网络连接预热完成")
+        except Exception as e:
+            print(f"网络连接预热失败: {e}")
+
+    if background:
+        thread = threading.Thread(target=_warm_up, daemon=True)
+        thread.start()
+        return thread
+    _warm_up()
+    return None
+
+
+def close_session():
+    """关闭共享会话，释放连接池"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,260 @@
+import contextvars
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+# 当前线程/上下文中正在进行的链路
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+def percentile(sorted_values, fraction):
+    """已排序数据的分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def resident_memory():
+    """当前进程的常驻内存（字节），无法获取时返回None"""
+    try:
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/statm', 'rb') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ('cb', wintypes.DWORD),
+                    ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t),
+                    ('PeakPagefileUsage', ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        # macOS 等平台只能取得峰值（字节）
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (OSError, ValueError, AttributeError, ImportError):
+        return None
+
+
+class Trace:
+    """一次截图识别的完整链路，记录各阶段的耗时"""
+
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans = []
+        self.finished = False
+
+    def add_span(self, stage, start, duration_ms):
+        self.spans.append({
+            'stage': stage,
+            'offset_ms': round((start - self._start) * 1000, 3),
+            'duration_ms': round(duration_ms, 3)
+        })
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+
+class MetricsStore:
+    """
+    进程内性能指标
+    按阶段保存最近若干次耗时，计算 p50/p95/p99；可选将每条链路以JSON Lines格式导出
+    """
+
+    def __init__(self, window=1000, trace_file=None):
+        self.window = window
+        self.trace_file = trace_file
+        self._samples = {}
+        # 最近一次的数值型指标（如内存占用），{名称: (当前值, 最大值)}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+
+    def configure(self, window=None, trace_file=None):
+        """根据配置调整窗口大小和导出文件"""
+        with self._lock:
+            if window:
+                self.window = window
+                self._samples = {stage: deque(values, maxlen=window)
+                                 for stage, values in self._samples.items()}
+            self.trace_file = trace_file or None
+
+    def record(self, stage, duration_ms):
+        """记录一次阶段耗时（毫秒）"""
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(duration_ms)
+
+    def gauge(self, name, value):
+        """记录数值型指标的当前值，同时保留最大值"""
+        with self._lock:
+            peak = self._gauges.get(name, (value, value))[1]
+            self._gauges[name] = (value, max(peak, value))
+
+    def gauges(self):
+        """{名称: {'value', 'max'}}"""
+        with self._lock:
+            return {name: {'value': round(value, 2), 'max': round(peak, 2)}
+                    for name, (value, peak) in self._gauges.items()}
+
+    def record_rss(self):
+        """记录进程常驻内存（MB），无法获取时返回None"""
+        rss = resident_memory()
+        if rss is None:
+            return None
+        rss_mb = rss / (1024 * 1024)
+        self.gauge('rss_mb', rss_mb)
+        return rss_mb
+
+    @contextmanager
+    def span(self, stage):
+        """
+        计时上下文，耗时同时计入全局统计和当前链路
+        用法：with metrics.span('encode'): ...
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.record(stage, duration_ms)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.add_span(stage, start, duration_ms)
+
+    def start_trace(self, name):
+        """开始一条链路并设为当前上下文的链路"""
+        trace = Trace(name)
+        _current_trace.set(trace)
+        return trace
+
+    def current_trace(self):
+        return _current_trace.get()
+
+    def finish_trace(self, trace=None):
+        """结束链路，记录总耗时并导出"""
+        trace = trace or _current_trace.get()
+        if trace is None or trace.finished:
+            return
+        trace.finished = True
+        total_ms = trace.elapsed_ms()
+        self.record(trace.name, total_ms)
+        # 每条链路结束时记录常驻内存，长时间运行时可据此确认内存没有持续增长
+        rss_mb = self.record_rss()
+        if self.trace_file:
+            self._export(trace, total_ms, rss_mb)
+
+    def _export(self, trace, total_ms, rss_mb=None):
+        record = {
+            'trace_id': trace.trace_id,
+            'name': trace.name,
+            'started_at': trace.started_at,
+            'total_ms': round(total_ms, 3),
+            'spans': trace.spans
+        }
+        if rss_mb is not None:
+            record['rss_mb'] = round(rss_mb, 1)
+        try:
+            with self._export_lock:
+                with open(self.trace_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"导出性能链路失败: {e}")
+
+    def summary(self):
+        """
+        各阶段耗时统计
+        :return: {阶段: {'count', 'p50', 'p95', 'p99', 'max'}}
+        """
+        with self._lock:
+            snapshot = {stage: sorted(values) for stage, values in self._samples.items()}
+        return summarize(snapshot)
+
+    def format_summary(self):
+        text = format_summary(self.summary())
+        gauges = self.gauges()
+        if gauges:
+            text += '\n' + '\n'.join(f"{name}: 当前 {item['value']}，最大 {item['max']}"
+                                     for name, item in sorted(gauges.items()))
+        return text
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._gauges.clear()
+
+
+def summarize(samples):
+    """计算每个阶段的分位数，samples 为 {阶段: 已排序耗时列表}"""
+    result = {}
+    for stage, values in samples.items():
+        if not values:
+            continue
+        result[stage] = {
+            'count': len(values),
+            'p50': round(percentile(values, 0.50), 2),
+            'p95': round(percentile(values, 0.95), 2),
+            'p99': round(percentile(values, 0.99), 2),
+            'max': round(values[-1], 2)
+        }
+    return result
+
+
+def format_summary(summary):
+    """将统计结果格式化为文本表格"""
+    if not summary:
+        return "暂无性能数据"
+    lines = [f"{'阶段':<18}{'次数':>4}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}"]
+    for stage in sorted(summary):
+        item = summary[stage]
+        lines.append(f"{stage:<20}{item['count']:>6}{item['p50']:>10}{item['p95']:>10}"
+                     f"{item['p99']:>10}{item['max']:>10}")
+    return '\n'.join(lines)
+
+
+def load_trace_file(path):
+    """
+    读取导出的链路文件，汇总各阶段耗时
+    :return: {阶段: 已排序耗时列表}
+    """
+    samples = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            samples.setdefault(record['name'], []).append(record['total_ms'])
+            for span in record.get('spans', []):
+                samples.setdefault(span['stage'], []).append(span['duration_ms'])
+    return {stage: sorted(values) for stage, values in samples.items()}
+
+
+# 全局指标实例
+metrics = MetricsStore()